@@ -0,0 +1,124 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Generate a synthetic corpus of HTTP/2 frames.
+
+The corpus is deterministic (for a given seed) so that benchmark results are
+comparable across runs.
+"""
+
+import random
+
+import hpack
+import tcp_h2_describe._build
+
+
+DATA_SIZES = (0, 1, 16, 256, 1024, 4096, 16384)
+REQUEST_HEADERS = [
+    (":method", "POST"),
+    (":scheme", "http"),
+    (":authority", "localhost:24909"),
+    (":path", "/users.v1.Users/AddUser"),
+    ("content-type", "application/grpc"),
+    ("user-agent", "grpc-python/1.23.0 grpc-c/8.0.0 (linux; chttp2)"),
+    ("te", "trailers"),
+    ("grpc-accept-encoding", "identity,deflate,gzip"),
+    ("accept-encoding", "identity,gzip"),
+]
+SETTINGS = (
+    (0x3, 100),
+    (0x4, 65535),
+    (0x5, 16384),
+    (0x6, 16384),
+)
+
+
+class Corpus:
+    """A collection of synthetic frames, grouped by frame type.
+
+    Args:
+        warm_up (List[bytes]): Frames that must be processed (once, in
+            order) before any of the frames in ``frames``, e.g. to populate
+            the HPACK dynamic table.
+        frames (Dict[str, List[bytes]]): The frames, keyed by a name for
+            each group (e.g. ``DATA-1024``).
+    """
+
+    def __init__(self, warm_up, frames):
+        self.warm_up = warm_up
+        self.frames = frames
+
+
+def _random_bytes(rng, size):
+    """Generate random bytes.
+
+    Args:
+        rng (random.Random): The random number generator.
+        size (int): The number of bytes.
+
+    Returns:
+        bytes: The random bytes.
+    """
+    # NOTE: ``getrandbits(0)`` raises ``ValueError`` before Python 3.9.
+    if size == 0:
+        return b""
+    return rng.getrandbits(8 * size).to_bytes(size, "big")
+
+
+def generate(seed=0, count=100):
+    """Generate a corpus of frames.
+
+    The HEADERS frames are encoded with an HPACK encoder that has already
+    encoded the same headers (in ``Corpus.warm_up``), so they consist of
+    indexed header fields, as they would for all but the first request on a
+    long-lived connection.
+
+    Args:
+        seed (Optional[int]): The seed for the random data.
+        count (Optional[int]): The number of frames for each group.
+
+    Returns:
+        Corpus: The generated frames.
+    """
+    rng = random.Random(seed)
+    encoder = hpack.Encoder()
+    build = tcp_h2_describe._build
+
+    warm_up = [build.build_headers(encoder, REQUEST_HEADERS, 1)]
+    frames = {
+        "SETTINGS": [build.build_settings(SETTINGS) for _ in range(count)],
+        "HEADERS": [
+            build.build_headers(encoder, REQUEST_HEADERS, 2 * i + 3)
+            for i in range(count)
+        ],
+        "WINDOW_UPDATE": [
+            build.build_window_update(
+                2 * i + 1, rng.randint(1, 0x7FFFFFFF)
+            )
+            for i in range(count)
+        ],
+        "PING": [
+            build.build_ping(rng.getrandbits(64).to_bytes(8, "big"))
+            for _ in range(count)
+        ],
+    }
+    for size in DATA_SIZES:
+        frames[f"DATA-{size}"] = [
+            build.build_data(
+                2 * i + 1,
+                _random_bytes(rng, size),
+                end_stream=i % 2 == 0,
+            )
+            for i in range(count)
+        ]
+
+    return Corpus(warm_up, frames)
@@ -0,0 +1,418 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""End-to-end throughput and latency benchmark.
+
+Starts ``_bin/h2_server.py`` and a ``tcp-h2-describe`` proxy in front of it
+and runs a fixed workload against the server both directly and through the
+proxy. Usage:
+
+.. code-block:: console
+
+   $ python _bench/e2e.py --baseline _bench/baseline-e2e.json
+   $ python _bench/e2e.py --save-baseline _bench/baseline-e2e.json
+
+The stored baseline is machine-specific; regenerate it (with
+``--save-baseline``) on the machine used for comparisons. When comparing
+with a baseline, the exit status is 1 if there are any regressions.
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import socket
+import subprocess
+import sys
+import time
+
+import h2.config
+import h2.connection
+import h2.events
+
+
+HERE = pathlib.Path(__file__).resolve().parent
+SERVER_SCRIPT = HERE.parent / "_bin" / "h2_server.py"
+SERVER_PORT = 18080
+PROXY_PORT = 28080
+LARGE_BODY_SIZE = 4 * 1024 * 1024
+# NOTE: Each workload is ``(rounds, requests per round, path, body size)``;
+#       the requests in a round are sent concurrently (on one connection).
+WORKLOADS = {
+    "unary": (1000, 1, "/", 0),
+    "large_body": (5, 1, f"/bytes/{LARGE_BODY_SIZE}", LARGE_BODY_SIZE),
+    "concurrent": (20, 100, "/", 0),
+}
+# NOTE: Metrics where a larger value is better; for the others (latency) a
+#       smaller value is better.
+HIGHER_IS_BETTER = frozenset(["requests_per_second", "megabytes_per_second"])
+DEFAULT_THRESHOLD = 0.1
+WINDOW_SIZE = 0x7FFFFFFF - 65535
+
+
+class Client:
+    """A minimal HTTP/2 client that sends a batch of requests at a time.
+
+    Args:
+        port (int): The port to connect to (on ``localhost``).
+    """
+
+    def __init__(self, port):
+        self.sock = socket.create_connection(("localhost", port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        config = h2.config.H2Configuration(
+            client_side=True, header_encoding="utf-8"
+        )
+        self.conn = h2.connection.H2Connection(config=config)
+        self.conn.initiate_connection()
+        # NOTE: Open up the connection window so that large responses are
+        #       not limited by the client.
+        self.conn.increment_flow_control_window(WINDOW_SIZE)
+        self.sock.sendall(self.conn.data_to_send())
+
+    def close(self):
+        """Close the connection."""
+        self.conn.close_connection()
+        self.sock.sendall(self.conn.data_to_send())
+        self.sock.close()
+
+    def _send_bodies(self, bodies):
+        """Send as much of each request body as flow control allows.
+
+        Args:
+            bodies (Dict[int, memoryview]): The remaining body for each
+                stream. Streams are removed once the body has been sent.
+        """
+        for stream_id in list(bodies.keys()):
+            remaining = bodies[stream_id]
+            end_stream = False
+            while True:
+                size = min(
+                    self.conn.local_flow_control_window(stream_id),
+                    self.conn.max_outbound_frame_size,
+                    len(remaining),
+                )
+                if size == 0 and remaining:
+                    break
+                end_stream = size == len(remaining)
+                self.conn.send_data(
+                    stream_id, remaining[:size].tobytes(), end_stream
+                )
+                remaining = remaining[size:]
+                if end_stream:
+                    break
+            if end_stream:
+                del bodies[stream_id]
+            else:
+                bodies[stream_id] = remaining
+
+    def request_batch(self, path, body, count):
+        """Send a batch of (concurrent) requests and wait for the responses.
+
+        Args:
+            path (str): The path for each request.
+            body (bytes): The request body (may be empty).
+            count (int): The number of requests.
+
+        Returns:
+            Tuple[List[float], int]: The latency (in seconds) of each
+            request and the total number of bytes sent and received in
+            request / response bodies.
+        """
+        method = "POST" if body else "GET"
+        started = {}
+        bodies = {}
+        for _ in range(count):
+            stream_id = self.conn.get_next_available_stream_id()
+            headers = [
+                (":method", method),
+                (":path", path),
+                (":scheme", "http"),
+                (":authority", "localhost"),
+            ]
+            self.conn.send_headers(stream_id, headers, end_stream=not body)
+            started[stream_id] = time.perf_counter()
+            if body:
+                bodies[stream_id] = memoryview(body)
+        self._send_bodies(bodies)
+        self.sock.sendall(self.conn.data_to_send())
+
+        latencies = []
+        body_bytes = len(body) * count
+        while len(latencies) < count:
+            data = self.sock.recv(0x40000)
+            if not data:
+                raise RuntimeError("Connection closed during benchmark")
+
+            for event in self.conn.receive_data(data):
+                if isinstance(event, h2.events.DataReceived):
+                    body_bytes += len(event.data)
+                    self.conn.acknowledge_received_data(
+                        event.flow_controlled_length, event.stream_id
+                    )
+                elif isinstance(event, h2.events.StreamEnded):
+                    latencies.append(
+                        time.perf_counter() - started.pop(event.stream_id)
+                    )
+                elif isinstance(event, h2.events.WindowUpdated):
+                    self._send_bodies(bodies)
+            data_to_send = self.conn.data_to_send()
+            if data_to_send:
+                self.sock.sendall(data_to_send)
+
+        return latencies, body_bytes
+
+
+def percentile(sorted_values, fraction):
+    """Compute a percentile (nearest rank) of sorted values.
+
+    Args:
+        sorted_values (List[float]): The (non-empty) sorted values.
+        fraction (float): The percentile as a fraction, e.g. ``0.99``.
+
+    Returns:
+        float: The percentile.
+    """
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def run_workload(port, rounds, count, path, body_size):
+    """Run a single workload against a server.
+
+    Args:
+        port (int): The port to connect to.
+        rounds (int): The number of batches to send.
+        count (int): The number of concurrent requests in each batch.
+        path (str): The path for each request.
+        body_size (int): The size of each request body.
+
+    Returns:
+        Dict[str, float]: The metrics for the workload.
+    """
+    body = b"y" * body_size
+    client = Client(port)
+    latencies = []
+    total_bytes = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        batch_latencies, body_bytes = client.request_batch(path, body, count)
+        latencies.extend(batch_latencies)
+        total_bytes += body_bytes
+    duration = time.perf_counter() - start
+    client.close()
+
+    latencies.sort()
+    return {
+        "requests_per_second": len(latencies) / duration,
+        "megabytes_per_second": total_bytes / duration / 1e6,
+        "p50_ms": 1000.0 * percentile(latencies, 0.5),
+        "p90_ms": 1000.0 * percentile(latencies, 0.9),
+        "p99_ms": 1000.0 * percentile(latencies, 0.99),
+    }
+
+
+def wait_for_port(port, timeout=10.0):
+    """Wait until a port on ``localhost`` accepts connections.
+
+    Args:
+        port (int): The port.
+        timeout (Optional[float]): The maximum time to wait (in seconds).
+
+    Raises:
+        RuntimeError: If the port is not ready before ``timeout``.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("localhost", port)).close()
+            return
+        except ConnectionRefusedError:
+            time.sleep(0.05)
+
+    raise RuntimeError("Timed out waiting for port", port)
+
+
+def start_processes(proxy_args):
+    """Start the HTTP/2 server and the proxy.
+
+    Args:
+        proxy_args (List[str]): Extra command line arguments for the proxy.
+
+    Returns:
+        List[subprocess.Popen]: The server and proxy processes.
+    """
+    server = subprocess.Popen(
+        [sys.executable, str(SERVER_SCRIPT), "--port", str(SERVER_PORT)]
+    )
+    proxy = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "tcp_h2_describe",
+            "--proxy-port",
+            str(PROXY_PORT),
+            "--server-port",
+            str(SERVER_PORT),
+        ]
+        + proxy_args,
+        stdout=subprocess.DEVNULL,
+    )
+    wait_for_port(SERVER_PORT)
+    wait_for_port(PROXY_PORT)
+    return [server, proxy]
+
+
+def run_all(proxy_args):
+    """Run every workload directly against the server and via the proxy.
+
+    Args:
+        proxy_args (List[str]): Extra command line arguments for the proxy.
+
+    Returns:
+        Dict[str, Dict[str, Dict[str, float]]]: The metrics, keyed by target
+        (``direct`` or ``proxy``) and then by workload.
+    """
+    processes = start_processes(proxy_args)
+    try:
+        results = {}
+        for target, port in (("direct", SERVER_PORT), ("proxy", PROXY_PORT)):
+            results[target] = {
+                name: run_workload(port, *workload)
+                for name, workload in WORKLOADS.items()
+            }
+        return results
+    finally:
+        for process in processes:
+            process.kill()
+            process.wait()
+
+
+def compare(results, baseline, threshold):
+    """Compare results to a baseline.
+
+    Args:
+        results (Dict[str, Dict[str, Dict[str, float]]]): The metrics from
+            this run.
+        baseline (Dict[str, Dict[str, Dict[str, float]]]): The stored
+            metrics.
+        threshold (float): The relative change (e.g. ``0.1`` for 10%) that
+            counts as a regression.
+
+    Returns:
+        Tuple[List[str], int]: The report lines and the number of
+        regressions.
+    """
+    lines = []
+    regressions = 0
+    for target, workloads in results.items():
+        for name, metrics in workloads.items():
+            for metric, value in metrics.items():
+                base_value = baseline.get(target, {}).get(name, {}).get(metric)
+                if not base_value:
+                    continue
+                change = (value - base_value) / base_value
+                worse = -change if metric in HIGHER_IS_BETTER else change
+                marker = ""
+                if worse > threshold:
+                    marker = "  <-- REGRESSION"
+                    regressions += 1
+                lines.append(
+                    f"{target:<7}{name:<12}{metric:<22}{base_value:>12.3f}"
+                    f"{value:>12.3f}{100.0 * change:>+9.1f}%{marker}"
+                )
+
+    return lines, regressions
+
+
+def describe_results(results):
+    """Describe the results of a run.
+
+    Args:
+        results (Dict[str, Dict[str, Dict[str, float]]]): The metrics.
+
+    Returns:
+        str: A table with one row per target / workload.
+    """
+    lines = [
+        f"{'target':<7}{'workload':<12}{'req/s':>10}{'MB/s':>10}"
+        f"{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}"
+    ]
+    for target, workloads in results.items():
+        for name, metrics in workloads.items():
+            lines.append(
+                f"{target:<7}{name:<12}"
+                f"{metrics['requests_per_second']:>10.1f}"
+                f"{metrics['megabytes_per_second']:>10.2f}"
+                f"{metrics['p50_ms']:>10.3f}"
+                f"{metrics['p90_ms']:>10.3f}"
+                f"{metrics['p99_ms']:>10.3f}"
+            )
+    return "\n".join(lines)
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description="End-to-end benchmark for the tcp-h2-describe proxy."
+    )
+    parser.add_argument(
+        "--baseline", help="A stored baseline (JSON) to compare against."
+    )
+    parser.add_argument(
+        "--save-baseline", help="Write the results (JSON) to this path."
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="The relative change that counts as a regression.",
+    )
+    parser.add_argument(
+        "--proxy-arg",
+        dest="proxy_args",
+        action="append",
+        default=[],
+        help=(
+            "An extra argument for the proxy, e.g. "
+            "--proxy-arg=--flow-control"
+        ),
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    results = run_all(args.proxy_args)
+    print(describe_results(results))
+
+    if args.save_baseline is not None:
+        with open(args.save_baseline, "w") as file_obj:
+            json.dump(results, file_obj, indent=2, sort_keys=True)
+            file_obj.write("\n")
+
+    if args.baseline is not None and os.path.exists(args.baseline):
+        with open(args.baseline) as file_obj:
+            baseline = json.load(file_obj)
+        lines, regressions = compare(results, baseline, args.threshold)
+        print("")
+        print(
+            f"{'target':<7}{'workload':<12}{'metric':<22}{'baseline':>12}"
+            f"{'current':>12}{'change':>10}"
+        )
+        print("\n".join(lines))
+        print(f"{regressions} regression(s) (threshold {args.threshold:.0%})")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
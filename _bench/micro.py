@@ -0,0 +1,328 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Microbenchmarks for describing frames, per frame type.
+
+Runs ``describe()``, ``next_h2_frame()``, ``observe()``, ``simple_hexdump()``
+and each payload handler over the synthetic corpus from ``corpus.py`` and
+reports the time (in nanoseconds) and the memory allocated (in bytes) per
+frame. Usage:
+
+.. code-block:: console
+
+   $ python _bench/micro.py --baseline _bench/baseline-micro.json
+   $ python _bench/micro.py --save-baseline _bench/baseline-micro.json
+
+The stored baseline is machine-specific; regenerate it (with
+``--save-baseline``) on the machine used for comparisons. When comparing
+with a baseline, the exit status is 1 if there are any regressions.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import corpus
+import tcp_h2_describe._describe
+import tcp_h2_describe._state
+
+
+DEFAULT_THRESHOLD = 0.2
+DEFAULT_REPEAT = 5
+DEFAULT_COUNT = 50
+DESCRIPTION = "client(127.0.0.1:50000)->proxy->server(localhost:8080)"
+
+
+def _make_peer(frame_corpus):
+    """Make a client peer with the HPACK table from the warm up frames.
+
+    Args:
+        frame_corpus (corpus.Corpus): The frames to be benchmarked.
+
+    Returns:
+        tcp_h2_describe._state.PeerState: The peer.
+    """
+    connection = tcp_h2_describe._state.ConnectionState(
+        DESCRIPTION, DESCRIPTION
+    )
+    for frame in frame_corpus.warm_up:
+        tcp_h2_describe._describe.observe(frame, False, connection.client)
+    return connection.client
+
+
+def _payload_handler(frame):
+    """Get a function that calls the payload handler for a frame.
+
+    Args:
+        frame (bytes): A single (complete) frame.
+
+    Returns:
+        Callable[[bytes], str]: Calls the registered payload handler on the
+        payload of a frame (with no context).
+    """
+    type_byte = frame[3]
+    handler = tcp_h2_describe._describe.PAYLOAD_HANDLER_TABLE[type_byte]
+    if tcp_h2_describe._describe.PAYLOAD_CONTEXT_TABLE[type_byte]:
+        return lambda frame: handler(frame[9:], frame[4], None)
+    return lambda frame: handler(frame[9:], frame[4])
+
+
+def benchmarks(frame_corpus):
+    """Get the functions to benchmark.
+
+    Each function processes a single (complete) frame.
+
+    Args:
+        frame_corpus (corpus.Corpus): The frames to be benchmarked.
+
+    Returns:
+        Dict[str, Callable[[bytes], Any]]: The functions, keyed by name.
+    """
+    describe = tcp_h2_describe._describe.describe
+    peer = _make_peer(frame_corpus)
+    # NOTE: The payload handlers (without a peer) use the global HPACK
+    #       decoder, so it needs the same warm up as ``peer``.
+    for frame in frame_corpus.warm_up:
+        tcp_h2_describe._describe.next_h2_frame(frame)
+
+    return {
+        "describe": lambda frame: describe(frame, DESCRIPTION, False, None),
+        "describe+peer": lambda frame: describe(
+            frame, DESCRIPTION, False, None, peer
+        ),
+        "next_h2_frame": tcp_h2_describe._describe.next_h2_frame,
+        "observe": lambda frame: tcp_h2_describe._describe.observe(
+            frame, False, peer
+        ),
+        "simple_hexdump": lambda frame: (
+            tcp_h2_describe._describe.simple_hexdump(frame[9:])
+        ),
+        "payload_handler": None,
+    }
+
+
+def time_per_frame(func, frames):
+    """Time a function over frames.
+
+    Args:
+        func (Callable[[bytes], Any]): The function to time.
+        frames (List[bytes]): The frames.
+
+    Returns:
+        float: The time per frame (in nanoseconds).
+    """
+    start = time.perf_counter_ns()
+    for frame in frames:
+        func(frame)
+    return (time.perf_counter_ns() - start) / len(frames)
+
+
+def allocated_per_frame(func, frames):
+    """Measure the memory allocated by a function for each frame.
+
+    This is the peak of the memory traced by ``tracemalloc`` while a frame
+    is processed (relative to before), i.e. the size of the temporary
+    objects created for a frame.
+
+    Args:
+        func (Callable[[bytes], Any]): The function to measure.
+        frames (List[bytes]): The frames.
+
+    Returns:
+        float: The average number of bytes allocated per frame.
+    """
+    # NOTE: ``tracemalloc.reset_peak()`` was added in Python 3.9; before
+    #       that, tracing is restarted for each frame (which also resets the
+    #       peak, just more slowly).
+    reset_peak = getattr(tracemalloc, "reset_peak", None)
+    total = 0
+    tracemalloc.start()
+    try:
+        for frame in frames:
+            if reset_peak is None:
+                tracemalloc.stop()
+                tracemalloc.start()
+            else:
+                reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            func(frame)
+            _, peak = tracemalloc.get_traced_memory()
+            total += peak - before
+    finally:
+        tracemalloc.stop()
+    return total / len(frames)
+
+
+def run_all(count, repeat):
+    """Run every benchmark on every group of frames in the corpus.
+
+    Args:
+        count (int): The number of frames in each group.
+        repeat (int): The number of timed runs for each benchmark; the
+            fastest run is used.
+
+    Returns:
+        Dict[str, Dict[str, Dict[str, float]]]: The metrics, keyed by
+        benchmark and then by group of frames.
+    """
+    frame_corpus = corpus.generate(count=count)
+    cases = []
+    results = {}
+    for name, func in benchmarks(frame_corpus).items():
+        results[name] = {}
+        for group, frames in frame_corpus.frames.items():
+            group_func = func
+            if group_func is None:
+                group_func = _payload_handler(frames[0])
+            # NOTE: Run once before timing so that one-time costs (e.g.
+            #       creating stream state) are not included.
+            for frame in frames:
+                group_func(frame)
+            results[name][group] = {
+                "ns_per_frame": None,
+                "bytes_per_frame": allocated_per_frame(group_func, frames),
+            }
+            cases.append((results[name][group], group_func, frames))
+
+    # NOTE: The timed runs for each case are spread out over the whole run
+    #       (rather than back to back) so that a temporary slowdown of the
+    #       machine does not affect every run of one case.
+    for _ in range(repeat):
+        for metrics, group_func, frames in cases:
+            ns_per_frame = time_per_frame(group_func, frames)
+            if metrics["ns_per_frame"] is None:
+                metrics["ns_per_frame"] = ns_per_frame
+            else:
+                metrics["ns_per_frame"] = min(
+                    metrics["ns_per_frame"], ns_per_frame
+                )
+
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Compare results to a baseline.
+
+    Args:
+        results (Dict[str, Dict[str, Dict[str, float]]]): The metrics from
+            this run.
+        baseline (Dict[str, Dict[str, Dict[str, float]]]): The stored
+            metrics.
+        threshold (float): The relative increase (e.g. ``0.2`` for 20%)
+            that counts as a regression.
+
+    Returns:
+        Tuple[List[str], int]: The report lines and the number of
+        regressions.
+    """
+    lines = []
+    regressions = 0
+    for name, groups in results.items():
+        for group, metrics in groups.items():
+            for metric, value in metrics.items():
+                base_value = baseline.get(name, {}).get(group, {}).get(metric)
+                if not base_value:
+                    continue
+                change = (value - base_value) / base_value
+                marker = ""
+                if change > threshold:
+                    marker = "  <-- REGRESSION"
+                    regressions += 1
+                lines.append(
+                    f"{name:<17}{group:<15}{metric:<17}{base_value:>12.1f}"
+                    f"{value:>12.1f}{100.0 * change:>+9.1f}%{marker}"
+                )
+
+    return lines, regressions
+
+
+def describe_results(results):
+    """Describe the results of a run.
+
+    Args:
+        results (Dict[str, Dict[str, Dict[str, float]]]): The metrics.
+
+    Returns:
+        str: A table with one row per benchmark / group of frames.
+    """
+    lines = [f"{'benchmark':<17}{'frames':<15}{'ns/frame':>12}{'B/frame':>12}"]
+    for name, groups in results.items():
+        for group, metrics in groups.items():
+            lines.append(
+                f"{name:<17}{group:<15}"
+                f"{metrics['ns_per_frame']:>12.1f}"
+                f"{metrics['bytes_per_frame']:>12.1f}"
+            )
+    return "\n".join(lines)
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description="Microbenchmarks for describing HTTP/2 frames."
+    )
+    parser.add_argument(
+        "--baseline", help="A stored baseline (JSON) to compare against."
+    )
+    parser.add_argument(
+        "--save-baseline", help="Write the results (JSON) to this path."
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="The relative increase that counts as a regression.",
+    )
+    parser.add_argument(
+        "--count",
+        type=int,
+        default=DEFAULT_COUNT,
+        help="The number of frames of each type in the corpus.",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=DEFAULT_REPEAT,
+        help="The number of timed runs for each benchmark.",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    results = run_all(args.count, args.repeat)
+    print(describe_results(results))
+
+    if args.save_baseline is not None:
+        with open(args.save_baseline, "w") as file_obj:
+            json.dump(results, file_obj, indent=2, sort_keys=True)
+            file_obj.write("\n")
+
+    if args.baseline is not None and os.path.exists(args.baseline):
+        with open(args.baseline) as file_obj:
+            baseline = json.load(file_obj)
+        lines, regressions = compare(results, baseline, args.threshold)
+        print("")
+        print(
+            f"{'benchmark':<17}{'frames':<15}{'metric':<17}{'baseline':>12}"
+            f"{'current':>12}{'change':>10}"
+        )
+        print("\n".join(lines))
+        print(f"{regressions} regression(s) (threshold {args.threshold:.0%})")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
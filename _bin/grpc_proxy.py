@@ -10,224 +10,653 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import contextlib
+import argparse
+import collections
 import os
 import struct
-import sys
 import textwrap
 
+import google.protobuf.descriptor_pb2
+import google.protobuf.descriptor_pool
 import google.protobuf.message
+import google.protobuf.message_factory
 import grpc_reflection.v1alpha.reflection_pb2
 import tcp_h2_describe
+import tcp_h2_describe._decompress
 import tcp_h2_describe._describe
 
-import users_pb2
-
 
 simple_hexdump = tcp_h2_describe._describe.simple_hexdump
+remove_padding = tcp_h2_describe._describe.remove_padding
 FLAG_PADDED = tcp_h2_describe._describe.FLAG_PADDED
 STRUCT_L = struct.Struct(">L")
-REFLECTION_REQUEST = (
-    grpc_reflection.v1alpha.reflection_pb2.ServerReflectionRequest
-)
-REFLECTION_RESPONSE = (
-    grpc_reflection.v1alpha.reflection_pb2.ServerReflectionResponse
-)
-PB_TYPES = (
-    users_pb2.User,
-    users_pb2.AddUserResponse,
-    REFLECTION_REQUEST,
-    REFLECTION_RESPONSE,
+REFLECTION_PB2 = grpc_reflection.v1alpha.reflection_pb2
+FILE_DESCRIPTOR_PROTO = google.protobuf.descriptor_pb2.FileDescriptorProto
+# NOTE: This is populated (once) by ``main()`` before the proxy starts.
+METHODS = {}
+# NOTE: Messages larger than this are not buffered (or decoded). This
+#       matches the default maximum message size for a gRPC server and may be
+#       changed by ``main()``.
+MAX_MESSAGE_SIZE = 4 * 1024 * 1024
+# NOTE: For a message that is not decoded, ``pb_bytes`` is :data:`None` and
+#       ``skipped`` gives the reason. For a compressed message, ``pb_bytes``
+#       has been decompressed.
+GrpcMessage = collections.namedtuple(
+    "GrpcMessage", ["prefix", "length", "pb_bytes", "encoding", "skipped"]
 )
 
 
-def _redirect_stderr(destination, file_descriptor):
-    sys.stderr.close()
-    os.dup2(destination.fileno(), file_descriptor)
-    sys.stderr = os.fdopen(file_descriptor, "w")
+def _message_class(descriptor):
+    """Get the message class for a message descriptor.
 
+    Args:
+        descriptor (google.protobuf.descriptor.Descriptor): A message
+            descriptor.
 
-@contextlib.contextmanager
-def stderr_to_devnull():
-    # H/T: https://stackoverflow.com/a/17954769/1068170
-    file_descriptor = sys.stderr.fileno()
+    Returns:
+        type: The protobuf message class.
+    """
+    get_message_class = getattr(
+        google.protobuf.message_factory, "GetMessageClass", None
+    )
+    if get_message_class is None:
+        # NOTE: ``GetMessageClass()`` was added in ``protobuf==4.21.0``.
+        factory = google.protobuf.message_factory.MessageFactory()
+        return factory.GetPrototype(descriptor)
 
-    with os.fdopen(os.dup(file_descriptor), "w") as old_stderr:
-        with open(os.devnull, "w") as file_obj:
-            _redirect_stderr(file_obj, file_descriptor)
+    return get_message_class(descriptor)
 
-        try:
-            yield  # allow code to be run with the redirected stdout
-        finally:
-            _redirect_stderr(old_stderr, file_descriptor)
 
+def build_method_index(file_descriptors):
+    """Index the gRPC methods defined in a collection of ``.proto`` files.
 
-def _maybe_parse(pb_bytes, pb_class):
-    """Attempt to parse a protobuf to a given message class.
+    .. gRPC path: https://github.com/grpc/grpc/blob/master/doc/PROTOCOL-HTTP2.md
 
     Args:
-        pb_bytes (str): A raw protobuf serialized as a bytestring.
-        pb_class (type): A protobuf message type.
+        file_descriptors (Iterable[google.protobuf.descriptor.FileDescriptor]):
+            The files containing service definitions.
 
     Returns:
-        object: An instance of ``pb_class`` if parsing succeeded, otherwise
-        :data:`None`.
+        Dict[str, Tuple[type, type]]: Mapping from the ``:path`` for a method
+        (e.g. ``/users.v1.Users/AddUser``, see `gRPC path`_) to the pair of
+        input and output message classes.
     """
-    pb = pb_class()
-    try:
-        # NOTE: If ``ParseFromString()`` fails, the underlying Python binary
-        #       extension may print a message to STDERR, so we temporarily
-        #       send STDERR to ``/dev/null`` during the function call.
-        with stderr_to_devnull():
-            pb.ParseFromString(pb_bytes)
-    except google.protobuf.message.DecodeError:
-        return None
+    methods = {}
+    for file_descriptor in file_descriptors:
+        for service in file_descriptor.services_by_name.values():
+            for method in service.methods:
+                path = f"/{service.full_name}/{method.name}"
+                methods[path] = (
+                    _message_class(method.input_type),
+                    _message_class(method.output_type),
+                )
 
-    pb.DiscardUnknownFields()
-    if pb.SerializeToString() == pb_bytes:
-        return pb
+    return methods
 
-    return None
 
+def _add_file_protos(pool, file_protos):
+    """Add serialized ``.proto`` files to a descriptor pool.
 
-def _parse_pb_prune(matches):
-    """Prune the list of matches in for a given serialized protobuf.
+    Each file is added after its dependencies, since a descriptor pool
+    requires dependencies to be added first.
 
     Args:
-        matches (list): A list of matched protobufs.
+        pool (google.protobuf.descriptor_pool.DescriptorPool): The pool to
+            add to.
+        file_protos (Dict[str, FileDescriptorProto]): The files to add,
+            keyed by name.
 
     Returns:
-        list: A (potentially pruned) subset of ``matches``.
+        List[google.protobuf.descriptor.FileDescriptor]: The files that were
+        added.
     """
-    if len(matches) != 2:
-        return matches
+    added = {}
 
-    pb1, pb2 = matches
-    # Break a tie between reflection request/response by just "guessing" it is
-    # a response.
-    if isinstance(pb1, REFLECTION_REQUEST) and isinstance(
-        pb2, REFLECTION_RESPONSE
-    ):
-        return [pb2]
-    if isinstance(pb1, REFLECTION_RESPONSE) and isinstance(
-        pb2, REFLECTION_REQUEST
-    ):
-        return [pb1]
+    def add(name):
+        if name in added:
+            return
+        file_proto = file_protos[name]
+        for dependency in file_proto.dependency:
+            if dependency in file_protos:
+                add(dependency)
+        pool.Add(file_proto)
+        added[name] = pool.FindFileByName(name)
 
-    return matches
+    for name in file_protos.keys():
+        add(name)
 
+    return list(added.values())
 
-def parse_pb(pb_bytes):
-    """Parse a serialized protobuf and display with message name.
+
+def load_descriptor_set(filename):
+    """Load the ``.proto`` files in a ``FileDescriptorSet``.
+
+    A ``FileDescriptorSet`` can be created with ``protoc``, e.g.
+    ``protoc --include_imports --descriptor_set_out=users.pb users.proto``.
 
     Args:
-        pb_bytes (str): A raw protobuf serialized as a bytestring.
+        filename (str): The path to a serialized ``FileDescriptorSet``.
 
     Returns:
-        Tuple[str, str]: Pair of the full name of the matched message type and
-        a string representation of the protobuf (with field names, etc.).
-
-    Raises:
-        ValueError: If ``pb_bytes`` could not be matched to a message type.
+        List[google.protobuf.descriptor.FileDescriptor]: The files in the
+        set.
     """
-    matches = []
-    for pb_class in PB_TYPES:
-        pb = _maybe_parse(pb_bytes, pb_class)
-        if pb is not None:
-            matches.append(pb)
-
-    matches = _parse_pb_prune(matches)
-    if len(matches) != 1:
-        raise ValueError(
-            "Serialized protobuf could not be matched to a message type",
-            pb_bytes,
-            matches,
+    with open(filename, "rb") as file_obj:
+        descriptor_set = (
+            google.protobuf.descriptor_pb2.FileDescriptorSet.FromString(
+                file_obj.read()
+            )
         )
 
-    pb = matches[0]
-    return pb.DESCRIPTOR.full_name, str(pb).rstrip()
+    file_protos = {
+        file_proto.name: file_proto for file_proto in descriptor_set.file
+    }
+    pool = google.protobuf.descriptor_pool.DescriptorPool()
+    return _add_file_protos(pool, file_protos)
 
 
-def handle_data_payload(frame_payload, flags):
-    """Handle a DATA HTTP/2 frame payload.
+def _reflection_requests(service_names):
+    """Generate server reflection requests.
 
-    This assumes **every** DATA frame is a serialized protobuf sent over
-    gRPC with a length prefix.
+    Args:
+        service_names (Optional[List[str]]): If :data:`None`, a request to
+            list the services will be generated; otherwise a request for the
+            file containing each service is generated.
 
-    .. DATA spec: https://http2.github.io/http2-spec/#DATA
+    Yields:
+        ServerReflectionRequest: The requests to send.
+    """
+    if service_names is None:
+        yield REFLECTION_PB2.ServerReflectionRequest(list_services="")
+        return
+
+    for service_name in service_names:
+        yield REFLECTION_PB2.ServerReflectionRequest(
+            file_containing_symbol=service_name
+        )
 
-    See `DATA spec`_.
+
+def query_reflection(server_host, server_port):
+    """Load the ``.proto`` files from a server via server reflection.
+
+    .. server reflection: https://github.com/grpc/grpc/blob/master/doc/server-reflection.md
+
+    This is intended to be called **once** at startup (before any traffic is
+    proxied). See `server reflection`_.
 
     Args:
-        frame_payload (bytes): The frame payload to be parsed.
-        flags (int): The flags for the frame payload.
+        server_host (str): The host name where the server is running.
+        server_port (int): The port the server is running on.
 
     Returns:
-        str: The deserialized protobuf from ``frame_payload``.
+        List[google.protobuf.descriptor.FileDescriptor]: The files that
+        define the services on the server (and their dependencies).
+    """
+    # NOTE: ``grpc`` is only needed when server reflection is used.
+    import grpc
+    import grpc_reflection.v1alpha.reflection_pb2_grpc
+
+    reflection_grpc = grpc_reflection.v1alpha.reflection_pb2_grpc
+    address = f"{server_host}:{server_port}"
+    with grpc.insecure_channel(address) as channel:
+        stub = reflection_grpc.ServerReflectionStub(channel)
+        service_names = []
+        for response in stub.ServerReflectionInfo(_reflection_requests(None)):
+            service_names.extend(
+                service.name
+                for service in response.list_services_response.service
+            )
 
-    Raises:
-        NotImplementedError: If ``flags`` has ``PADDED`` set.
-        NotImplementedError: If the first byte is ``\x01``.
-        ValueError: If the first byte is not ``\x00`` or ``\x01``.
-        ValueError: If the length of ``frame_payload`` does not match the
-            length prefix.
+        file_protos = {}
+        responses = stub.ServerReflectionInfo(
+            _reflection_requests(service_names)
+        )
+        for response in responses:
+            file_response = response.file_descriptor_response
+            for file_proto_bytes in file_response.file_descriptor_proto:
+                file_proto = FILE_DESCRIPTOR_PROTO.FromString(file_proto_bytes)
+                file_protos[file_proto.name] = file_proto
+
+    pool = google.protobuf.descriptor_pool.DescriptorPool()
+    return _add_file_protos(pool, file_protos)
+
+
+def _example_file_descriptors():
+    """Get the ``.proto`` files for the example users service.
+
+    Returns:
+        List[google.protobuf.descriptor.FileDescriptor]: The files for the
+        example service (from ``_grpc/users_pb2.py``).
+    """
+    import users_pb2
+
+    return [users_pb2.DESCRIPTOR]
+
+
+class MessageFramer:
+    """Reassemble gRPC length-prefixed messages across DATA frames.
+
+    .. gRPC length-prefixed message: https://github.com/grpc/grpc/blob/master/doc/PROTOCOL-HTTP2.md
+
+    Each message is a 1-byte compressed flag, a 4-byte length and then the
+    message itself. See `gRPC length-prefixed message`_. At most one
+    (partial) message is held at a time and a message larger than
+    ``max_message_size`` is skipped rather than held. Compressed messages
+    are decompressed as their bytes arrive, so only the decompressed
+    message is held.
+
+    Args:
+        max_message_size (int): The largest message that will be held.
+        encoding (Optional[str]): The ``grpc-encoding`` for compressed
+            messages.
     """
-    if flags & FLAG_PADDED == FLAG_PADDED:
-        raise NotImplementedError(
-            "PADDED flag not currently supported for data"
+
+    def __init__(self, max_message_size, encoding=None):
+        self.max_message_size = max_message_size
+        self.encoding = encoding
+        self.prefix = bytearray()
+        self.length = None
+        self.received = 0
+        self.message = None
+        self.decompressor = None
+        self.skipped = None
+
+    def _start_message(self):
+        """Start a message once the 5-byte prefix has been received."""
+        self.length, = STRUCT_L.unpack_from(self.prefix, 1)
+        self.received = 0
+        self.message = None
+        self.decompressor = None
+        self.skipped = None
+        if self.prefix[0] == 1:
+            self.decompressor = tcp_h2_describe._decompress.make_decompressor(
+                self.encoding, self.max_message_size
+            )
+            if self.decompressor is None:
+                self.skipped = f"unsupported grpc-encoding {self.encoding}"
+                return
+        elif self.length > self.max_message_size:
+            self.skipped = f"larger than {self.max_message_size} bytes"
+            return
+
+        self.message = bytearray()
+
+    def _finish_message(self):
+        """Finish the current message.
+
+        Returns:
+            GrpcMessage: The message that was just completed.
+        """
+        pb_bytes = None
+        encoding = None
+        if self.decompressor is not None:
+            encoding = self.decompressor.encoding
+            self.skipped = self.decompressor.describe_status()
+        if self.skipped is None:
+            pb_bytes = bytes(self.message)
+
+        message = GrpcMessage(
+            bytes(self.prefix), self.length, pb_bytes, encoding, self.skipped
         )
+        self.prefix = bytearray()
+        self.length = None
+        self.message = None
+        self.decompressor = None
+        return message
+
+    def feed(self, data):
+        """Add the data from a DATA frame.
+
+        Args:
+            data (bytes): The (unpadded) data in a DATA frame.
+
+        Returns:
+            List[GrpcMessage]: The messages completed by ``data``.
+        """
+        messages = []
+        data = memoryview(data)
+        while data:
+            if self.length is None:
+                needed = 5 - len(self.prefix)
+                self.prefix += data[:needed]
+                data = data[needed:]
+                if len(self.prefix) < 5:
+                    break
+                self._start_message()
+
+            chunk = data[: self.length - self.received]
+            data = data[len(chunk) :]
+            self.received += len(chunk)
+            if self.message is not None:
+                if self.decompressor is None:
+                    self.message += chunk
+                else:
+                    self.message += self.decompressor.decompress(chunk)
+
+            if self.received == self.length:
+                messages.append(self._finish_message())
+
+        return messages
+
+    def describe_partial(self):
+        """Describe the message that is currently incomplete (if any).
+
+        Returns:
+            Optional[str]: The progress of the current message, or
+            :data:`None` if the last frame ended on a message boundary.
+        """
+        if self.length is not None:
+            return (
+                f"gRPC Message = ({self.received} of {self.length} bytes "
+                "received)"
+            )
+        if self.prefix:
+            return "gRPC Message = (length prefix incomplete)"
+        return None
 
-    if frame_payload == b"":
-        return ""
 
-    # See: https://github.com/grpc/grpc/blob/master/doc/PROTOCOL-HTTP2.md
-    is_compressed = frame_payload[:1]
-    if is_compressed != b"\x00":
-        if is_compressed == b"\x01":
-            raise NotImplementedError(
-                "Protobuf over gRPC only supported without compression",
-                frame_payload,
+class GrpcStream:
+    """The gRPC method (and message types) for an HTTP/2 stream.
+
+    Args:
+        stream (Optional[tcp_h2_describe._state.StreamState]): The HTTP/2
+            stream.
+        path (Optional[str]): The ``:path`` of the request.
+        request_class (Optional[type]): The message class for the request
+            (i.e. the method input type).
+        response_class (Optional[type]): The message class for the response
+            (i.e. the method output type).
+    """
+
+    def __init__(self, stream, path, request_class, response_class):
+        self.stream = stream
+        self.path = path
+        self.request_class = request_class
+        self.response_class = response_class
+        self.request_framer = None
+        self.response_framer = None
+
+    def _encoding(self, request):
+        """Get the ``grpc-encoding`` for one direction of the stream.
+
+        Args:
+            request (bool): Indicates if the request (as opposed to the
+                response) encoding is needed.
+
+        Returns:
+            Optional[str]: The encoding (if the headers were seen).
+        """
+        if self.stream is None:
+            return None
+        return self.stream.header_value("grpc-encoding", request=request)
+
+    def framer(self, request):
+        """Get the message framer for one direction of the stream.
+
+        The framer is created when it is first needed, since the response
+        headers (with the response ``grpc-encoding``) are not sent until
+        after the request has started.
+
+        Args:
+            request (bool): Indicates if the request (as opposed to the
+                response) framer is needed.
+
+        Returns:
+            MessageFramer: The framer.
+        """
+        if request:
+            if self.request_framer is None:
+                self.request_framer = MessageFramer(
+                    MAX_MESSAGE_SIZE, self._encoding(True)
+                )
+            return self.request_framer
+
+        if self.response_framer is None:
+            self.response_framer = MessageFramer(
+                MAX_MESSAGE_SIZE, self._encoding(False)
             )
+        return self.response_framer
 
-        raise ValueError(
-            "Unexpected compressed flag for gRPC", is_compressed, frame_payload
-        )
 
-    # NOTE: This will fail if ``frame_payload`` has fewer than 5 bytes.
-    length, = STRUCT_L.unpack(frame_payload[1:5])
-    if len(frame_payload) != 5 + length:
+def get_grpc_stream(stream):
+    """Get the gRPC method for a stream.
+
+    The lookup (by ``:path``) is done once per stream and then cached on the
+    stream.
+
+    Args:
+        stream (tcp_h2_describe._state.StreamState): The stream a DATA frame
+            was sent on.
+
+    Returns:
+        GrpcStream: The gRPC method for the stream.
+    """
+    grpc_stream = stream.handler_state
+    if grpc_stream is None:
+        path = stream.header_value(":path")
+        request_class, response_class = METHODS.get(path, (None, None))
+        grpc_stream = GrpcStream(stream, path, request_class, response_class)
+        stream.handler_state = grpc_stream
+
+    return grpc_stream
+
+
+def parse_pb(pb_bytes, pb_class):
+    """Parse a serialized protobuf and display with message name.
+
+    Args:
+        pb_bytes (bytes): A raw protobuf serialized as a bytestring.
+        pb_class (type): The protobuf message type.
+
+    Returns:
+        Tuple[str, str]: Pair of the full name of the message type and a
+        string representation of the protobuf (with field names, etc.).
+
+    Raises:
+        google.protobuf.message.DecodeError: If ``pb_bytes`` is not a valid
+            serialized ``pb_class``.
+    """
+    pb = pb_class.FromString(pb_bytes)
+    return pb.DESCRIPTOR.full_name, str(pb).rstrip()
+
+
+def describe_message(message, pb_class, path):
+    """Describe a gRPC length-prefixed message.
+
+    Args:
+        message (GrpcMessage): The message to describe.
+        pb_class (Optional[type]): The protobuf message type (if known).
+        path (Optional[str]): The ``:path`` of the request (used if the
+            message type is not known).
+
+    Returns:
+        List[str]: The lines describing the message.
+
+    Raises:
+        ValueError: If the compressed flag is not ``\x00`` or ``\x01``.
+    """
+    is_compressed = message.prefix[0]
+    if is_compressed not in (0, 1):
         raise ValueError(
-            "Frame payload has unexpected length", frame_payload, 5 + length
+            "Unexpected compressed flag for gRPC", is_compressed, message
         )
-    length_bytes = simple_hexdump(frame_payload[1:5])
 
-    pb_bytes = frame_payload[5:]
+    length_bytes = simple_hexdump(message.prefix[1:5])
     parts = [
-        "gRPC Compressed Flag = 0 (00)",
-        f"Protobuf Length = {length} ({length_bytes})",
+        f"gRPC Compressed Flag = {is_compressed} ({message.prefix[:1].hex()})",
+        f"Protobuf Length = {message.length} ({length_bytes})",
     ]
-    if length == 0:
-        return "\n".join(parts)
+    pb_bytes = message.pb_bytes
+    if pb_bytes is None:
+        parts.append(
+            f"Protobuf Message = ({message.length} bytes, skipped; "
+            f"{message.skipped})"
+        )
+        return parts
+    if message.encoding is not None:
+        parts.append(
+            f"Decompressed Length = {len(pb_bytes)} ({message.encoding})"
+        )
+    if message.length == 0:
+        return parts
+
+    if pb_class is None:
+        parts.append(f"Protobuf Message = (unknown method {path})")
+    else:
+        try:
+            pb_name, pb_str = parse_pb(pb_bytes, pb_class)
+            parts.extend(
+                [
+                    f"Protobuf Message ({pb_name}) =",
+                    textwrap.indent(pb_str, "   "),
+                ]
+            )
+        except google.protobuf.message.DecodeError:
+            parts.append(
+                "Protobuf Message = (failed to parse as "
+                f"{pb_class.DESCRIPTOR.full_name})"
+            )
 
-    pb_name, pb_str = parse_pb(pb_bytes)
     parts.extend(
         [
-            f"Protobuf Message ({pb_name}) =",
-            textwrap.indent(pb_str, "   "),
             "Hexdump (Protobuf Message) =",
             textwrap.indent(simple_hexdump(pb_bytes), "   "),
         ]
     )
+    return parts
+
+
+def handle_data_payload(frame_payload, flags, context=None):
+    """Handle a DATA HTTP/2 frame payload.
+
+    This assumes **every** DATA frame is part of a stream of serialized
+    protobufs sent over gRPC with a length prefix. Messages may be split
+    across DATA frames (or several may be in one frame), so each message is
+    described once the frame that completes it is seen. The message type is
+    determined by the gRPC method in the ``:path`` of the request for the
+    stream.
+
+    .. DATA spec: https://http2.github.io/http2-spec/#DATA
+
+    See `DATA spec`_.
+
+    Args:
+        frame_payload (bytes): The frame payload to be parsed.
+        flags (int): The flags for the frame payload.
+        context (Optional[tcp_h2_describe._state.FrameContext]): The context
+            for the frame. Without a context (or a stream), messages can't
+            be reassembled across DATA frames.
+
+    Returns:
+        str: The deserialized protobuf(s) completed by ``frame_payload``.
+
+    Raises:
+        ValueError: If the compressed flag for a message is not ``\x00`` or
+            ``\x01``.
+    """
+    frame_payload = remove_padding(frame_payload, flags)
+    if frame_payload == b"":
+        return ""
+
+    is_client = True
+    if context is None or context.stream is None:
+        grpc_stream = GrpcStream(None, None, None, None)
+    else:
+        grpc_stream = get_grpc_stream(context.stream)
+        is_client = context.peer.is_client
+
+    framer = grpc_stream.framer(is_client)
+    if is_client:
+        pb_class = grpc_stream.request_class
+    else:
+        pb_class = grpc_stream.response_class
+
+    parts = []
+    for message in framer.feed(frame_payload):
+        parts.extend(describe_message(message, pb_class, grpc_stream.path))
+    partial = framer.describe_partial()
+    if partial is not None:
+        parts.append(partial)
+
     return "\n".join(parts)
 
 
+def get_args():
+    parser = argparse.ArgumentParser(
+        description="Proxy a gRPC server and describe each message."
+    )
+    parser.add_argument(
+        "--proxy-port",
+        type=int,
+        default=24909,
+        help="The port that will be used for running the proxy.",
+    )
+    parser.add_argument(
+        "--server-port",
+        type=int,
+        default=int(os.environ.get("GRPC_PORT", 50051)),
+        help="The port for the server that is being proxied.",
+    )
+    parser.add_argument(
+        "--server-host",
+        default="localhost",
+        help="The hostname for the server that is being proxied.",
+    )
+    parser.add_argument(
+        "--descriptor-set",
+        dest="descriptor_sets",
+        action="append",
+        default=[],
+        help=(
+            "A serialized FileDescriptorSet (e.g. from protoc "
+            "--descriptor_set_out) with the services to describe. Can be "
+            "used more than once."
+        ),
+    )
+    parser.add_argument(
+        "--max-message-size",
+        type=int,
+        default=MAX_MESSAGE_SIZE,
+        help=(
+            "The size (in bytes) of the largest gRPC message that will be "
+            "buffered and decoded; larger messages are skipped."
+        ),
+    )
+    parser.add_argument(
+        "--reflection",
+        action="store_true",
+        help=(
+            "Load the services to describe from the server (via server "
+            "reflection) at startup."
+        ),
+    )
+    return parser.parse_args()
+
+
 def main():
-    tcp_h2_describe.register_payload_handler("DATA", handle_data_payload)
+    global MAX_MESSAGE_SIZE
+
+    args = get_args()
+    MAX_MESSAGE_SIZE = args.max_message_size
+    file_descriptors = [REFLECTION_PB2.DESCRIPTOR]
+    for filename in args.descriptor_sets:
+        file_descriptors.extend(load_descriptor_set(filename))
+    if args.reflection:
+        file_descriptors.extend(
+            query_reflection(args.server_host, args.server_port)
+        )
+    if not args.descriptor_sets and not args.reflection:
+        file_descriptors.extend(_example_file_descriptors())
+    METHODS.update(build_method_index(file_descriptors))
+
+    tcp_h2_describe.register_payload_handler(
+        "DATA", handle_data_payload, with_context=True
+    )
     # See: https://github.com/grpc/proposal/blob/master/G1-true-binary-metadata.md
     tcp_h2_describe.register_setting(0xFE03, "GRPC_ALLOW_TRUE_BINARY_METADATA")
-    proxy_port = 24909
-    server_port = int(os.environ.get("GRPC_PORT", 50051))
-    tcp_h2_describe.serve_proxy(proxy_port, server_port)
+    tcp_h2_describe.serve_proxy(
+        args.proxy_port, args.server_port, server_host=args.server_host
+    )
 
 
 if __name__ == "__main__":
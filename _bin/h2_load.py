@@ -0,0 +1,488 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Open-loop HTTP/2 load generator.
+
+Opens ``--connections`` connections (each allowing at most ``--concurrency``
+streams at once) and sends GET requests at a fixed total ``--rate``, using
+raw frames from ``tcp_h2_describe._build``.
+
+Each request has an **intended** send time on a fixed schedule. When all of
+the streams on a connection are busy, the due requests wait (rather than
+the schedule slowing down), and latency is measured from the intended send
+time so that the wait is included, i.e. there is no coordinated omission.
+The service time (measured from the actual send time) is reported as well.
+"""
+
+import argparse
+import select
+import socket
+import threading
+import time
+
+import hpack
+import tcp_h2_describe._build
+import tcp_h2_describe._describe
+
+
+DATA = 0x0
+HEADERS = 0x1
+RST_STREAM = 0x3
+SETTINGS = 0x4
+PING = 0x6
+GOAWAY = 0x7
+CONTINUATION = 0x9
+FLAG_ACK = 0x1
+FLAG_END_STREAM = 0x1
+FLAG_END_HEADERS = 0x4
+SETTINGS_ENABLE_PUSH = 0x2
+SETTINGS_INITIAL_WINDOW_SIZE = 0x4
+MAX_WINDOW_SIZE = 0x7FFFFFFF
+# NOTE: The connection flow control window starts at 65535 (and can only be
+#       changed with a WINDOW_UPDATE).
+DEFAULT_WINDOW_SIZE = 0xFFFF
+RECV_SIZE = 0x40000
+PERCENTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+class LoadConnection:
+    """A single connection sending requests on a fixed schedule.
+
+    Args:
+        address (Tuple[str, int]): The host and port to connect to.
+        path (str): The path for each request.
+        concurrency (int): The maximum number of concurrent streams.
+        first_send (float): The intended send time (``perf_counter()``) of
+            the first request.
+        interval (float): The time between intended sends.
+        end (float): Requests are only scheduled before this time.
+        drain_timeout (float): The time (after ``end``) to wait for
+            outstanding responses.
+    """
+
+    def __init__(
+        self,
+        address,
+        path,
+        concurrency,
+        first_send,
+        interval,
+        end,
+        drain_timeout,
+    ):
+        self.address = address
+        self.path = path
+        self.concurrency = concurrency
+        self.next_send = first_send
+        self.interval = interval
+        self.end = end
+        self.deadline = end + drain_timeout
+        self.encoder = hpack.Encoder()
+        self.decoder = hpack.Decoder()
+        self.sock = None
+        self.next_stream_id = 1
+        # NOTE: Keyed by stream ID, values are ``(intended, sent)`` times.
+        self.in_flight = {}
+        self.header_block = None
+        self.latencies = []
+        self.service_times = []
+        self.statuses = {}
+        self.errors = 0
+        self.goaway = False
+        self.failure = None
+
+    def connect(self):
+        """Connect and send the client connection preface."""
+        self.sock = socket.create_connection(self.address)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        build = tcp_h2_describe._build
+        # NOTE: The receive windows are opened all the way so that responses
+        #       are only limited by the connection window, which is topped
+        #       up as DATA is received.
+        self.sock.sendall(
+            tcp_h2_describe._describe.PREFACE
+            + build.build_settings(
+                [
+                    (SETTINGS_ENABLE_PUSH, 0),
+                    (SETTINGS_INITIAL_WINDOW_SIZE, MAX_WINDOW_SIZE),
+                ]
+            )
+            + build.build_window_update(
+                0, MAX_WINDOW_SIZE - DEFAULT_WINDOW_SIZE
+            )
+        )
+
+    def send_due(self, now):
+        """Send every request that is due (if a stream is available).
+
+        Args:
+            now (float): The current time.
+        """
+        frames = []
+        while (
+            self.next_send <= now
+            and self.next_send < self.end
+            and len(self.in_flight) < self.concurrency
+        ):
+            headers = [
+                (":method", "GET"),
+                (":scheme", "http"),
+                (":authority", f"{self.address[0]}:{self.address[1]}"),
+                (":path", self.path),
+            ]
+            stream_id = self.next_stream_id
+            self.next_stream_id += 2
+            frames.append(
+                tcp_h2_describe._build.build_headers(
+                    self.encoder, headers, stream_id, end_stream=True
+                )
+            )
+            self.in_flight[stream_id] = (self.next_send, now)
+            self.next_send += self.interval
+
+        if frames:
+            self.sock.sendall(b"".join(frames))
+
+    def finish(self, stream_id, now, error=False):
+        """Record a response that has ended.
+
+        Args:
+            stream_id (int): The stream for the response.
+            now (float): The current time.
+            error (Optional[bool]): Indicates if the stream was reset.
+        """
+        times = self.in_flight.pop(stream_id, None)
+        if times is None:
+            return
+        if error:
+            self.errors += 1
+            return
+
+        intended, sent = times
+        self.latencies.append(now - intended)
+        self.service_times.append(now - sent)
+
+    def on_header_block(self, header_block):
+        """Record the status in a complete header block.
+
+        Args:
+            header_block (bytes): The header block.
+        """
+        for name, value in self.decoder.decode(header_block):
+            if name == ":status":
+                self.statuses[value] = self.statuses.get(value, 0) + 1
+
+    def on_frame(self, type_byte, flags, stream_id, frame_payload, now):
+        """Handle a frame received from the server.
+
+        Args:
+            type_byte (int): The frame type.
+            flags (int): The flags for the frame.
+            stream_id (int): The stream identifier.
+            frame_payload (bytes): The frame payload.
+            now (float): The time the frame was received.
+
+        Returns:
+            bytes: Any frames that should be sent in response.
+        """
+        build = tcp_h2_describe._build
+        end_stream = False
+        if type_byte == DATA:
+            end_stream = flags & FLAG_END_STREAM == FLAG_END_STREAM
+        elif type_byte in (HEADERS, CONTINUATION):
+            if type_byte == HEADERS:
+                end_stream = flags & FLAG_END_STREAM == FLAG_END_STREAM
+                self.header_block = (
+                    tcp_h2_describe._describe.header_block_fragment(
+                        type_byte, flags, frame_payload
+                    )
+                )
+            else:
+                self.header_block += frame_payload
+            if flags & FLAG_END_HEADERS == FLAG_END_HEADERS:
+                self.on_header_block(self.header_block)
+                self.header_block = None
+        elif type_byte == RST_STREAM:
+            self.finish(stream_id, now, error=True)
+        elif type_byte == SETTINGS and flags & FLAG_ACK == 0:
+            return build.build_settings(ack=True)
+        elif type_byte == PING and flags & FLAG_ACK == 0:
+            return build.build_ping(frame_payload, ack=True)
+        elif type_byte == GOAWAY:
+            self.goaway = True
+
+        if end_stream:
+            self.finish(stream_id, now)
+        return b""
+
+    def run(self):
+        """Send requests until the schedule ends and responses are drained.
+
+        If the connection fails (e.g. it is refused or reset, or the server
+        sends an invalid header block), the reason is kept in ``failure``.
+        Either way, the requests that did not complete are counted as errors.
+        """
+        try:
+            self._run()
+        except (OSError, hpack.HPACKError) as exc:
+            self.failure = f"{type(exc).__name__}: {exc}"
+        finally:
+            # NOTE: Requests that never finished (or were never sent because
+            #       the connection closed) count as errors.
+            self.errors += len(self.in_flight)
+            while self.next_send < self.end:
+                self.errors += 1
+                self.next_send += self.interval
+            if self.sock is not None:
+                self.sock.close()
+
+    def _run(self):
+        """Connect, send the scheduled requests and read the responses.
+
+        Raises:
+            OSError: If the connection fails.
+            hpack.HPACKError: If a header block from the server is invalid.
+        """
+        self.connect()
+        buffered = b""
+        while not self.goaway:
+            now = time.perf_counter()
+            self.send_due(now)
+            scheduled = self.next_send < self.end
+            if not scheduled and not self.in_flight:
+                break
+            if now > self.deadline:
+                break
+
+            timeout = self.deadline - now
+            if scheduled and len(self.in_flight) < self.concurrency:
+                timeout = min(timeout, self.next_send - now)
+            readable, _, _ = select.select(
+                [self.sock], [], [], max(timeout, 0.0)
+            )
+            if not readable:
+                continue
+
+            chunk = self.sock.recv(RECV_SIZE)
+            if not chunk:
+                break
+            now = time.perf_counter()
+            buffered, to_send = self.on_chunk(buffered + chunk, now)
+            if to_send:
+                self.sock.sendall(to_send)
+
+    def on_chunk(self, h2_frames, now):
+        """Handle the complete frames in data received from the server.
+
+        Args:
+            h2_frames (bytes): The received data.
+            now (float): The time the data was received.
+
+        Returns:
+            Tuple[bytes, bytes]: The data after the last complete frame and
+            any frames that should be sent in response.
+        """
+        to_send = []
+        data_length = 0
+        offset = 0
+        while len(h2_frames) - offset >= 9:
+            length_high, length_low, type_byte, flags, stream_id = (
+                tcp_h2_describe._describe.STRUCT_FRAME_HEADER.unpack_from(
+                    h2_frames, offset
+                )
+            )
+            frame_end = offset + 9 + ((length_high << 8) | length_low)
+            if frame_end > len(h2_frames):
+                break
+
+            frame_payload = h2_frames[offset + 9 : frame_end]
+            if type_byte == DATA:
+                data_length += len(frame_payload)
+            to_send.append(
+                self.on_frame(
+                    type_byte,
+                    flags,
+                    stream_id & tcp_h2_describe._describe.STREAM_ID_MASK,
+                    frame_payload,
+                    now,
+                )
+            )
+            offset = frame_end
+
+        if data_length:
+            to_send.append(
+                tcp_h2_describe._build.build_window_update(0, data_length)
+            )
+        return h2_frames[offset:], b"".join(to_send)
+
+
+def percentile(sorted_values, fraction):
+    """Compute a percentile (nearest rank) of sorted values.
+
+    Args:
+        sorted_values (List[float]): The (non-empty) sorted values.
+        fraction (float): The percentile as a fraction, e.g. ``0.99``.
+
+    Returns:
+        float: The percentile.
+    """
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def describe_times(label, values):
+    """Describe the distribution of (latency) times.
+
+    Args:
+        label (str): The label for the times.
+        values (List[float]): The times (in seconds).
+
+    Returns:
+        str: The percentiles and maximum, in milliseconds.
+    """
+    if not values:
+        return f"{label}: no responses"
+
+    values = sorted(values)
+    parts = [
+        f"p{100.0 * fraction:g} = {1000.0 * percentile(values, fraction):.3f}"
+        for fraction in PERCENTILES
+    ]
+    parts.append(f"max = {1000.0 * values[-1]:.3f}")
+    return f"{label} (ms): {', '.join(parts)}"
+
+
+def run_load(args):
+    """Run the load test.
+
+    Args:
+        args (argparse.Namespace): The parsed command line arguments.
+
+    Returns:
+        str: The report.
+    """
+    interval = args.connections / args.rate
+    start = time.perf_counter() + 0.1
+    end = start + args.duration
+    connections = [
+        LoadConnection(
+            (args.host, args.port),
+            args.path,
+            args.concurrency,
+            # NOTE: The connections are staggered so that the requests are
+            #       evenly spaced overall.
+            start + index / args.rate,
+            interval,
+            end,
+            args.drain_timeout,
+        )
+        for index in range(args.connections)
+    ]
+    threads = [
+        threading.Thread(target=connection.run, daemon=True)
+        for connection in connections
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies = []
+    service_times = []
+    statuses = {}
+    errors = 0
+    for connection in connections:
+        latencies.extend(connection.latencies)
+        service_times.extend(connection.service_times)
+        for status, count in connection.statuses.items():
+            statuses[status] = statuses.get(status, 0) + count
+        errors += connection.errors
+    failures = [
+        connection.failure
+        for connection in connections
+        if connection.failure is not None
+    ]
+    failure_line = f"Failed connections = {len(failures)}"
+    if failures:
+        failure_line += f" (first: {failures[0]})"
+
+    status_parts = ", ".join(
+        f"{status}: {count}" for status, count in sorted(statuses.items())
+    )
+    return "\n".join(
+        [
+            f"Target rate = {args.rate:g} req/s "
+            f"({args.connections} connection(s) x "
+            f"{args.concurrency} stream(s))",
+            f"Achieved rate = {len(latencies) / args.duration:.1f} req/s",
+            f"Completed = {len(latencies)}, Errors = {errors}",
+            failure_line,
+            f"Statuses = {{{status_parts}}}",
+            describe_times("Latency", latencies),
+            describe_times("Service time", service_times),
+        ]
+    )
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description="Open-loop HTTP/2 load generator."
+    )
+    parser.add_argument(
+        "--host", default="localhost", help="The host to connect to."
+    )
+    parser.add_argument(
+        "--port", type=int, default=24909, help="The port to connect to."
+    )
+    parser.add_argument(
+        "--path", default="/", help="The path for each request."
+    )
+    parser.add_argument(
+        "--connections",
+        type=int,
+        default=1,
+        help="The number of connections.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=10,
+        help="The maximum number of concurrent streams per connection.",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=100.0,
+        help="The total request rate (per second), over all connections.",
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=10.0,
+        help="The time (in seconds) to send requests for.",
+    )
+    parser.add_argument(
+        "--drain-timeout",
+        type=float,
+        default=5.0,
+        help="The time (in seconds) to wait for outstanding responses.",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    print(run_load(args))
+
+
+if __name__ == "__main__":
+    main()
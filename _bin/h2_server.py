@@ -1,52 +1,200 @@
 # Via: https://python-hyper.org/projects/h2/en/stable/basic-usage.html
 
+import argparse
 import json
 import socket
+import threading
 
 import h2.connection
 import h2.events
 
+try:
+    import h2.config
+except ImportError:
+    # NOTE: ``h2.config`` was added in ``h2==3.0.0``.
+    pass
 
-def send_response(conn, event):
-    stream_id = event.stream_id
-    response_data = json.dumps(dict(event.headers)).encode("utf-8")
 
-    conn.send_headers(
-        stream_id=stream_id,
-        headers=[
-            (":status", "200"),
-            ("server", "basic-h2-server/1.0"),
-            ("content-length", str(len(response_data))),
-            ("content-type", "application/json"),
-        ],
+DEFAULT_PORT = 8080
+# NOTE: A request for ``/bytes/{N}`` is answered with ``N`` bytes (rather
+#       than an echo of the request headers).
+BYTES_PREFIX = "/bytes/"
+CHUNK_SIZE = 0x4000
+
+
+def new_connection():
+    """Create a server-side HTTP/2 connection.
+
+    Returns:
+        h2.connection.H2Connection: The connection (with headers decoded as
+        UTF-8).
+    """
+    if not hasattr(h2, "config"):
+        return h2.connection.H2Connection(client_side=False)
+
+    config = h2.config.H2Configuration(
+        client_side=False, header_encoding="utf-8"
     )
-    conn.send_data(stream_id=stream_id, data=response_data, end_stream=True)
+    return h2.connection.H2Connection(config=config)
+
+
+class Responder:
+    """Send responses on a connection, respecting flow control.
+
+    Args:
+        conn (h2.connection.H2Connection): The connection.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.request_headers = {}
+        # NOTE: Response bodies that have not been sent yet (i.e. are
+        #       waiting on a WINDOW_UPDATE), keyed by stream ID.
+        self.pending = {}
+
+    def send_response(self, stream_id):
+        """Start the response for a (complete) request.
+
+        Args:
+            stream_id (int): The stream the request was sent on.
+        """
+        headers = self.request_headers.pop(stream_id, {})
+        path = headers.get(":path", "/")
+        if path.startswith(BYTES_PREFIX):
+            response_data = b"x" * int(path[len(BYTES_PREFIX) :])
+            content_type = "application/octet-stream"
+        else:
+            response_data = json.dumps(headers).encode("utf-8")
+            content_type = "application/json"
+
+        self.conn.send_headers(
+            stream_id=stream_id,
+            headers=[
+                (":status", "200"),
+                ("server", "basic-h2-server/1.0"),
+                ("content-length", str(len(response_data))),
+                ("content-type", content_type),
+            ],
+        )
+        self.pending[stream_id] = memoryview(response_data)
+        self.send_pending(stream_id)
+
+    def send_pending(self, stream_id):
+        """Send as much of a pending response as flow control allows.
+
+        Args:
+            stream_id (int): The stream for the response.
+        """
+        remaining = self.pending.get(stream_id)
+        if remaining is None:
+            return
+
+        while True:
+            window = self.conn.local_flow_control_window(stream_id)
+            size = min(
+                window,
+                self.conn.max_outbound_frame_size,
+                CHUNK_SIZE,
+                len(remaining),
+            )
+            if size == 0 and remaining:
+                return
+
+            end_stream = size == len(remaining)
+            self.conn.send_data(
+                stream_id=stream_id,
+                data=remaining[:size].tobytes(),
+                end_stream=end_stream,
+            )
+            remaining = remaining[size:]
+            self.pending[stream_id] = remaining
+            if end_stream:
+                del self.pending[stream_id]
+                return
+
+    def handle_event(self, event):
+        """Handle an event from the connection.
+
+        Args:
+            event (h2.events.Event): The event.
+        """
+        if isinstance(event, h2.events.RequestReceived):
+            self.request_headers[event.stream_id] = dict(event.headers)
+        elif isinstance(event, h2.events.DataReceived):
+            self.conn.acknowledge_received_data(
+                event.flow_controlled_length, event.stream_id
+            )
+        elif isinstance(event, h2.events.StreamEnded):
+            self.send_response(event.stream_id)
+        elif isinstance(event, h2.events.WindowUpdated):
+            if event.stream_id == 0:
+                for stream_id in list(self.pending.keys()):
+                    self.send_pending(stream_id)
+            else:
+                self.send_pending(event.stream_id)
+        elif isinstance(event, h2.events.StreamReset):
+            self.request_headers.pop(event.stream_id, None)
+            self.pending.pop(event.stream_id, None)
 
 
 def handle(sock):
-    conn = h2.connection.H2Connection(client_side=False)
+    conn = new_connection()
     conn.initiate_connection()
     sock.sendall(conn.data_to_send())
+    responder = Responder(conn)
 
-    while True:
-        data = sock.recv(65535)
-        if not data:
-            break
+    with sock:
+        while True:
+            try:
+                data = sock.recv(65535)
+            except ConnectionError:
+                break
+            if not data:
+                break
+
+            events = conn.receive_data(data)
+            for event in events:
+                responder.handle_event(event)
+
+            data_to_send = conn.data_to_send()
+            if data_to_send:
+                sock.sendall(data_to_send)
 
-        events = conn.receive_data(data)
-        for event in events:
-            if isinstance(event, h2.events.RequestReceived):
-                send_response(conn, event)
 
-        data_to_send = conn.data_to_send()
-        if data_to_send:
-            sock.sendall(data_to_send)
+def serve(port=DEFAULT_PORT, host="0.0.0.0"):
+    """Serve HTTP/2 requests (with one thread per connection).
 
+    This never returns.
+
+    Args:
+        port (Optional[int]): The port to listen on.
+        host (Optional[str]): The host (interface) to listen on.
+    """
+    sock = socket.socket()
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(128)
+
+    while True:
+        client_socket, _ = sock.accept()
+        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        thread = threading.Thread(
+            target=handle, args=(client_socket,), daemon=True
+        )
+        thread.start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Basic HTTP/2 server.")
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=DEFAULT_PORT,
+        help="The port to listen on.",
+    )
+    args = parser.parse_args()
+    serve(args.port)
 
-sock = socket.socket()
-sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-sock.bind(("0.0.0.0", 8080))
-sock.listen(5)
 
-while True:
-    handle(sock.accept()[0])
+if __name__ == "__main__":
+    main()
@@ -30,7 +30,11 @@ def get_path(*parts, relative=True):
 def unit(session):
     """Run unit tests."""
     # Install all dependencies.
-    session.install("--upgrade", "pytest")
+    # NOTE: ``numpy`` is optional; it is installed so that both the
+    #       vectorized and pure Python statistics are tested. It is pinned to
+    #       1.x (the only major version available for Python 3.7), which is
+    #       stricter about the dtypes it accepts (e.g. for group IDs).
+    session.install("--upgrade", "pytest", "numpy < 2")
     # Install this package.
     session.install("--upgrade", ".")
 
@@ -57,3 +61,35 @@ def generate_pb(session):
         src_dest,
         get_path("_grpc", "users.proto"),
     )
+
+
+@nox.session(py=DEFAULT_INTERPRETER)
+def bench(session):
+    """Run the end-to-end benchmark and compare to the stored baseline."""
+    # Install all dependencies.
+    session.install("--upgrade", "h2")
+    # Install this package.
+    session.install("--upgrade", ".")
+
+    baseline = get_path("_bench", "baseline-e2e.json")
+    run_args = ["python", get_path("_bench", "e2e.py")]
+    if session.posargs:
+        run_args.extend(session.posargs)
+    else:
+        run_args.extend(["--baseline", baseline])
+    session.run(*run_args)
+
+
+@nox.session(py=DEFAULT_INTERPRETER)
+def micro(session):
+    """Run the microbenchmarks and compare to the stored baseline."""
+    # Install this package.
+    session.install("--upgrade", ".")
+
+    baseline = get_path("_bench", "baseline-micro.json")
+    run_args = ["python", get_path("_bench", "micro.py")]
+    if session.posargs:
+        run_args.extend(session.posargs)
+    else:
+        run_args.extend(["--baseline", baseline])
+    session.run(*run_args)
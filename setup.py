@@ -48,6 +48,9 @@ def main():
         entry_points={
             "console_scripts": (
                 "tcp-h2-describe=tcp_h2_describe.__main__:main",
+                "tcp-h2-replay=tcp_h2_describe._replay:main",
+                "tcp-h2-compare=tcp_h2_describe._compare:main",
+                "tcp-h2-frames=tcp_h2_describe._export:main",
             )
         },
         classifiers=[
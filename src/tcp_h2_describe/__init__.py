@@ -10,11 +10,61 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import pkg_resources
+import importlib
 
-from tcp_h2_describe._describe import register_payload_handler
-from tcp_h2_describe._describe import register_setting
-from tcp_h2_describe._serve import serve_proxy
 
+# NOTE: The public API (and ``__version__``) is loaded on first access (see
+#       ``__getattr__()``), so that importing this package (e.g. to run the
+#       CLI) does not import every module in the package.
+_LAZY_ATTRIBUTES = {
+    "register_payload_handler": "tcp_h2_describe._describe",
+    "register_setting": "tcp_h2_describe._describe",
+    "ProxyOptions": "tcp_h2_describe._options",
+    "serve_proxy": "tcp_h2_describe._serve",
+}
+__all__ = sorted(_LAZY_ATTRIBUTES.keys())
 
-__version__ = pkg_resources.get_distribution("tcp-h2-describe").version
+
+def _get_version():
+    """Get the version of the installed ``tcp-h2-describe`` distribution.
+
+    Returns:
+        str: The version.
+    """
+    try:
+        import importlib.metadata as importlib_metadata
+    except ImportError:
+        # NOTE: ``importlib.metadata`` was added in Python 3.8.
+        import pkg_resources
+
+        return pkg_resources.get_distribution("tcp-h2-describe").version
+
+    return importlib_metadata.version("tcp-h2-describe")
+
+
+def __getattr__(name):
+    """Load a public attribute of this package on first access.
+
+    Args:
+        name (str): The name of the attribute.
+
+    Returns:
+        Any: The attribute.
+
+    Raises:
+        AttributeError: If ``name`` is not a public attribute.
+    """
+    if name == "__version__":
+        value = _get_version()
+    elif name in _LAZY_ATTRIBUTES:
+        module = importlib.import_module(_LAZY_ATTRIBUTES[name])
+        value = getattr(module, name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals().keys()) | set(__all__) | {"__version__"})
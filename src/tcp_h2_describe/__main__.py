@@ -12,7 +12,13 @@
 
 import argparse
 
-from tcp_h2_describe._serve import serve_proxy
+from tcp_h2_describe._options import ProxyOptions
+from tcp_h2_describe._options import parse_positive_int
+from tcp_h2_describe._shape import Shaping
+from tcp_h2_describe._shape import parse_rate
+from tcp_h2_describe._trigger import DEFAULT_WINDOW
+from tcp_h2_describe._trigger import Triggers
+from tcp_h2_describe._trigger import parse_error_code
 
 
 DESCRIPTION = """\
@@ -29,11 +35,12 @@ def get_args():
     """Get the command line arguments for ``tcp-h2-describe``.
 
     Returns:
-       Tuple[int, int, Optional[str]]: A triple of
+       Tuple[int, int, Optional[str], .ProxyOptions]: A quadruple of
        * The port for the "describe" proxy
        * The port for the server that is being proxied
        * The hostname for the server that is being proxied (or :data:`None` if
          not provided)
+       * The options for the proxy
     """
     parser = argparse.ArgumentParser(
         description=DESCRIPTION,
@@ -59,14 +66,320 @@ def get_args():
         default=80,
         help="The port for the server that is being proxied.",
     )
+    parser.add_argument(
+        "--pass-through-data",
+        dest="pass_through_data",
+        action="store_true",
+        help=(
+            "Describe DATA frames from the frame header only; the payload is "
+            "forwarded without being inspected."
+        ),
+    )
+
+    parser.add_argument(
+        "--summary-interval",
+        dest="summary_interval",
+        type=float,
+        help=(
+            "Skip per-frame descriptions and instead print a summary of each "
+            "connection every SUMMARY_INTERVAL seconds (and when the "
+            "connection closes)."
+        ),
+    )
+    parser.add_argument(
+        "--stream-timing",
+        dest="stream_timing",
+        action="store_true",
+        help=(
+            "Print the request / response timing (time to first response "
+            "header, time to first response byte and total duration) for "
+            "each stream when it ends."
+        ),
+    )
+    parser.add_argument(
+        "--flow-control",
+        dest="flow_control",
+        action="store_true",
+        help=(
+            "Track the flow-control windows for each connection and stream "
+            "and report the time spent stalled at a zero window."
+        ),
+    )
+    parser.add_argument(
+        "--hpack-stats",
+        dest="hpack_stats",
+        action="store_true",
+        help=(
+            "Report HPACK compression for each connection (e.g. the "
+            "compression ratio, dynamic table hits, Huffman savings and the "
+            "headers that use the most encoded bytes)."
+        ),
+    )
+    parser.add_argument(
+        "--stream-concurrency",
+        dest="stream_concurrency",
+        action="store_true",
+        help=(
+            "Track the number of open streams in each connection over time "
+            "and report the peak and the time spent at the peer's "
+            "SETTINGS_MAX_CONCURRENT_STREAMS limit."
+        ),
+    )
+    parser.add_argument(
+        "--ping-rtt",
+        dest="ping_rtt",
+        action="store_true",
+        help=(
+            "Match PINGs with their ACKs and report round-trip time "
+            "histograms for the proxy<->client and proxy<->server legs."
+        ),
+    )
+    parser.add_argument(
+        "--ping-interval",
+        dest="ping_interval",
+        type=float,
+        help=(
+            "Inject a PING from the proxy into both peers of each connection "
+            "every PING_INTERVAL seconds (implies --ping-rtt)."
+        ),
+    )
+    parser.add_argument(
+        "--debug-signals",
+        dest="debug_signals",
+        action="store_true",
+        help=(
+            "Start / stop a sampling profiler on SIGUSR1 (writing the "
+            "samples as collapsed stacks) and display the stack of every "
+            "thread on SIGUSR2."
+        ),
+    )
+    parser.add_argument(
+        "--flight-recorder",
+        dest="flight_recorder",
+        metavar="FRAMES",
+        type=parse_positive_int,
+        help=(
+            "Keep a record of the last FRAMES frames sent by each peer and "
+            "display them when a GOAWAY or RST_STREAM is sent or the proxy "
+            "fails (and on SIGUSR2 with --debug-signals)."
+        ),
+    )
+    parser.add_argument(
+        "--trigger-latency",
+        dest="trigger_latency",
+        metavar="SECONDS",
+        type=float,
+        help=(
+            "Only describe frames around a trigger; a stream open for longer "
+            "than SECONDS is a trigger."
+        ),
+    )
+    parser.add_argument(
+        "--trigger-rst-stream",
+        dest="trigger_rst_stream",
+        metavar="ERROR_CODE",
+        type=parse_error_code,
+        action="append",
+        default=[],
+        help=(
+            "Only describe frames around a trigger; a RST_STREAM with "
+            "ERROR_CODE (e.g. CANCEL or 0x8) is a trigger (can be repeated)."
+        ),
+    )
+    parser.add_argument(
+        "--trigger-goaway",
+        dest="trigger_goaway",
+        action="store_true",
+        help="Only describe frames around a trigger; a GOAWAY is a trigger.",
+    )
+    parser.add_argument(
+        "--trigger-header",
+        dest="trigger_header",
+        metavar="PATTERN",
+        action="append",
+        default=[],
+        help=(
+            "Only describe frames around a trigger; a header (formatted as "
+            "'name: value') matching the regular expression PATTERN is a "
+            "trigger (can be repeated)."
+        ),
+    )
+    parser.add_argument(
+        "--trigger-window",
+        dest="trigger_window",
+        metavar="SECONDS",
+        type=float,
+        default=DEFAULT_WINDOW,
+        help=(
+            "When a trigger fires, display the flight recorder for the "
+            "connection and describe every frame for SECONDS afterward."
+        ),
+    )
+    parser.add_argument(
+        "--client-rate",
+        dest="client_rate",
+        metavar="RATE",
+        type=parse_rate,
+        help=(
+            "Cap the client->server bandwidth of each connection, in bytes "
+            "per second (or e.g. 10mbit, 1.5MB)."
+        ),
+    )
+    parser.add_argument(
+        "--server-rate",
+        dest="server_rate",
+        metavar="RATE",
+        type=parse_rate,
+        help=(
+            "Cap the server->client bandwidth of each connection, in bytes "
+            "per second (or e.g. 10mbit, 1.5MB)."
+        ),
+    )
+    parser.add_argument(
+        "--connection-rate",
+        dest="connection_rate",
+        metavar="RATE",
+        type=parse_rate,
+        help=(
+            "Cap the bandwidth shared by both directions of each "
+            "connection, in bytes per second (or e.g. 10mbit, 1.5MB)."
+        ),
+    )
+    parser.add_argument(
+        "--latency",
+        dest="latency",
+        metavar="SECONDS",
+        type=float,
+        default=0.0,
+        help="Add a one-way latency to each direction of each connection.",
+    )
+    parser.add_argument(
+        "--jitter",
+        dest="jitter",
+        metavar="SECONDS",
+        type=float,
+        default=0.0,
+        help=(
+            "Vary the added latency uniformly by up to +/-SECONDS (without "
+            "reordering bytes)."
+        ),
+    )
+    parser.add_argument(
+        "--shaping-seed",
+        dest="shaping_seed",
+        type=int,
+        default=0,
+        help="The random seed for --jitter.",
+    )
+    parser.add_argument(
+        "--capture",
+        dest="capture_dir",
+        metavar="DIRECTORY",
+        help=(
+            "Write the bytes of each connection (both directions, with their "
+            "timing) to a capture file in DIRECTORY, for `tcp-h2-replay` or "
+            "`tcp-h2-compare`."
+        ),
+    )
+    parser.add_argument(
+        "--export-frames",
+        dest="export_dir",
+        metavar="DIRECTORY",
+        help=(
+            "Write the metadata of each frame as typed columns (`.npy` "
+            "files) in DIRECTORY, for `tcp-h2-frames` or NumPy."
+        ),
+    )
+    parser.add_argument(
+        "--plugin",
+        dest="plugins",
+        metavar="PLUGIN",
+        action="append",
+        default=[],
+        help=(
+            "Enable the payload handlers and settings from an installed "
+            "plugin (can be repeated)."
+        ),
+    )
+    parser.add_argument(
+        "--list-plugins",
+        dest="list_plugins",
+        action="store_true",
+        help="List the installed plugins and exit.",
+    )
 
     args = parser.parse_args()
-    return args.proxy_port, args.server_port, args.server_host
+    if args.list_plugins:
+        # NOTE: Plugins are only discovered when needed, since reading the
+        #       installed entry points is slow.
+        import tcp_h2_describe._plugins
+
+        plugins = tcp_h2_describe._plugins.find_plugins()
+        parser.exit(
+            message=tcp_h2_describe._plugins.describe_plugins(plugins) + "\n"
+        )
+
+    triggers = None
+    if (
+        args.trigger_latency is not None
+        or args.trigger_rst_stream
+        or args.trigger_goaway
+        or args.trigger_header
+    ):
+        triggers = Triggers(
+            latency=args.trigger_latency,
+            rst_stream_codes=args.trigger_rst_stream,
+            goaway=args.trigger_goaway,
+            header_patterns=args.trigger_header,
+            window=args.trigger_window,
+        )
+    if triggers is not None and args.summary_interval is not None:
+        parser.error("--summary-interval can't be combined with triggers")
+
+    shaping = None
+    if (
+        args.client_rate is not None
+        or args.server_rate is not None
+        or args.connection_rate is not None
+        or args.latency > 0.0
+        or args.jitter > 0.0
+    ):
+        shaping = Shaping(
+            client_rate=args.client_rate,
+            server_rate=args.server_rate,
+            connection_rate=args.connection_rate,
+            latency=args.latency,
+            jitter=args.jitter,
+            seed=args.shaping_seed,
+        )
+
+    options = ProxyOptions(
+        pass_through_data=args.pass_through_data,
+        summary_interval=args.summary_interval,
+        stream_timing=args.stream_timing,
+        flow_control=args.flow_control,
+        ping_rtt=args.ping_rtt,
+        ping_interval=args.ping_interval,
+        debug_signals=args.debug_signals,
+        plugins=args.plugins,
+        flight_recorder=args.flight_recorder,
+        triggers=triggers,
+        shaping=shaping,
+        capture_dir=args.capture_dir,
+        export_dir=args.export_dir,
+        hpack_stats=args.hpack_stats,
+        stream_concurrency=args.stream_concurrency,
+    )
+    return args.proxy_port, args.server_port, args.server_host, options
 
 
 def main():
-    proxy_port, server_port, server_host = get_args()
-    kwargs = {}
+    proxy_port, server_port, server_host, options = get_args()
+    # NOTE: The proxy is only imported once the arguments have been parsed,
+    #       so that ``--help`` (or an invalid argument) returns quickly.
+    from tcp_h2_describe._serve import serve_proxy
+
+    kwargs = {"options": options}
     if server_host is not None:
         kwargs["server_host"] = server_host
 
@@ -0,0 +1,289 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Statistics (percentiles and histograms) over columns of values.
+
+The values are held in columns, e.g. an :mod:`array`, a ``memoryview`` (of
+a memory mapped file) or a ``numpy`` array, optionally alongside a column
+with the group (e.g. a route) of each value. If ``numpy`` is installed, the
+columns are wrapped without copying and the statistics for every group are
+computed with vectorized operations. Otherwise they are computed in pure
+Python, with the same results.
+"""
+
+import bisect
+
+try:
+    import numpy
+except ImportError:  # pragma: NO COVER
+    numpy = None
+
+
+def _as_numpy(column):
+    """Wrap a column as a ``numpy`` array (without copying).
+
+    Args:
+        column (Union[array.array, memoryview, numpy.ndarray]): The column.
+
+    Returns:
+        numpy.ndarray: The values in ``column``.
+    """
+    return numpy.asarray(column)
+
+
+def group_counts(group_ids, group_count):
+    """Count the values in each group.
+
+    Args:
+        group_ids (Sequence[int]): The group of each value, an integer in
+            ``range(group_count)``.
+        group_count (int): The number of groups.
+
+    Returns:
+        List[int]: The number of values in each group.
+    """
+    if numpy is not None:
+        ids = _as_numpy(group_ids).astype(numpy.intp)
+        return numpy.bincount(ids, minlength=group_count).tolist()
+
+    counts = [0] * group_count
+    for group_id in group_ids:
+        counts[group_id] += 1
+    return counts
+
+
+def group_sums(group_ids, values, group_count):
+    """Sum the values in each group.
+
+    Args:
+        group_ids (Sequence[int]): The group of each value, an integer in
+            ``range(group_count)``.
+        values (Sequence[float]): The values.
+        group_count (int): The number of groups.
+
+    Returns:
+        List[float]: The sum of the values in each group.
+    """
+    if numpy is not None:
+        ids = _as_numpy(group_ids).astype(numpy.intp)
+        weights = _as_numpy(values).astype(numpy.float64)
+        return numpy.bincount(
+            ids, weights=weights, minlength=group_count
+        ).tolist()
+
+    sums = [0.0] * group_count
+    for group_id, value in zip(group_ids, values):
+        sums[group_id] += value
+    return sums
+
+
+def _percentile(sorted_values, fraction):
+    """Compute a percentile of some (sorted) values.
+
+    This interpolates linearly between the two closest ranks (the default
+    method used by ``numpy.percentile()``).
+
+    Args:
+        sorted_values (List[float]): The values, in ascending order.
+        fraction (float): The percentile, as a fraction (e.g. ``0.9``).
+
+    Returns:
+        Optional[float]: The percentile, or :data:`None` if there are no
+        values.
+    """
+    if not sorted_values:
+        return None
+
+    offset = fraction * (len(sorted_values) - 1)
+    lower = int(offset)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    weight = offset - lower
+    return (
+        sorted_values[lower]
+        + (sorted_values[upper] - sorted_values[lower]) * weight
+    )
+
+
+def _numpy_percentiles(ids, values, group_count, fractions):
+    """Compute percentiles of the values in each group, with ``numpy``.
+
+    The values are sorted once (by group, then by value) and each percentile
+    is computed for every group at once from the offset of its group.
+
+    Args:
+        ids (numpy.ndarray): The group of each value.
+        values (numpy.ndarray): The values (none of them NaN).
+        group_count (int): The number of groups.
+        fractions (Tuple[float, ...]): The percentiles, as fractions.
+
+    Returns:
+        List[List[Optional[float]]]: For each group, the percentiles (or
+        :data:`None` if the group has no values).
+    """
+    if len(values) == 0:
+        return [[None] * len(fractions) for _ in range(group_count)]
+
+    # NOTE: ``numpy.bincount()`` (before ``numpy`` 2) can't take unsigned
+    #       64-bit group IDs, e.g. from an ``array.array("L")``.
+    ids = ids.astype(numpy.intp)
+    # NOTE: Sorting by value and then (stably) by group is faster than
+    #       ``numpy.lexsort()`` for a small number of groups.
+    order = numpy.argsort(values)
+    order = order[numpy.argsort(ids[order], kind="stable")]
+    sorted_values = values[order]
+    counts = numpy.bincount(ids, minlength=group_count)
+    starts = numpy.cumsum(counts) - counts
+    # NOTE: The indices for an empty group are clipped to a valid index; the
+    #       (meaningless) percentiles computed for it are discarded below.
+    group_last = numpy.clip(starts + counts - 1, 0, len(sorted_values) - 1)
+    columns = []
+    for fraction in fractions:
+        offset = fraction * numpy.maximum(counts - 1, 0)
+        lower_offset = numpy.floor(offset)
+        weight = offset - lower_offset
+        lower = numpy.minimum(
+            starts + lower_offset.astype(numpy.intp), group_last
+        )
+        upper = numpy.minimum(lower + 1, group_last)
+        columns.append(
+            sorted_values[lower]
+            + (sorted_values[upper] - sorted_values[lower]) * weight
+        )
+
+    result = []
+    for group_id, row in enumerate(numpy.stack(columns, axis=1).tolist()):
+        if counts[group_id] == 0:
+            row = [None] * len(fractions)
+        result.append(row)
+    return result
+
+
+def percentiles(values, fractions):
+    """Compute percentiles of some values.
+
+    NaN values are ignored.
+
+    Args:
+        values (Sequence[float]): The values.
+        fractions (Tuple[float, ...]): The percentiles, as fractions (e.g.
+            ``(0.5, 0.9)`` for the median and p90).
+
+    Returns:
+        List[Optional[float]]: The percentiles (each :data:`None` if there
+        are no values).
+    """
+    if numpy is not None:
+        as_array = _as_numpy(values)
+        if as_array.dtype.kind == "f":
+            as_array = as_array[~numpy.isnan(as_array)]
+        ids = numpy.zeros(len(as_array), dtype=numpy.intp)
+        return _numpy_percentiles(ids, as_array, 1, fractions)[0]
+
+    # NOTE: NaN is the only value not equal to itself.
+    sorted_values = sorted(value for value in values if value == value)
+    return [_percentile(sorted_values, fraction) for fraction in fractions]
+
+
+def group_percentiles(group_ids, values, group_count, fractions):
+    """Compute percentiles of the values in each group.
+
+    NaN values (e.g. the duration of a stream that never completed) are
+    ignored.
+
+    Args:
+        group_ids (Sequence[int]): The group of each value, an integer in
+            ``range(group_count)``.
+        values (Sequence[float]): The values.
+        group_count (int): The number of groups.
+        fractions (Tuple[float, ...]): The percentiles, as fractions (e.g.
+            ``(0.5, 0.9)`` for the median and p90).
+
+    Returns:
+        List[List[Optional[float]]]: For each group, the percentiles (or
+        :data:`None` if the group has no values).
+    """
+    if numpy is not None:
+        ids = _as_numpy(group_ids)
+        as_array = _as_numpy(values)
+        if as_array.dtype.kind == "f":
+            keep = ~numpy.isnan(as_array)
+            ids = ids[keep]
+            as_array = as_array[keep]
+        return _numpy_percentiles(ids, as_array, group_count, fractions)
+
+    grouped = [[] for _ in range(group_count)]
+    for group_id, value in zip(group_ids, values):
+        # NOTE: NaN is the only value not equal to itself.
+        if value == value:
+            grouped[group_id].append(value)
+
+    result = []
+    for group_values in grouped:
+        group_values.sort()
+        result.append(
+            [_percentile(group_values, fraction) for fraction in fractions]
+        )
+    return result
+
+
+def histogram(values, edges):
+    """Count the values in each bucket of a histogram.
+
+    Args:
+        values (Sequence[float]): The values.
+        edges (Tuple[float, ...]): The (ascending) bucket edges.
+
+    Returns:
+        List[int]: The number of values in each of the ``len(edges) + 1``
+        buckets: below ``edges[0]``, in ``[edges[i - 1], edges[i])`` for
+        each ``i`` and at or above ``edges[-1]``.
+    """
+    if numpy is not None:
+        buckets = numpy.searchsorted(edges, _as_numpy(values), side="right")
+        return numpy.bincount(buckets, minlength=len(edges) + 1).tolist()
+
+    counts = [0] * (len(edges) + 1)
+    for value in values:
+        counts[bisect.bisect_right(edges, value)] += 1
+    return counts
+
+
+def group_histograms(group_ids, values, group_count, edges):
+    """Count the values in each bucket of a histogram, for each group.
+
+    Args:
+        group_ids (Sequence[int]): The group of each value, an integer in
+            ``range(group_count)``.
+        values (Sequence[float]): The values.
+        group_count (int): The number of groups.
+        edges (Tuple[float, ...]): The (ascending) bucket edges.
+
+    Returns:
+        List[List[int]]: For each group, the number of values in each
+        bucket (see :func:`histogram`).
+    """
+    bucket_count = len(edges) + 1
+    if numpy is not None:
+        buckets = numpy.searchsorted(edges, _as_numpy(values), side="right")
+        # NOTE: Each (group, bucket) pair is counted with a single
+        #       ``bincount()`` over a combined index.
+        combined = _as_numpy(group_ids).astype(numpy.intp) * bucket_count
+        combined += buckets
+        counts = numpy.bincount(
+            combined, minlength=group_count * bucket_count
+        )
+        return counts.reshape(group_count, bucket_count).tolist()
+
+    counts = [[0] * bucket_count for _ in range(group_count)]
+    for group_id, value in zip(group_ids, values):
+        counts[group_id][bisect.bisect_right(edges, value)] += 1
+    return counts
@@ -70,15 +70,12 @@ def recv(recv_socket, send_socket, buffer_size=0x10000):
 
     .. note::
 
-        Rather than using the negotiated connection (e.g.
-        ``SETTINGS_MAX_FRAME_SIZE``) to set the buffer size, we just use a
-        best guess of something "large enough" to make sure that each frame
-        fits in this size.
-
-        If a RECV returns a chunk from the TCP stream **equal** to the buffer
-        size, we interpret this as an "incomplete" frame and throw a cowardly
-        exception. A more robust implementation could try to make subsequent
-        ``recv()`` calls to see if the chunk is an entire frame.
+        The chunk returned may end in the middle of a frame (e.g. if a RECV
+        returns a chunk **equal** to the buffer size). The caller is
+        expected to reassemble frames across chunks (see
+        ``PeerState.feed()``) and to size the buffer based on the
+        negotiated ``SETTINGS_MAX_FRAME_SIZE`` (see
+        ``PeerState.buffer_size()``).
 
     Args:
         recv_socket (socket.socket): A socket to RECV from.
@@ -88,10 +85,6 @@ def recv(recv_socket, send_socket, buffer_size=0x10000):
 
     Returns:
         bytes: The chunk that was read from the TCP stream.
-
-    Raises:
-        RuntimeError: If the TCP chunk returned is "full size" (i.e. has
-            ``buffer_size`` bytes).
     """
     recv_socket = wait_readable(recv_socket, send_socket)
     if recv_socket is None:
@@ -99,32 +92,33 @@ def recv(recv_socket, send_socket, buffer_size=0x10000):
         # simulate an empty RECV.
         return b""
 
-    tcp_chunk = recv_socket.recv(buffer_size)
-    if len(tcp_chunk) == buffer_size:
-        raise RuntimeError(
-            "TCP RECV() may not have captured entire message frame"
-        )
-
-    return tcp_chunk
+    return recv_socket.recv(buffer_size)
 
 
 def send(send_socket, tcp_chunk):
     """Call ``send()`` on a socket; with some extra checks.
 
-    .. note::
-
-        This throws a cowardly exception if the entire ``tcp_chunk`` cannot be
-        sent in a single SND. A more robust implementation could try to make
-        subsequent ``send()`` calls or just use ``sendall()``.
+    This **assumes** ``send_socket`` is non-blocking. If the entire
+    ``tcp_chunk`` cannot be sent in a single SEND (which becomes more likely
+    as the RECV buffer size grows), ``select.select()`` is used to wait until
+    the socket is writable and the remaining bytes are sent.
 
     Args:
         send_socket (socket.socket): A socket to SEND to.
         tcp_chunk (bytes): A chunk to send to the socket.
 
     Raises:
-        RuntimeError: If SEND returns a length other than the size of
-            ``tcp_chunk``.
+        RuntimeError: If SEND returns zero bytes sent (i.e. the connection is
+            broken).
     """
-    bytes_sent = send_socket.send(tcp_chunk)
-    if bytes_sent != len(tcp_chunk):
-        raise RuntimeError("Not all bytes were sent")
+    remaining = memoryview(tcp_chunk)
+    while remaining:
+        try:
+            bytes_sent = send_socket.send(remaining)
+        except BlockingIOError:
+            select.select([], [send_socket], [], SELECT_TIMEOUT)
+            continue
+
+        if bytes_sent == 0:
+            raise RuntimeError("Not all bytes were sent")
+        remaining = remaining[bytes_sent:]
@@ -0,0 +1,164 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import tcp_h2_describe._describe
+
+
+DATA = 0x0
+HEADERS = 0x1
+SETTINGS = 0x4
+PING = 0x6
+WINDOW_UPDATE = 0x8
+FLAG_ACK = 0x1
+FLAG_END_STREAM = 0x1
+FLAG_END_HEADERS = 0x4
+# See: https://http2.github.io/http2-spec/#FrameHeader
+MAX_FRAME_LENGTH = 0xFFFFFF
+
+
+def build_frame(type_byte, flags, stream_id, frame_payload=b""):
+    """Build a raw HTTP/2 frame (the inverse of ``next_h2_frame()``).
+
+    .. frame header spec: https://http2.github.io/http2-spec/#FrameHeader
+
+    Args:
+        type_byte (int): The frame type.
+        flags (int): The flags for the frame.
+        stream_id (int): The stream identifier.
+        frame_payload (Optional[bytes]): The frame payload.
+
+    Returns:
+        bytes: The 9-octet frame header followed by ``frame_payload``.
+
+    Raises:
+        ValueError: If ``frame_payload`` is too large to fit in a frame. See
+            `frame header spec`_.
+    """
+    frame_length = len(frame_payload)
+    if frame_length > MAX_FRAME_LENGTH:
+        raise ValueError("Frame payload is too large", frame_length)
+
+    header = tcp_h2_describe._describe.STRUCT_FRAME_HEADER.pack(
+        frame_length >> 8, frame_length & 0xFF, type_byte, flags, stream_id
+    )
+    return header + bytes(frame_payload)
+
+
+def build_ping(opaque_data, ack=False):
+    """Build a PING HTTP/2 frame.
+
+    .. PING spec: https://http2.github.io/http2-spec/#PING
+
+    See `PING spec`_.
+
+    Args:
+        opaque_data (bytes): The 8 bytes of opaque data.
+        ack (Optional[bool]): Indicates if the ACK flag should be set.
+
+    Returns:
+        bytes: The PING frame.
+
+    Raises:
+        ValueError: If the length of ``opaque_data`` is not 8.
+    """
+    if len(opaque_data) != 8:
+        raise ValueError(
+            "The length of the opaque data is not 8.", opaque_data
+        )
+
+    flags = FLAG_ACK if ack else 0
+    return build_frame(PING, flags, 0, opaque_data)
+
+
+def build_settings(settings=(), ack=False):
+    """Build a SETTINGS HTTP/2 frame.
+
+    .. SETTINGS spec: https://http2.github.io/http2-spec/#SETTINGS
+
+    See `SETTINGS spec`_.
+
+    Args:
+        settings (Optional[Iterable[Tuple[int, int]]]): The
+            ``(setting_id, setting_value)`` pairs.
+        ack (Optional[bool]): Indicates if the ACK flag should be set.
+
+    Returns:
+        bytes: The SETTINGS frame.
+    """
+    frame_payload = b"".join(
+        tcp_h2_describe._describe.STRUCT_SETTING.pack(setting_id, value)
+        for setting_id, value in settings
+    )
+    flags = FLAG_ACK if ack else 0
+    return build_frame(SETTINGS, flags, 0, frame_payload)
+
+
+def build_headers(encoder, headers, stream_id, end_stream=False):
+    """Build a HEADERS HTTP/2 frame (with ``END_HEADERS`` set).
+
+    .. HEADERS spec: https://http2.github.io/http2-spec/#HEADERS
+
+    See `HEADERS spec`_.
+
+    Args:
+        encoder (hpack.Encoder): The HPACK encoder for the connection; its
+            dynamic table is updated.
+        headers (List[Tuple[str, str]]): The headers to encode.
+        stream_id (int): The stream identifier.
+        end_stream (Optional[bool]): Indicates if the ``END_STREAM`` flag
+            should be set.
+
+    Returns:
+        bytes: The HEADERS frame.
+    """
+    flags = FLAG_END_HEADERS
+    if end_stream:
+        flags |= FLAG_END_STREAM
+    return build_frame(HEADERS, flags, stream_id, encoder.encode(headers))
+
+
+def build_data(stream_id, data, end_stream=False):
+    """Build a DATA HTTP/2 frame.
+
+    .. DATA spec: https://http2.github.io/http2-spec/#DATA
+
+    See `DATA spec`_.
+
+    Args:
+        stream_id (int): The stream identifier.
+        data (bytes): The data.
+        end_stream (Optional[bool]): Indicates if the ``END_STREAM`` flag
+            should be set.
+
+    Returns:
+        bytes: The DATA frame.
+    """
+    flags = FLAG_END_STREAM if end_stream else 0
+    return build_frame(DATA, flags, stream_id, data)
+
+
+def build_window_update(stream_id, increment):
+    """Build a WINDOW_UPDATE HTTP/2 frame.
+
+    .. WINDOW_UPDATE spec: https://http2.github.io/http2-spec/#WINDOW_UPDATE
+
+    See `WINDOW_UPDATE spec`_.
+
+    Args:
+        stream_id (int): The stream identifier (``0`` for the connection).
+        increment (int): The window size increment.
+
+    Returns:
+        bytes: The WINDOW_UPDATE frame.
+    """
+    frame_payload = tcp_h2_describe._describe.STRUCT_L.pack(increment)
+    return build_frame(WINDOW_UPDATE, 0, stream_id, frame_payload)
@@ -0,0 +1,190 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Capture the bytes of each connection (e.g. for replay or comparison).
+
+A capture file holds the TCP chunks RECV-ed from both peers of a connection,
+in order, each with the time (relative to when the connection was opened) it
+was RECV-ed:
+
+* The 8-byte header ``MAGIC``
+* The (wall clock) time the connection was opened, as an 8-byte
+  (big-endian double) UNIX timestamp; this is used to preserve the relative
+  start times of connections when replaying several captures
+* For each chunk, an 8-byte (big-endian double) offset in seconds, a 1-byte
+  direction (``CLIENT`` or ``SERVER``) and a 4-byte length, followed by the
+  chunk itself
+
+Files written with ``MAGIC_V1`` (which only held client->server chunks, so
+their records have no direction byte) can still be read.
+"""
+
+import itertools
+import os
+import struct
+import threading
+import time
+
+
+MAGIC = b"TH2CAP\x00\x02"
+MAGIC_V1 = b"TH2CAP\x00\x01"
+STRUCT_OPENED = struct.Struct(">d")
+STRUCT_RECORD = struct.Struct(">dBL")
+STRUCT_RECORD_V1 = struct.Struct(">dL")
+CLIENT = 0
+SERVER = 1
+FILENAME_TEMPLATE = "{timestamp}-{pid}-{index:06d}.capture"
+# NOTE: The counter makes the filename unique for connections opened in the
+#       same second.
+COUNTER = itertools.count()
+COUNTER_LOCK = threading.Lock()
+
+
+def capture_path(capture_dir):
+    """Choose the path of the capture file for a new connection.
+
+    Args:
+        capture_dir (str): The directory where captures are written.
+
+    Returns:
+        str: The path for the capture file.
+    """
+    with COUNTER_LOCK:
+        index = next(COUNTER)
+    filename = FILENAME_TEMPLATE.format(
+        timestamp=time.strftime("%Y%m%dT%H%M%S"), pid=os.getpid(), index=index
+    )
+    return os.path.join(capture_dir, filename)
+
+
+class CaptureWriter:
+    """Write the TCP chunks RECV-ed from both peers to a capture file.
+
+    Chunks are written by the threads that RECV from the client and the
+    server, so each record is written while holding a lock.
+
+    Args:
+        path (str): The path of the capture file.
+        opened_at (float): The (monotonic) time the connection was opened.
+    """
+
+    def __init__(self, path, opened_at):
+        self.path = path
+        self.opened_at = opened_at
+        self.file_obj = open(path, "wb")
+        self.lock = threading.Lock()
+        opened_wall = time.time() - (time.monotonic() - opened_at)
+        self.file_obj.write(MAGIC + STRUCT_OPENED.pack(opened_wall))
+
+    def write(self, received_at, tcp_chunk, is_client=True):
+        """Write a TCP chunk.
+
+        Args:
+            received_at (float): The (monotonic) time the chunk was RECV-ed.
+            tcp_chunk (bytes): The chunk.
+            is_client (Optional[bool]): Indicates if the chunk was RECV-ed
+                from the client.
+        """
+        direction = CLIENT if is_client else SERVER
+        record = STRUCT_RECORD.pack(
+            received_at - self.opened_at, direction, len(tcp_chunk)
+        )
+        with self.lock:
+            self.file_obj.write(record)
+            self.file_obj.write(tcp_chunk)
+
+    def close(self):
+        """Close the capture file."""
+        with self.lock:
+            self.file_obj.close()
+
+
+def read_records(path):
+    """Read the TCP chunks (from both peers) in a capture file.
+
+    Args:
+        path (str): The path of the capture file.
+
+    Returns:
+        Tuple[float, List[Tuple[float, bool, bytes]]]: A pair of
+
+        * The (wall clock) time the connection was opened
+        * The offset (in seconds, from when the connection was opened), an
+          indicator if the chunk was RECV-ed from the client and the bytes of
+          each chunk
+
+    Raises:
+        ValueError: If the file is not a capture file.
+    """
+    with open(path, "rb") as file_obj:
+        contents = file_obj.read()
+
+    header_size = len(MAGIC) + STRUCT_OPENED.size
+    if len(contents) < header_size:
+        raise ValueError("Not a capture file", path)
+    if contents.startswith(MAGIC):
+        struct_record = STRUCT_RECORD
+    elif contents.startswith(MAGIC_V1):
+        struct_record = STRUCT_RECORD_V1
+    else:
+        raise ValueError("Not a capture file", path)
+
+    (opened_wall,) = STRUCT_OPENED.unpack_from(contents, len(MAGIC))
+    records = []
+    offset = header_size
+    # NOTE: The last record may be incomplete (e.g. if the proxy was killed
+    #       while writing it), in which case it is ignored.
+    while offset + struct_record.size <= len(contents):
+        if struct_record is STRUCT_RECORD_V1:
+            direction = CLIENT
+            received_at, length = struct_record.unpack_from(contents, offset)
+        else:
+            received_at, direction, length = struct_record.unpack_from(
+                contents, offset
+            )
+        offset += struct_record.size
+        if offset + length > len(contents):
+            break
+        records.append(
+            (
+                received_at,
+                direction == CLIENT,
+                contents[offset : offset + length],
+            )
+        )
+        offset += length
+    return opened_wall, records
+
+
+def read_capture(path):
+    """Read the client->server TCP chunks in a capture file.
+
+    Args:
+        path (str): The path of the capture file.
+
+    Returns:
+        Tuple[float, List[Tuple[float, bytes]]]: A pair of
+
+        * The (wall clock) time the connection was opened
+        * The offset (in seconds, from when the connection was opened) and
+          the bytes of each chunk RECV-ed from the client
+
+    Raises:
+        ValueError: If the file is not a capture file.
+    """
+    opened_wall, records = read_records(path)
+    chunks = [
+        (received_at, tcp_chunk)
+        for received_at, is_client, tcp_chunk in records
+        if is_client
+    ]
+    return opened_wall, chunks
@@ -0,0 +1,501 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compare the streams in two sets of captures of the same workload.
+
+Each capture (see ``tcp-h2-describe --capture``) is read back through the
+same state the proxy keeps for a live connection, which gives a record for
+each stream: its route (the ``:method`` and ``:path`` of the request), its
+duration, its number of frames, the size of its header blocks and the time
+it spent stalled on (stream) flow-control windows. The records are stored
+column-wise, so the statistics for every route are computed at once (see
+:mod:`._analysis`).
+
+Routes are matched between the "before" and "after" captures and ranked by
+the change in their p90 duration, so the worst regressions come first.
+"""
+
+import argparse
+import array
+import collections
+import math
+import os
+
+import tcp_h2_describe._analysis
+import tcp_h2_describe._capture
+import tcp_h2_describe._describe
+import tcp_h2_describe._flow_control
+import tcp_h2_describe._options
+import tcp_h2_describe._state
+import tcp_h2_describe._tracker
+
+
+FRACTIONS = (0.5, 0.9, 0.99)
+DEFAULT_TOP = 20
+NAN = float("nan")
+RouteStats = collections.namedtuple(
+    "RouteStats",
+    [
+        "streams",
+        "failed",
+        "p50",
+        "p90",
+        "p99",
+        "frames",
+        "header_bytes",
+        "stall_time",
+    ],
+)
+RouteStats.__doc__ = """Statistics for the streams on one route.
+
+Args:
+    streams (int): The number of streams.
+    failed (int): The number of streams that were reset or never completed.
+    p50 (Optional[float]): The median duration (in seconds) of the
+        completed streams.
+    p90 (Optional[float]): The p90 duration of the completed streams.
+    p99 (Optional[float]): The p99 duration of the completed streams.
+    frames (float): The mean number of frames (sent by both peers).
+    header_bytes (float): The mean size of the header blocks (sent by both
+        peers).
+    stall_time (float): The mean time (in seconds) spent stalled on a
+        stream flow-control window (by either peer).
+"""
+
+
+def stream_route(stream):
+    """Get the route for a stream.
+
+    Args:
+        stream (.StreamState): The stream.
+
+    Returns:
+        Optional[str]: The ``:method`` and ``:path`` of the request, or
+        :data:`None` if the request headers were not seen.
+    """
+    method = stream.header_value(":method")
+    path = stream.header_value(":path")
+    if method is None or path is None:
+        return None
+    # NOTE: The query string is dropped, so that requests for the same
+    #       resource (with different parameters) are matched.
+    path = path.split("?", 1)[0]
+    return f"{method} {path}"
+
+
+class StreamRecorder(tcp_h2_describe._tracker.Tracker):
+    """Keep every stream that ends in a connection.
+
+    The connection itself only keeps the most recently ended streams.
+
+    Args:
+        connection (.ConnectionState): The connection being tracked.
+    """
+
+    def __init__(self, connection):
+        super().__init__(connection)
+        self.ended_streams = []
+
+    def on_stream_end(self, stream):
+        self.ended_streams.append(stream)
+
+
+def replay_capture(path):
+    """Read a capture back through the state kept for a connection.
+
+    Args:
+        path (str): The path of the capture file.
+
+    Returns:
+        .ConnectionState: The state of the connection after every chunk in
+        the capture has been observed, with flow control tracked and every
+        ended stream recorded (by a :class:`StreamRecorder`).
+    """
+    _, records = tcp_h2_describe._capture.read_records(path)
+    options = tcp_h2_describe._options.ProxyOptions(flow_control=True)
+    connection = tcp_h2_describe._state.ConnectionState(
+        f"client({path})", f"server({path})", options
+    )
+    connection.trackers.append(StreamRecorder(connection))
+    expect_preface = True
+    for received_at, is_client, tcp_chunk in records:
+        peer = connection.client if is_client else connection.server
+        peer.received_at = connection.opened_at + received_at
+        preface = expect_preface and is_client
+        h2_frames = peer.feed(tcp_chunk, preface)
+        tcp_h2_describe._describe.observe(h2_frames, preface, peer)
+        if is_client:
+            expect_preface = False
+    return connection
+
+
+class StreamColumns:
+    """Per-stream records, stored column-wise.
+
+    Each route is assigned an integer ID (its index in ``routes``), which is
+    what is stored for each stream.
+    """
+
+    def __init__(self):
+        self.routes = []
+        self.route_ids = {}
+        self.connections = 0
+        # NOTE: ``L`` is avoided since it is 8 bytes (i.e. ``uint64``) on
+        #       some platforms, which ``numpy`` 1.x can't use as group IDs.
+        self.route_column = array.array("I")
+        self.durations = array.array("d")
+        self.failed = array.array("B")
+        self.frames = array.array("I")
+        self.header_bytes = array.array("I")
+        self.stall_times = array.array("d")
+
+    def __len__(self):
+        return len(self.route_column)
+
+    def append(self, route, duration, frames, header_bytes, stall_time):
+        """Add the record for a stream.
+
+        Args:
+            route (str): The route for the stream.
+            duration (float): The duration (in seconds) of the stream, or NaN
+                if it was reset or never completed.
+            frames (int): The number of frames sent on the stream.
+            header_bytes (int): The size of the header blocks sent on the
+                stream.
+            stall_time (float): The time (in seconds) spent stalled on the
+                flow-control window for the stream.
+        """
+        route_id = self.route_ids.get(route)
+        if route_id is None:
+            route_id = len(self.routes)
+            self.routes.append(route)
+            self.route_ids[route] = route_id
+
+        self.route_column.append(route_id)
+        self.durations.append(duration)
+        self.failed.append(math.isnan(duration))
+        self.frames.append(frames)
+        self.header_bytes.append(header_bytes)
+        self.stall_times.append(stall_time)
+
+    def add_connection(self, connection):
+        """Add the records for the streams in a connection.
+
+        Streams that were never started (e.g. only a WINDOW_UPDATE was
+        sent) or without request headers are skipped.
+
+        Args:
+            connection (.ConnectionState): The connection, from
+                :func:`replay_capture`.
+        """
+        self.connections += 1
+        flow_control = connection.find_tracker(
+            tcp_h2_describe._flow_control.FlowControlTracker
+        )
+        last_received_at = max(
+            connection.client.received_at, connection.server.received_at
+        )
+        recorder = connection.find_tracker(StreamRecorder)
+        streams = recorder.ended_streams + list(connection.streams.values())
+        streams.sort(key=lambda stream: stream.stream_id)
+        for stream in streams:
+            if stream.started_at is None:
+                continue
+            route = stream_route(stream)
+            if route is None:
+                continue
+
+            ended_at = stream.ended_at
+            duration = NAN
+            if ended_at is None:
+                ended_at = last_received_at
+            elif not stream.reset:
+                duration = ended_at - stream.started_at
+            # NOTE: The stall time for a sender that is done with the
+            #       stream is already in ``stream.stall_time``.
+            stall_time = (
+                stream.stall_time
+                + flow_control.client.total_stall_time(
+                    stream.stream_id, ended_at
+                )
+                + flow_control.server.total_stall_time(
+                    stream.stream_id, ended_at
+                )
+            )
+            self.append(
+                route,
+                duration,
+                stream.client_frames + stream.server_frames,
+                stream.client_header_bytes + stream.server_header_bytes,
+                stall_time,
+            )
+
+
+def load_streams(paths):
+    """Load the per-stream records from some capture files.
+
+    Args:
+        paths (Iterable[str]): The capture files.
+
+    Returns:
+        StreamColumns: The records for every stream in the captures.
+    """
+    columns = StreamColumns()
+    for path in paths:
+        columns.add_connection(replay_capture(path))
+    return columns
+
+
+def summarize(columns):
+    """Compute the statistics for each route.
+
+    Args:
+        columns (StreamColumns): The per-stream records.
+
+    Returns:
+        Dict[str, RouteStats]: The statistics for each route.
+    """
+    analysis = tcp_h2_describe._analysis
+    group_ids = columns.route_column
+    group_count = len(columns.routes)
+    counts = analysis.group_counts(group_ids, group_count)
+    failed = analysis.group_sums(group_ids, columns.failed, group_count)
+    percentiles = analysis.group_percentiles(
+        group_ids, columns.durations, group_count, FRACTIONS
+    )
+    frames = analysis.group_sums(group_ids, columns.frames, group_count)
+    header_bytes = analysis.group_sums(
+        group_ids, columns.header_bytes, group_count
+    )
+    stall_times = analysis.group_sums(
+        group_ids, columns.stall_times, group_count
+    )
+
+    result = {}
+    for route_id, route in enumerate(columns.routes):
+        count = counts[route_id]
+        p50, p90, p99 = percentiles[route_id]
+        result[route] = RouteStats(
+            count,
+            int(failed[route_id]),
+            p50,
+            p90,
+            p99,
+            frames[route_id] / count,
+            header_bytes[route_id] / count,
+            stall_times[route_id] / count,
+        )
+    return result
+
+
+def _p90_change(before, after):
+    """Compute the change in p90 duration for a route.
+
+    Args:
+        before (RouteStats): The statistics before.
+        after (RouteStats): The statistics after.
+
+    Returns:
+        Optional[float]: The change (in seconds), or :data:`None` if either
+        side has no completed streams.
+    """
+    if before.p90 is None or after.p90 is None:
+        return None
+    return after.p90 - before.p90
+
+
+def rank_routes(before, after):
+    """Match routes and rank them by regression.
+
+    Args:
+        before (Dict[str, RouteStats]): The statistics for each route before.
+        after (Dict[str, RouteStats]): The statistics for each route after.
+
+    Returns:
+        List[str]: The routes seen both before and after, ordered by the
+        change in their p90 duration (largest increase first). Routes
+        without completed streams on either side come last.
+    """
+
+    def sort_key(route):
+        change = _p90_change(before[route], after[route])
+        if change is None:
+            return (True, 0.0, route)
+        return (False, -change, route)
+
+    matched = [route for route in before.keys() if route in after]
+    return sorted(matched, key=sort_key)
+
+
+def _format_ms(value):
+    """Format a time in milliseconds.
+
+    Args:
+        value (Optional[float]): The time, in seconds.
+
+    Returns:
+        str: The time, or ``n/a`` if ``value`` is not set.
+    """
+    if value is None:
+        return "n/a"
+    return f"{1000.0 * value:.3f}ms"
+
+
+def _describe_route(rank, route, before, after):
+    """Describe the change for a single route.
+
+    Args:
+        rank (int): The rank of the route (starting at 1).
+        route (str): The route.
+        before (RouteStats): The statistics before.
+        after (RouteStats): The statistics after.
+
+    Returns:
+        List[str]: The lines describing the route.
+    """
+    change = _p90_change(before, after)
+    change_str = "n/a"
+    if change is not None:
+        change_str = f"{1000.0 * change:+.3f}ms"
+    return [
+        f"   {rank}. {route}: p90 {change_str} "
+        f"({_format_ms(before.p90)} -> {_format_ms(after.p90)})",
+        f"      streams = {before.streams} -> {after.streams}, "
+        f"failed = {before.failed} -> {after.failed}",
+        f"      p50 = {_format_ms(before.p50)} -> {_format_ms(after.p50)}, "
+        f"p99 = {_format_ms(before.p99)} -> {_format_ms(after.p99)}",
+        f"      per stream: frames = {before.frames:.2f} -> "
+        f"{after.frames:.2f}, header bytes = {before.header_bytes:.1f} -> "
+        f"{after.header_bytes:.1f}, stalled = "
+        f"{_format_ms(before.stall_time)} -> {_format_ms(after.stall_time)}",
+    ]
+
+
+def _describe_unmatched(label, routes, stats):
+    """Describe the routes only seen on one side.
+
+    Args:
+        label (str): The label for the side, e.g. ``Only before``.
+        routes (List[str]): The unmatched routes.
+        stats (Dict[str, RouteStats]): The statistics for that side.
+
+    Returns:
+        List[str]: The line describing the routes (empty if there are none).
+    """
+    if not routes:
+        return []
+    parts = ", ".join(
+        f"{route} ({stats[route].streams} streams)" for route in routes
+    )
+    return [f"   {label}: {parts}"]
+
+
+def describe_comparison(before_columns, after_columns, top=DEFAULT_TOP):
+    """Describe the (ranked) differences between two sets of captures.
+
+    Args:
+        before_columns (StreamColumns): The per-stream records before.
+        after_columns (StreamColumns): The per-stream records after.
+        top (Optional[int]): The number of (ranked) routes to describe.
+
+    Returns:
+        str: The report.
+    """
+    before = summarize(before_columns)
+    after = summarize(after_columns)
+    ranked = rank_routes(before, after)
+    only_before = sorted(
+        route for route in before.keys() if route not in after
+    )
+    only_after = sorted(
+        route for route in after.keys() if route not in before
+    )
+
+    lines = [
+        "Capture Comparison =",
+        f"   Before: {len(before_columns)} streams on {len(before)} routes "
+        f"from {before_columns.connections} capture(s)",
+        f"   After: {len(after_columns)} streams on {len(after)} routes "
+        f"from {after_columns.connections} capture(s)",
+        f"   Matched routes = {len(ranked)}, only before = "
+        f"{len(only_before)}, only after = {len(only_after)}",
+    ]
+    for rank, route in enumerate(ranked[:top], start=1):
+        lines.extend(_describe_route(rank, route, before[route], after[route]))
+    if len(ranked) > top:
+        lines.append(f"   ... {len(ranked) - top} more matched route(s)")
+    lines.extend(_describe_unmatched("Only before", only_before, before))
+    lines.extend(_describe_unmatched("Only after", only_after, after))
+    return "\n".join(lines)
+
+
+def expand_paths(path):
+    """Expand a capture path, which may be a directory of captures.
+
+    Args:
+        path (str): A capture file or a directory.
+
+    Returns:
+        List[str]: The capture files; for a directory, these are the files
+        in it with a ``.capture`` extension.
+    """
+    if not os.path.isdir(path):
+        return [path]
+    return [
+        os.path.join(path, filename)
+        for filename in sorted(os.listdir(path))
+        if filename.endswith(".capture")
+    ]
+
+
+def get_args():
+    """Get the command line arguments for ``tcp-h2-compare``.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compare the streams in two sets of captures of the same "
+            "workload and rank the routes by regression."
+        ),
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        prog="tcp-h2-compare",
+    )
+    parser.add_argument(
+        "before",
+        metavar="BEFORE",
+        help="A capture file (or a directory of them) for the baseline.",
+    )
+    parser.add_argument(
+        "after",
+        metavar="AFTER",
+        help="A capture file (or a directory of them) to compare.",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=DEFAULT_TOP,
+        help="The number of (ranked) routes to describe.",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    before_columns = load_streams(expand_paths(args.before))
+    after_columns = load_streams(expand_paths(args.after))
+    print(describe_comparison(before_columns, after_columns, top=args.top))
+
+
+if __name__ == "__main__":
+    main()
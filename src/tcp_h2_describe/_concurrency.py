@@ -0,0 +1,305 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Track open streams over time versus ``SETTINGS_MAX_CONCURRENT_STREAMS``.
+
+.. max concurrent streams spec: https://http2.github.io/http2-spec/#SETTINGS_MAX_CONCURRENT_STREAMS
+
+Streams that are "open" or "half-closed" count toward the limit advertised
+by the peer that did **not** initiate them, so streams opened by the client
+are compared with the server's ``SETTINGS_MAX_CONCURRENT_STREAMS`` (and
+pushed streams with the client's). See `max concurrent streams spec`_.
+"""
+
+import time
+
+import tcp_h2_describe._tracker
+
+
+HEADERS = 0x1
+RST_STREAM = 0x3
+FLAG_END_STREAM = 0x1
+SETTINGS_MAX_CONCURRENT_STREAMS = 0x3
+# NOTE: The timeline starts with buckets of ``TIMELINE_INTERVAL`` seconds;
+#       when there are more than ``MAX_TIMELINE_BUCKETS`` buckets, adjacent
+#       pairs are merged (doubling the bucket width) so the timeline for a
+#       long-lived connection stays compact.
+TIMELINE_INTERVAL = 1.0
+MAX_TIMELINE_BUCKETS = 60
+
+
+class StreamConcurrency:
+    """Open streams (over time) initiated by one peer.
+
+    Args:
+        opened_at (float): The (monotonic) time the connection was opened,
+            i.e. the start of the timeline.
+    """
+
+    def __init__(self, opened_at):
+        self.opened_at = opened_at
+        # NOTE: The limit is :data:`None` until the other peer advertises
+        #       ``SETTINGS_MAX_CONCURRENT_STREAMS`` (the default is
+        #       unlimited).
+        self.limit = None
+        # NOTE: ``open_streams`` maps a stream ID to the indicators of
+        #       whether the client and server have ended the stream.
+        self.open_streams = {}
+        self.last_stream_id = 0
+        self.streams_opened = 0
+        self.peak = 0
+        self.at_limit_since = None
+        self.at_limit_time = 0.0
+        self.at_limit_count = 0
+        self.interval = TIMELINE_INTERVAL
+        self.maxima = [0]
+        self.at_limit = [False]
+
+    def _advance(self, now):
+        """Extend the timeline (with the current state) up to a time.
+
+        Args:
+            now (float): The (monotonic) time to extend the timeline to.
+        """
+        index = int((now - self.opened_at) / self.interval)
+        while index >= MAX_TIMELINE_BUCKETS:
+            self._merge()
+            index = int((now - self.opened_at) / self.interval)
+
+        count = len(self.open_streams)
+        at_limit = self.at_limit_since is not None
+        while len(self.maxima) <= index:
+            self.maxima.append(count)
+            self.at_limit.append(at_limit)
+
+    def _merge(self):
+        """Merge adjacent pairs of buckets in the timeline."""
+        maxima = self.maxima
+        at_limit = self.at_limit
+        self.maxima = [
+            max(maxima[index : index + 2])
+            for index in range(0, len(maxima), 2)
+        ]
+        self.at_limit = [
+            any(at_limit[index : index + 2])
+            for index in range(0, len(at_limit), 2)
+        ]
+        self.interval *= 2.0
+
+    def _update(self, now):
+        """Record the current number of open streams.
+
+        This is expected to be called after every change to the open streams
+        or the limit (with the timeline already advanced to ``now``).
+
+        Args:
+            now (float): The (monotonic) time of the change.
+        """
+        count = len(self.open_streams)
+        self.peak = max(self.peak, count)
+        self.maxima[-1] = max(self.maxima[-1], count)
+
+        at_limit = self.limit is not None and count >= self.limit
+        if at_limit:
+            self.at_limit[-1] = True
+            if self.at_limit_since is None:
+                self.at_limit_since = now
+                self.at_limit_count += 1
+        elif self.at_limit_since is not None:
+            self.at_limit_time += now - self.at_limit_since
+            self.at_limit_since = None
+
+    def open(self, stream_id, client_ended, server_ended, now):
+        """Open a stream (if it is new).
+
+        Args:
+            stream_id (int): The stream identifier.
+            client_ended (bool): Indicates if the client has already ended
+                the stream.
+            server_ended (bool): Indicates if the server has already ended
+                the stream.
+            now (float): The (monotonic) time the stream was opened.
+
+        Returns:
+            bool: Indicates if the stream was opened (stream identifiers
+            only increase, so an older stream is never reopened).
+        """
+        if stream_id <= self.last_stream_id:
+            return False
+
+        self._advance(now)
+        self.last_stream_id = stream_id
+        self.streams_opened += 1
+        self.open_streams[stream_id] = [client_ended, server_ended]
+        self._update(now)
+        return True
+
+    def end(self, stream_id, is_client, now):
+        """Mark one peer as done sending on a stream.
+
+        Args:
+            stream_id (int): The stream identifier.
+            is_client (bool): Indicates if the client ended the stream.
+            now (float): The (monotonic) time the stream was ended.
+        """
+        ended = self.open_streams.get(stream_id)
+        if ended is None:
+            return
+
+        ended[0 if is_client else 1] = True
+        if ended[0] and ended[1]:
+            self.close(stream_id, now)
+
+    def close(self, stream_id, now):
+        """Close a stream (e.g. due to RST_STREAM).
+
+        Args:
+            stream_id (int): The stream identifier.
+            now (float): The (monotonic) time the stream was closed.
+        """
+        if stream_id not in self.open_streams:
+            return
+
+        self._advance(now)
+        del self.open_streams[stream_id]
+        self._update(now)
+
+    def set_limit(self, limit, now):
+        """Apply a new ``SETTINGS_MAX_CONCURRENT_STREAMS``.
+
+        Args:
+            limit (int): The new limit.
+            now (float): The (monotonic) time the setting took effect.
+        """
+        self._advance(now)
+        self.limit = limit
+        self._update(now)
+
+    def total_at_limit_time(self, now):
+        """Compute the time spent at the limit (so far).
+
+        Args:
+            now (float): The current (monotonic) time.
+
+        Returns:
+            float: The total time at the limit, in seconds.
+        """
+        total = self.at_limit_time
+        if self.at_limit_since is not None:
+            total += now - self.at_limit_since
+        return total
+
+    def describe(self, label, limited_by, now):
+        """Describe the open streams and the timeline.
+
+        Args:
+            label (str): The label for the initiating peer, e.g.
+                ``Client streams``.
+            limited_by (str): The peer that advertises the limit.
+            now (float): The current (monotonic) time.
+
+        Returns:
+            List[str]: The description.
+        """
+        self._advance(now)
+        limit = "unlimited" if self.limit is None else str(self.limit)
+        at_limit_time = self.total_at_limit_time(now)
+        fraction = 100.0 * at_limit_time / max(now - self.opened_at, 1e-9)
+        timeline = " ".join(
+            f"{maximum}*" if at_limit else str(maximum)
+            for maximum, at_limit in zip(self.maxima, self.at_limit)
+        )
+        return [
+            f"   {label}: limit = {limit} (from {limited_by}), open = "
+            f"{len(self.open_streams)}, peak = {self.peak}, opened = "
+            f"{self.streams_opened}",
+            f"      at limit {self.at_limit_count} time(s) for "
+            f"{1000.0 * at_limit_time:.3f}ms ({fraction:.1f}% of the "
+            "connection)",
+            f"      max open per {self.interval:g}s (* = at limit): "
+            f"{timeline}",
+        ]
+
+
+class ConcurrencyTracker(tcp_h2_describe._tracker.Tracker):
+    """Track the streams opened by each peer in a connection.
+
+    Args:
+        connection (.ConnectionState): The connection being tracked.
+    """
+
+    def __init__(self, connection):
+        super().__init__(connection)
+        self.client = StreamConcurrency(connection.opened_at)
+        self.server = StreamConcurrency(connection.opened_at)
+
+    def _initiator(self, stream_id):
+        """Get the open streams for the peer that initiated a stream.
+
+        Args:
+            stream_id (int): The stream identifier.
+
+        Returns:
+            StreamConcurrency: The open streams for the client (odd stream
+            identifiers) or the server (even stream identifiers).
+        """
+        if stream_id % 2 == 1:
+            return self.client
+        return self.server
+
+    def on_frame(self, peer, type_byte, flags, stream_id, frame_payload):
+        if stream_id == 0:
+            return
+
+        now = peer.received_at
+        initiator = self._initiator(stream_id)
+        end_stream = flags & FLAG_END_STREAM == FLAG_END_STREAM
+        if type_byte == HEADERS:
+            # NOTE: A pushed stream is "half-closed" for the client as soon
+            #       as the server sends HEADERS on it.
+            client_ended = initiator is self.server
+            if peer.is_client:
+                client_ended = client_ended or end_stream
+            opened = initiator.open(
+                stream_id,
+                client_ended,
+                not peer.is_client and end_stream,
+                now,
+            )
+            if opened:
+                return
+        elif type_byte == RST_STREAM:
+            initiator.close(stream_id, now)
+            return
+
+        if end_stream:
+            initiator.end(stream_id, peer.is_client, now)
+
+    def on_settings(self, peer, settings):
+        # NOTE: Settings advertised by ``peer`` limit the streams initiated
+        #       by the **other** peer.
+        other = self.connection.other(peer)
+        initiator = self.client if other.is_client else self.server
+        for setting_id, setting_value in settings:
+            if setting_id == SETTINGS_MAX_CONCURRENT_STREAMS:
+                initiator.set_limit(setting_value, other.received_at)
+
+    def describe(self):
+        now = time.monotonic()
+        description = self.connection.client.description
+        lines = [f"Stream Concurrency ({description}) ="]
+        lines.extend(self.client.describe("Client streams", "server", now))
+        if self.server.streams_opened:
+            lines.extend(
+                self.server.describe("Pushed streams", "client", now)
+            )
+        return "\n".join(lines)
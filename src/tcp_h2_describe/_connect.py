@@ -13,14 +13,19 @@
 import errno
 import socket
 import threading
+import time
 
 import tcp_h2_describe._buffer
+import tcp_h2_describe._debug
 import tcp_h2_describe._describe
 import tcp_h2_describe._display
+import tcp_h2_describe._flight
 import tcp_h2_describe._proxy_protocol
+import tcp_h2_describe._state
+import tcp_h2_describe._summary
 
 
-def redirect_socket(recv_socket, send_socket, description, is_client):
+def redirect_socket(recv_socket, send_socket, peer):
     """Redirect a TCP stream from one socket to another.
 
     This only redirects in **one** direction, i.e. it RECVs from
@@ -29,44 +34,90 @@ def redirect_socket(recv_socket, send_socket, description, is_client):
     Args:
         recv_socket (socket.socket): The socket that will be RECV-ed from.
         send_socket (socket.socket): The socket that will be SENT to.
-        description (str): A description of the RECV->SEND relationship for
-            this socket pair.
-        is_client (bool): Indicates if the ``recv_socket`` is a client socket.
-            For a client socket, the connection **may** begin with a proxy
-            protocol line and **should** begin with the client connection
-            preface.
+        peer (.PeerState): The state for the RECV->SEND relationship for
+            this socket pair. If ``peer`` is the client, the connection
+            **may** begin with a proxy protocol line and **should** begin
+            with the client connection preface.
     """
+    description = peer.description
+    peer.send_socket = send_socket
+    summary_only = peer.connection.options.summary_interval is not None
+    # NOTE: With triggers, frames are only described during a capture.
+    trigger = peer.connection.trigger
+    capture = peer.connection.capture
     expect_preface = False
     proxy_line = None
-    if is_client:
+    if peer.is_client:
         expect_preface = True
         proxy_line = tcp_h2_describe._proxy_protocol.consume_proxy_line(
             recv_socket, send_socket
         )
 
-    tcp_chunk = tcp_h2_describe._buffer.recv(recv_socket, send_socket)
-    while tcp_chunk != b"":
-        # Describe the chunk that was just encountered
-        message = tcp_h2_describe._describe.describe(
-            tcp_chunk, description, expect_preface, proxy_line
+    # NOTE: The ``recv_socket`` is closed even if describing or forwarding
+    #       fails, so that the thread handling the other direction can exit
+    #       (and the connection can be marked inactive).
+    tcp_h2_describe._debug.register_thread(description)
+    try:
+        tcp_chunk = tcp_h2_describe._buffer.recv(
+            recv_socket, send_socket, peer.buffer_size()
         )
-        tcp_h2_describe._display.display(message)
-        # After the first usage, make sure ``expect_preface`` and
-        # ``proxy_line`` are not set.
-        expect_preface = False
-        proxy_line = None
-
-        tcp_h2_describe._buffer.send(send_socket, tcp_chunk)
-        # Read the next chunk from the socket.
-        tcp_chunk = tcp_h2_describe._buffer.recv(recv_socket, send_socket)
+        while tcp_chunk != b"":
+            peer.received_at = time.monotonic()
+            if capture is not None:
+                capture.write(peer.received_at, tcp_chunk, peer.is_client)
+            # Describe the (complete) frames that were just encountered
+            h2_frames = peer.feed(tcp_chunk, expect_preface)
+            if summary_only or (
+                trigger is not None
+                and not trigger.capturing(peer.received_at)
+            ):
+                tcp_h2_describe._describe.observe(
+                    h2_frames, expect_preface, peer
+                )
+            elif h2_frames or proxy_line is not None:
+                message = tcp_h2_describe._describe.describe(
+                    h2_frames, description, expect_preface, proxy_line, peer
+                )
+                tcp_h2_describe._display.display(message)
+            for report in peer.pop_reports():
+                tcp_h2_describe._display.display(report)
+            # After the first usage, make sure ``expect_preface`` and
+            # ``proxy_line`` are not set.
+            expect_preface = False
+            proxy_line = None
+
+            peer.send(tcp_chunk)
+            # Read the next chunk from the socket.
+            tcp_chunk = tcp_h2_describe._buffer.recv(
+                recv_socket, send_socket, peer.buffer_size()
+            )
+        # NOTE: Closing ``recv_socket`` signals the other thread to close
+        #       ``send_socket``, so (with shaping) any delayed chunks must be
+        #       forwarded first.
+        if peer.shaper is not None:
+            peer.shaper.flush()
+    except Exception:
+        if peer.flight is not None:
+            tcp_h2_describe._display.display(
+                tcp_h2_describe._flight.describe_flight(
+                    peer.connection, f"proxy failed for {description}"
+                )
+            )
+        raise
+    finally:
+        if peer.shaper is not None:
+            peer.shaper.close()
+        recv_socket.close()
+        tcp_h2_describe._debug.unregister_thread()
 
     tcp_h2_describe._display.display(
         f"Done redirecting socket for {description}"
     )
-    recv_socket.close()
 
 
-def connect_socket_pair(client_socket, client_addr, server_host, server_port):
+def connect_socket_pair(
+    client_socket, client_addr, server_host, server_port, options
+):
     """Connect two socket pairs for bidirectional RECV<->SEND.
 
     Since calls to RECV (both on the client and the server sockets) can block,
@@ -84,6 +135,7 @@ def connect_socket_pair(client_socket, client_addr, server_host, server_port):
         server_host (str): The host name where the "server" process is running
             (i.e. the server that is being proxied).
         server_port (int): A port number for a running "server" process.
+        options (.ProxyOptions): The options for the proxy.
     """
     server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     # See: https://docs.python.org/3/library/socket.html#timeouts-and-the-accept-method
@@ -95,18 +147,40 @@ def connect_socket_pair(client_socket, client_addr, server_host, server_port):
 
     server_addr = f"{server_host}:{server_port}"
     read_description = f"client({client_addr})->proxy->server({server_addr})"
+    write_description = f"server({server_addr})->proxy->client({client_addr})"
+    connection = tcp_h2_describe._state.ConnectionState(
+        read_description, write_description, options
+    )
     t_read = threading.Thread(
         target=redirect_socket,
-        args=(client_socket, server_socket, read_description, True),
+        args=(client_socket, server_socket, connection.client),
     )
-    write_description = f"server({server_addr})->proxy->client({client_addr})"
     t_write = threading.Thread(
         target=redirect_socket,
-        args=(server_socket, client_socket, write_description, False),
+        args=(server_socket, client_socket, connection.server),
     )
 
+    connection.open()
     t_read.start()
     t_write.start()
 
     t_read.join()
     t_write.join()
+    connection.close()
+
+    if options.stream_timing:
+        for report in connection.describe_incomplete():
+            tcp_h2_describe._display.display(report)
+
+    if options.summary_interval is not None:
+        tcp_h2_describe._display.display(
+            tcp_h2_describe._summary.describe_summary(connection)
+        )
+        return
+
+    for report in connection.describe_trackers():
+        tcp_h2_describe._display.display(report)
+
+    stream_totals = connection.describe_streams()
+    if stream_totals:
+        tcp_h2_describe._display.display(stream_totals)
@@ -0,0 +1,234 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import os
+import signal
+import sys
+import textwrap
+import threading
+import time
+import traceback
+
+import tcp_h2_describe._display
+import tcp_h2_describe._flight
+
+
+SAMPLE_INTERVAL = 0.005  # 5 milliseconds, in seconds
+PROFILE_TEMPLATE = "tcp-h2-describe-{pid}-{timestamp}.collapsed"
+# NOTE: A redirect thread with one of these functions at the top of its
+#       stack is waiting on a socket, rather than doing work.
+IDLE_FUNCTIONS = frozenset(["wait_readable"])
+# NOTE: Maps the ``threading.get_ident()`` of each redirect thread to the
+#       description of the RECV->SEND relationship it handles.
+THREAD_DESCRIPTIONS = {}
+THREAD_LOCK = threading.Lock()
+SAMPLER = None
+SAMPLER_LOCK = threading.Lock()
+
+
+def register_thread(description):
+    """Register the current thread as handling a RECV->SEND relationship.
+
+    Args:
+        description (str): The description of the RECV->SEND relationship.
+    """
+    with THREAD_LOCK:
+        THREAD_DESCRIPTIONS[threading.get_ident()] = description
+
+
+def unregister_thread():
+    """Remove the current thread from the registered threads."""
+    with THREAD_LOCK:
+        THREAD_DESCRIPTIONS.pop(threading.get_ident(), None)
+
+
+def describe_stacks():
+    """Describe the current stack of every thread.
+
+    Returns:
+        str: The stacks, labeled with the RECV->SEND description for each
+        redirect thread and with the thread name for all others.
+    """
+    with THREAD_LOCK:
+        descriptions = dict(THREAD_DESCRIPTIONS)
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    frames = sys._current_frames()
+
+    lines = [f"Thread Stacks ({len(frames)} threads) ="]
+    for ident, frame in frames.items():
+        label = descriptions.get(ident, names.get(ident, "UNKNOWN"))
+        lines.append(f"   {label} [{ident}]:")
+        stack = "".join(traceback.format_stack(frame)).rstrip("\n")
+        lines.append(textwrap.indent(stack, "      "))
+    return "\n".join(lines)
+
+
+def collapse_stack(frame):
+    """Collapse a stack into a single line.
+
+    The collapsed format (one line per stack, with the frames separated by
+    ``;``, root first) is the format used by ``flamegraph.pl``.
+
+    Args:
+        frame (types.FrameType): The innermost frame of the stack.
+
+    Returns:
+        str: The collapsed stack.
+    """
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        filename = os.path.basename(code.co_filename)
+        names.append(f"{filename}:{code.co_name}")
+        frame = frame.f_back
+    names.reverse()
+    return ";".join(names)
+
+
+class Sampler:
+    """Sample the stacks of the redirect threads on an interval.
+
+    Args:
+        interval (Optional[float]): The time (in seconds) between samples.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.counts = collections.Counter()
+        self.busy = 0
+        self.idle = 0
+        self.started_at = None
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def sample(self):
+        """Take a single sample of the (registered) redirect threads."""
+        with THREAD_LOCK:
+            idents = list(THREAD_DESCRIPTIONS.keys())
+        frames = sys._current_frames()
+        for ident in idents:
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            if frame.f_code.co_name in IDLE_FUNCTIONS:
+                self.idle += 1
+                continue
+
+            self.busy += 1
+            self.counts[collapse_stack(frame)] += 1
+
+    def _run(self):
+        """Take samples until stopped."""
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        """Start sampling (in a daemon thread)."""
+        self.started_at = time.time()
+        self.thread = threading.Thread(
+            target=self._run, name="tcp-h2-describe-sampler", daemon=True
+        )
+        self.thread.start()
+
+    def stop(self):
+        """Stop sampling and wait for the sampling thread to exit."""
+        self.stopped.set()
+        self.thread.join()
+
+    def write(self, filename):
+        """Write the samples as collapsed stacks.
+
+        Args:
+            filename (str): The file to write to.
+        """
+        with open(filename, "w") as file_obj:
+            for stack, count in self.counts.most_common():
+                file_obj.write(f"{stack} {count}\n")
+
+
+def toggle_profiler():
+    """Start the sampling profiler, or stop it and write the samples.
+
+    Only one profiler can be running at a time, so this stops a running
+    profiler (and writes its samples) and otherwise starts a new one.
+    """
+    global SAMPLER
+
+    with SAMPLER_LOCK:
+        sampler = SAMPLER
+        if sampler is None:
+            SAMPLER = Sampler()
+            SAMPLER.start()
+            tcp_h2_describe._display.display("Started sampling profiler")
+            return
+
+        SAMPLER = None
+
+    sampler.stop()
+    filename = PROFILE_TEMPLATE.format(
+        pid=os.getpid(), timestamp=int(sampler.started_at)
+    )
+    sampler.write(filename)
+    tcp_h2_describe._display.display(
+        f"Stopped sampling profiler ({sampler.busy} busy samples, "
+        f"{sampler.idle} idle samples), wrote {filename}"
+    )
+
+
+def _handle_in_thread(target):
+    """Make a signal handler that calls a function in a new thread.
+
+    The work is done in a new thread rather than in the signal handler so
+    that it does not interrupt (e.g.) a ``print()`` in the main thread.
+
+    Args:
+        target (Callable[[], None]): The function to call.
+
+    Returns:
+        Callable[[int, types.FrameType], None]: The signal handler.
+    """
+
+    def handler(unused_signum, unused_frame):
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+
+    return handler
+
+
+def _display_stacks():
+    """Display the current stack of every thread.
+
+    The flight recorder (if enabled) for every active connection is also
+    displayed.
+    """
+    tcp_h2_describe._display.display(describe_stacks())
+    for report in tcp_h2_describe._flight.describe_active("SIGUSR2"):
+        tcp_h2_describe._display.display(report)
+
+
+def install_handlers():
+    """Install the ``SIGUSR1`` (profiler) and ``SIGUSR2`` (stacks) handlers.
+
+    This must be called from the main thread.
+
+    Raises:
+        RuntimeError: If the platform does not support ``SIGUSR1`` and
+            ``SIGUSR2`` (e.g. Windows).
+    """
+    if not hasattr(signal, "SIGUSR1"):
+        raise RuntimeError(
+            "SIGUSR1 and SIGUSR2 are not supported on this platform"
+        )
+
+    signal.signal(signal.SIGUSR1, _handle_in_thread(toggle_profiler))
+    signal.signal(signal.SIGUSR2, _handle_in_thread(_display_stacks))
@@ -0,0 +1,113 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import zlib
+
+
+# NOTE: The ``wbits`` used by ``zlib.decompressobj()`` for each supported
+#       encoding (i.e. the value of a ``content-encoding`` or
+#       ``grpc-encoding`` header).
+WBITS = {
+    "gzip": 16 + zlib.MAX_WBITS,
+    "x-gzip": 16 + zlib.MAX_WBITS,
+    "deflate": zlib.MAX_WBITS,
+}
+# NOTE: A compressed body can expand by a factor of more than 1000, so the
+#       total output for a single body is limited.
+MAX_OUTPUT_SIZE = 0x1000000
+
+
+class Decompressor:
+    """Incrementally decompress a body as it is streamed.
+
+    Args:
+        encoding (str): The encoding, one of the keys in ``WBITS``.
+        max_output_size (Optional[int]): The maximum number of (decompressed)
+            bytes that will be produced. Once this is exceeded, the rest of
+            the body is ignored.
+    """
+
+    def __init__(self, encoding, max_output_size=MAX_OUTPUT_SIZE):
+        self.encoding = encoding
+        self.decompressobj = zlib.decompressobj(WBITS[encoding])
+        self.max_output_size = max_output_size
+        self.output_size = 0
+        self.exceeded = False
+        self.error = None
+
+    def decompress(self, data):
+        """Decompress the next chunk of a body.
+
+        Args:
+            data (bytes): The next chunk of compressed data.
+
+        Returns:
+            bytes: The decompressed data. This will be empty once the output
+            limit has been exceeded or if the body is not valid.
+        """
+        if self.exceeded or self.error is not None:
+            return b""
+
+        remaining = self.max_output_size - self.output_size
+        try:
+            # NOTE: Asking for one more byte than allowed is enough to
+            #       determine if the limit has been exceeded.
+            output = self.decompressobj.decompress(data, remaining + 1)
+        except zlib.error as exc:
+            self.error = exc
+            return b""
+
+        if len(output) > remaining or self.decompressobj.unconsumed_tail:
+            self.exceeded = True
+            output = output[:remaining]
+
+        self.output_size += len(output)
+        return output
+
+    def describe_status(self):
+        """Describe why output is no longer being produced (if it isn't).
+
+        Returns:
+            Optional[str]: The reason, or :data:`None` if the body is still
+            being decompressed.
+        """
+        if self.error is not None:
+            return f"decompression failed: {self.error}"
+        if self.exceeded:
+            return (
+                "decompressed size is larger than "
+                f"{self.max_output_size} bytes"
+            )
+        return None
+
+
+def make_decompressor(encoding, max_output_size=MAX_OUTPUT_SIZE):
+    """Make a decompressor for an encoding (if supported).
+
+    Args:
+        encoding (Optional[str]): The value of a ``content-encoding`` or
+            ``grpc-encoding`` header.
+        max_output_size (Optional[int]): The maximum number of (decompressed)
+            bytes that will be produced.
+
+    Returns:
+        Optional[Decompressor]: The decompressor, or :data:`None` if
+        ``encoding`` is not set, is ``identity`` or is not supported.
+    """
+    if encoding is None:
+        return None
+
+    encoding = encoding.strip().lower()
+    if encoding not in WBITS:
+        return None
+
+    return Decompressor(encoding, max_output_size)
@@ -13,8 +13,6 @@
 import struct
 import textwrap
 
-import hpack
-
 
 PREFACE = b"PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n"
 PREFACE_PRETTY = r"""Client Connection Preface = b'PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n'
@@ -28,7 +26,13 @@ HEADER = "=" * 60
 FOOTER = "-" * 40
 STRUCT_H = struct.Struct(">H")
 STRUCT_L = struct.Struct(">L")
-HPACK_DECODER = hpack.Decoder()
+STRUCT_SETTING = struct.Struct(">HL")
+# NOTE: The 24-bit frame length is split as a 16-bit and an 8-bit value.
+STRUCT_FRAME_HEADER = struct.Struct(">HBBBL")
+# NOTE: The decoder used for header blocks described without a peer; it is
+#       created by ``_global_hpack_decoder()`` when first needed, so that
+#       ``hpack`` is not imported until a header block is decoded.
+HPACK_DECODER = None
 # See: https://http2.github.io/http2-spec/#iana-frames
 FRAME_TYPES = {
     0x0: "DATA",
@@ -78,6 +82,14 @@ FLAGS_DEFINED = {
     # See: https://http2.github.io/http2-spec/#CONTINUATION
     "CONTINUATION": {FLAG_END_HEADERS: "END_HEADERS"},
 }
+# NOTE: These lookup tables are indexed directly by a byte from a frame
+#       header, so the per-frame work in ``next_h2_frame()`` is a handful of
+#       ``tuple`` / ``list`` lookups rather than formatting and sorting.
+DATA_TYPE_BYTE = 0x0
+PUSH_PROMISE_TYPE_BYTE = 0x5
+CONTINUATION_TYPE_BYTE = 0x9
+HEX_BYTES = tuple(f"{value:02x}" for value in range(256))
+FRAME_TYPE_NAMES = tuple(FRAME_TYPES.get(value) for value in range(256))
 # NOTE: Using an ``object()`` sentinel for an identity check will not work
 #       across threads. However, it's not expected that code using this module
 #       will be forked.
@@ -94,7 +106,16 @@ FRAME_PAYLOAD_HANDLERS = {
     "WINDOW_UPDATE": UNSET,
     "CONTINUATION": UNSET,
 }
+# NOTE: The dispatch tables below are populated at the bottom of this module
+#       (and kept in sync by ``register_payload_handler()``).
+FLAG_DESCRIPTIONS = {}
+FLAG_DESCRIPTION_TABLE = [None] * 256
+PAYLOAD_HANDLER_TABLE = [None] * 256
+# NOTE: Indicates (for each frame type byte) if the payload handler expects a
+#       ``FrameContext`` as a third argument.
+PAYLOAD_CONTEXT_TABLE = [False] * 256
 RESERVED_HIGHEST_BIT = 0x80000000
+STREAM_ID_MASK = 0x7FFFFFFF
 SETTINGS = {
     # See: https://http2.github.io/http2-spec/#SettingValues
     0x1: "SETTINGS_HEADER_TABLE_SIZE",
@@ -106,6 +127,9 @@ SETTINGS = {
     # See: https://tools.ietf.org/html/rfc8441
     0x8: "SETTINGS_ENABLE_CONNECT_PROTOCOL",
 }
+# NOTE: Custom settings whose names are loaded (i.e. moved into ``SETTINGS``)
+#       the first time they are described.
+LAZY_SETTINGS = {}
 
 
 def simple_hexdump(bytes_, row_size=16):
@@ -148,8 +172,24 @@ def describe_flags(frame_type, flags):
     Raises:
         RuntimeError: If not all bit flags are accounted for.
     """
-    flag_map = FLAGS_DEFINED[frame_type]
+    description = FLAG_DESCRIPTIONS[frame_type][flags]
+    if description is None:
+        raise RuntimeError("Some flags not accounted for", frame_type, flags)
+
+    return description
 
+
+def _compute_flags_description(flag_map, flags):
+    """Convert a set of flags into a description (without a lookup table).
+
+    Args:
+        flag_map (Dict[int, str]): The flags defined for a frame type.
+        flags (int): The flags for the current frame.
+
+    Returns:
+        Optional[str]: The "pretty" description of the flags or :data:`None`
+        if not all bit flags are accounted for.
+    """
     remaining = flags
     description_parts = []
     for flag_value in sorted(flag_map.keys()):
@@ -160,7 +200,7 @@ def describe_flags(frame_type, flags):
             )
 
     if remaining != 0:
-        raise RuntimeError("Some flags not accounted for", frame_type, flags)
+        return None
 
     if not description_parts:
         return "UNSET"
@@ -168,6 +208,34 @@ def describe_flags(frame_type, flags):
     return " | ".join(description_parts)
 
 
+def _flag_descriptions(flag_map):
+    """Compute the description for every possible set of flags.
+
+    Only subsets of the defined flags can be described, so only those are
+    computed (rather than all 256 values).
+
+    Args:
+        flag_map (Dict[int, str]): The flags defined for a frame type.
+
+    Returns:
+        Tuple[Optional[str], ...]: The description for each value of the
+        flags byte (or :data:`None` if not all bit flags are accounted for).
+    """
+    descriptions = [None] * 256
+    defined = 0
+    for flag_value in flag_map.keys():
+        defined |= flag_value
+
+    subset = defined
+    while True:
+        descriptions[subset] = _compute_flags_description(flag_map, subset)
+        if subset == 0:
+            break
+        subset = (subset - 1) & defined
+
+    return tuple(descriptions)
+
+
 def default_payload_handler(frame_payload, unused_flags):
     """Default handler for an HTTP/2 frame payload.
 
@@ -194,7 +262,155 @@ def default_payload_handler(frame_payload, unused_flags):
     )
 
 
-def handle_headers_payload(frame_payload, flags):
+def remove_padding(frame_payload, flags):
+    """Remove the padding from a DATA HTTP/2 frame payload.
+
+    .. DATA spec: https://http2.github.io/http2-spec/#DATA
+
+    See `DATA spec`_.
+
+    Args:
+        frame_payload (bytes): The frame payload.
+        flags (int): The flags for the frame payload.
+
+    Returns:
+        bytes: The data in ``frame_payload`` (without padding).
+    """
+    if flags & FLAG_PADDED != FLAG_PADDED or frame_payload == b"":
+        return frame_payload
+
+    pad_length = frame_payload[0]
+    return frame_payload[1 : len(frame_payload) - pad_length]
+
+
+def handle_data_payload(frame_payload, flags, context=None):
+    """Handle a DATA HTTP/2 frame payload.
+
+    .. DATA spec: https://http2.github.io/http2-spec/#DATA
+
+    If the body is compressed (based on the ``content-encoding`` header for
+    the stream), the data is decompressed incrementally, i.e. as each DATA
+    frame is seen. See `DATA spec`_.
+
+    Args:
+        frame_payload (bytes): The frame payload to be parsed.
+        flags (int): The flags for the frame payload.
+        context (Optional[.FrameContext]): The context for the frame.
+
+    Returns:
+        str: The description from :func:`default_payload_handler` along with
+        the decompressed data (if the body is compressed).
+    """
+    description = default_payload_handler(frame_payload, flags)
+    if context is None or context.stream is None:
+        return description
+
+    if context.peer.is_client:
+        decompressor = context.stream.client_decompressor
+    else:
+        decompressor = context.stream.server_decompressor
+    if decompressor is None:
+        return description
+
+    was_active = decompressor.describe_status() is None
+    decompressed = decompressor.decompress(
+        remove_padding(frame_payload, flags)
+    )
+    status = decompressor.describe_status()
+    if not decompressed and (status is None or not was_active):
+        return description
+
+    lines = [f"Decompressed Payload ({decompressor.encoding}) ="]
+    if decompressed:
+        lines.append(f"   {decompressed}")
+    if status is not None:
+        lines.append(f"   ({status})")
+    return "\n".join([description] + lines)
+
+
+def header_block_fragment(type_byte, flags, frame_payload):
+    """Get the header block fragment from a frame payload.
+
+    .. HEADERS spec: https://http2.github.io/http2-spec/#HEADERS
+    .. PUSH_PROMISE spec: https://http2.github.io/http2-spec/#PUSH_PROMISE
+
+    This removes the padding, priority fields (for HEADERS) and promised
+    stream ID (for PUSH_PROMISE) from ``frame_payload``. See `HEADERS spec`_
+    and `PUSH_PROMISE spec`_.
+
+    Args:
+        type_byte (int): The frame type; one of HEADERS, PUSH_PROMISE or
+            CONTINUATION.
+        flags (int): The flags for the frame payload.
+        frame_payload (Union[bytes, memoryview]): The frame payload.
+
+    Returns:
+        Union[bytes, memoryview]: The header block fragment (a slice of
+        ``frame_payload``).
+
+    Raises:
+        ValueError: If the padding is longer than ``frame_payload`` allows.
+    """
+    if type_byte == CONTINUATION_TYPE_BYTE:
+        return frame_payload
+
+    start = 0
+    end = len(frame_payload)
+    if flags & FLAG_PADDED == FLAG_PADDED and end > 0:
+        start = 1
+        end -= frame_payload[0]
+    if type_byte == PUSH_PROMISE_TYPE_BYTE:
+        start += 4
+    elif flags & FLAG_PRIORITY == FLAG_PRIORITY:
+        start += 5
+
+    if end < start:
+        raise ValueError(
+            "Padding exceeds the size of the frame payload", frame_payload
+        )
+
+    return frame_payload[start:end]
+
+
+def _global_hpack_decoder():
+    """Get the HPACK decoder for header blocks described without a peer.
+
+    Returns:
+        hpack.Decoder: The decoder.
+    """
+    global HPACK_DECODER
+
+    if HPACK_DECODER is None:
+        import hpack
+
+        HPACK_DECODER = hpack.Decoder()
+    return HPACK_DECODER
+
+
+def _describe_header_block(headers, frame_payload):
+    """Describe a decoded header block.
+
+    Args:
+        headers (Optional[List[Tuple[str, str]]]): The decoded headers, or
+            :data:`None` if the header block continues in a CONTINUATION
+            frame.
+        frame_payload (bytes): The frame payload that ends (or starts) the
+            header block.
+
+    Returns:
+        str: A list of the headers and the hexdump for ``frame_payload``.
+    """
+    if headers is None:
+        lines = ["Headers = (continued in CONTINUATION)"]
+    else:
+        lines = ["Headers ="]
+        lines.extend(f"   {key!r} -> {value!r}" for key, value in headers)
+    lines.append("Hexdump (Compressed Headers) =")
+    lines.append(textwrap.indent(simple_hexdump(frame_payload), "   "))
+    return "\n".join(lines)
+
+
+def handle_headers_payload(frame_payload, flags, context=None):
     """Handle a HEADERS HTTP/2 frame payload.
 
     .. HEADERS spec: https://http2.github.io/http2-spec/#HEADERS
@@ -202,18 +418,29 @@ def handle_headers_payload(frame_payload, flags):
 
     See `HEADERS spec`_ and `header compression and decompression`_.
 
+    When a ``context`` is provided, the header block has already been
+    decoded (with the HPACK decoder for the peer that sent it), so padding,
+    priority and CONTINUATION frames are supported. Without a ``context``
+    the payload is decoded with a single shared HPACK decoder.
+
     Args:
         frame_payload (bytes): The frame payload to be parsed.
         flags (int): The flags for the frame payload.
+        context (Optional[.FrameContext]): The context for the frame.
 
     Returns:
         str: A list of the headers in the payload and the hexdump for
         ``frame_payload``.
 
     Raises:
-        NotImplementedError: If ``flags`` has ``PADDED`` set.
-        NotImplementedError: If ``flags`` has ``PRIORITY`` set.
+        NotImplementedError: If ``flags`` has ``PADDED`` set (and there is
+            no ``context``).
+        NotImplementedError: If ``flags`` has ``PRIORITY`` set (and there is
+            no ``context``).
     """
+    if context is not None:
+        return _describe_header_block(context.headers, frame_payload)
+
     if flags & FLAG_PADDED == FLAG_PADDED:
         raise NotImplementedError(
             "PADDED flag not currently supported for headers"
@@ -223,12 +450,60 @@ def handle_headers_payload(frame_payload, flags):
             "PRIORITY flag not currently supported for headers"
         )
 
-    lines = ["Headers ="]
-    headers = HPACK_DECODER.decode(frame_payload)
-    lines.extend(f"   {key!r} -> {value!r}" for key, value in headers)
-    lines.append("Hexdump (Compressed Headers) =")
-    lines.append(textwrap.indent(simple_hexdump(frame_payload), "   "))
-    return "\n".join(lines)
+    headers = _global_hpack_decoder().decode(frame_payload)
+    return _describe_header_block(headers, frame_payload)
+
+
+def handle_continuation_payload(frame_payload, flags, context=None):
+    """Handle a CONTINUATION HTTP/2 frame payload.
+
+    .. CONTINUATION spec: https://http2.github.io/http2-spec/#CONTINUATION
+
+    See `CONTINUATION spec`_.
+
+    Args:
+        frame_payload (bytes): The frame payload to be parsed.
+        flags (int): The flags for the frame payload.
+        context (Optional[.FrameContext]): The context for the frame.
+
+    Returns:
+        str: The headers (if ``frame_payload`` ends a header block) and the
+        hexdump for ``frame_payload``.
+    """
+    if context is None or context.headers is None:
+        return default_payload_handler(frame_payload, flags)
+
+    return _describe_header_block(context.headers, frame_payload)
+
+
+def parse_settings(frame_payload):
+    """Parse the settings in a SETTINGS HTTP/2 frame payload.
+
+    .. SETTINGS spec: https://http2.github.io/http2-spec/#SETTINGS
+
+    See `SETTINGS spec`_.
+
+    Args:
+        frame_payload (Union[bytes, memoryview]): The frame payload to be
+            parsed.
+
+    Returns:
+        List[Tuple[int, int]]: The ``(setting_id, setting_value)`` pairs in
+        ``frame_payload`` (in the order they were sent).
+
+    Raises:
+        ValueError: If the length of ``frame_payload`` is not a multiple of 6.
+    """
+    if len(frame_payload) % 6 != 0:
+        raise ValueError(
+            "The length of the frame payload is not a multiple of 6.",
+            frame_payload,
+        )
+
+    return [
+        STRUCT_SETTING.unpack_from(frame_payload, start)
+        for start in range(0, len(frame_payload), 6)
+    ]
 
 
 def handle_settings_payload(frame_payload, unused_flags):
@@ -249,27 +524,18 @@ def handle_settings_payload(frame_payload, unused_flags):
     Raises:
         ValueError: If the length of ``frame_payload`` is not a multiple of 6.
     """
-    num_settings, remainder = divmod(len(frame_payload), 6)
-    if remainder != 0:
-        raise ValueError(
-            "The length of the frame payload is not a multiple of 6.",
-            frame_payload,
-        )
-
-    if num_settings == 0:
+    settings = parse_settings(frame_payload)
+    if not settings:
         return ""
 
     lines = ["Settings ="]
-    for setting in range(num_settings):
-        start = 6 * setting
+    for index, (setting_id, setting_value) in enumerate(settings):
+        start = 6 * index
 
-        setting_id, = STRUCT_H.unpack(frame_payload[start : start + 2])
-        setting_id_str = SETTINGS.get(setting_id, "UNKNOWN")
+        setting_id_str = setting_name(setting_id)
         setting_id_hex = simple_hexdump(
             frame_payload[start : start + 2], row_size=-1
         )
-
-        setting_value, = STRUCT_L.unpack(frame_payload[start + 2 : start + 6])
         setting_value_hex = simple_hexdump(
             frame_payload[start + 2 : start + 6], row_size=-1
         )
@@ -342,17 +608,25 @@ def handle_window_update_payload(frame_payload, unused_flags):
     )
 
 
-def next_h2_frame(h2_frames):
+def next_h2_frame(h2_frames, peer=None):
     """Parse the next HTTP/2 frame from partially parsed TCP packet data.
 
     .. frame header spec: https://http2.github.io/http2-spec/#FrameHeader
 
+    If ``h2_frames`` is a ``memoryview``, the remaining bytes are returned as a
+    ``memoryview`` as well, so that no copy is made of the unparsed frames.
+
     Args:
-        h2_frames (bytes): The remaining unparsed HTTP/2 frames (as raw bytes)
-            from TCP packet data.
+        h2_frames (Union[bytes, memoryview]): The remaining unparsed HTTP/2
+            frames (as raw bytes) from TCP packet data.
+        peer (Optional[.PeerState]): The state for the RECV->SEND
+            relationship that sent ``h2_frames``. If provided, DATA frame
+            lengths will be recorded for each stream and (when
+            ``pass_through_data`` is set) DATA payloads will not be
+            materialized.
 
     Returns:
-        Tuple[List[str], bytes]: A pair of
+        Tuple[List[str], Union[bytes, memoryview]]: A pair of
         * The message parts for the parsed HTTP/2 frame.
         * The remaining bytes in ``h2_frames``; i.e. the frame that was just
           parsed will be removed.
@@ -361,6 +635,8 @@ def next_h2_frame(h2_frames):
         RuntimeError: If ``h2_frames`` contains fewer than 9 bytes. This is
             because all frames begin with a fixed 9-octet header followed by
             a variable-length payload. See `frame header spec`_.
+        KeyError: If the frame type byte is not a known frame type.
+        RuntimeError: If not all bit flags are accounted for.
         RuntimeError: If ``h2_frames`` contains fewer than ``9 + frame_length``
             bytes. The ``frame_length`` is determined by the first 3 bytes.
     """
@@ -369,48 +645,76 @@ def next_h2_frame(h2_frames):
             "Not large enough to contain an HTTP/2 frame", h2_frames
         )
 
-    # Frame length
-    frame_length, = STRUCT_L.unpack(b"\x00" + h2_frames[:3])
-    frame_length_hex = simple_hexdump(h2_frames[:3], row_size=-1)
-    parts = [f"Frame Length = {frame_length} ({frame_length_hex})"]
-    # Frame Type
-    frame_type = FRAME_TYPES[h2_frames[3]]
-    frame_type_hex = simple_hexdump(h2_frames[3:4], row_size=-1)
-    parts.append(f"Frame Type = {frame_type} ({frame_type_hex})")
-    # Flags
-    flags = h2_frames[4]
-    flags_str = describe_flags(frame_type, flags)
-    flags_hex = simple_hexdump(h2_frames[4:5], row_size=-1)
-    parts.append(f"Flags = {flags_str} ({flags_hex})")
-    # Stream Identifier
-    stream_identifier, = STRUCT_L.unpack(h2_frames[5:9])
-    stream_identifier_hex = simple_hexdump(h2_frames[5:9], row_size=-1)
-    parts.append(
-        f"Stream Identifier = {stream_identifier} ({stream_identifier_hex})"
+    length_high, length_low, type_byte, flags, stream_identifier = (
+        STRUCT_FRAME_HEADER.unpack_from(h2_frames)
     )
+    frame_length = (length_high << 8) | length_low
+    frame_type = FRAME_TYPE_NAMES[type_byte]
+    if frame_type is None:
+        raise KeyError(type_byte)
+    flags_str = FLAG_DESCRIPTION_TABLE[type_byte][flags]
+    if flags_str is None:
+        raise RuntimeError("Some flags not accounted for", frame_type, flags)
+    # NOTE: Each byte in ``header_hex`` takes up 3 characters (two hex digits
+    #       and a separator), so the fields can be sliced out directly.
+    header_hex = " ".join([HEX_BYTES[c] for c in h2_frames[:9]])
+
+    parts = [
+        f"Frame Length = {frame_length} ({header_hex[:8]})",
+        f"Frame Type = {frame_type} ({header_hex[9:11]})",
+        f"Flags = {flags_str} ({header_hex[12:14]})",
+        f"Stream Identifier = {stream_identifier} ({header_hex[15:]})",
+    ]
     # Frame Payload
-    frame_payload = h2_frames[9 : 9 + frame_length]
-    if len(frame_payload) != frame_length:
+    if len(h2_frames) < 9 + frame_length:
         raise RuntimeError(
             " HTTP/2 frame not large enough to contain frame payload",
             h2_frames,
         )
-    frame_payload_part = handle_frame(frame_type, frame_payload, flags)
+    if peer is not None:
+        peer.on_frame(
+            type_byte,
+            flags,
+            stream_identifier & STREAM_ID_MASK,
+            h2_frames[9 : 9 + frame_length],
+        )
+        if (
+            type_byte == DATA_TYPE_BYTE
+            and peer.connection.options.pass_through_data
+        ):
+            parts.append(f"Frame Payload = ({frame_length} bytes, skipped)")
+            return parts, h2_frames[9 + frame_length :]
+
+    # NOTE: ``bytes()`` is a no-op if ``h2_frames`` is already ``bytes``.
+    frame_payload = bytes(h2_frames[9 : 9 + frame_length])
+    if PAYLOAD_CONTEXT_TABLE[type_byte]:
+        context = None
+        if peer is not None:
+            context = peer.frame_context()
+        frame_payload_part = PAYLOAD_HANDLER_TABLE[type_byte](
+            frame_payload, flags, context
+        )
+    else:
+        frame_payload_part = PAYLOAD_HANDLER_TABLE[type_byte](
+            frame_payload, flags
+        )
     if frame_payload_part != "":
         parts.append(frame_payload_part)
 
     return parts, h2_frames[9 + frame_length :]
 
 
-def describe(h2_frames, connection_description, expect_preface, proxy_line):
+def describe(
+    h2_frames, connection_description, expect_preface, proxy_line, peer=None
+):
     """Describe an HTTP/2 frame.
 
     .. connection header spec: https://http2.github.io/http2-spec/#ConnectionHeader
     .. proxy protocol: https://docs.aws.amazon.com/elasticloadbalancing/latest/classic/enable-proxy-protocol.html
 
     Args:
-        h2_frames (bytes): The raw bytes of TCP packet data containing HTTP/2
-            frames.
+        h2_frames (Union[bytes, memoryview]): The raw bytes of TCP packet
+            data containing HTTP/2 frames.
         connection_description (str): A description of the RECV->SEND
             relationship for a socket pair.
         expect_preface (bool): Indicates if the ``h2_frames`` should begin
@@ -419,6 +723,8 @@ def describe(h2_frames, connection_description, expect_preface, proxy_line):
             client socket. See `connection header spec`_.
         proxy_line (Optional[bytes]): An optional `proxy protocol`_ line parsed
            from the first frame.
+        peer (Optional[.PeerState]): The state for the RECV->SEND
+            relationship that sent ``h2_frames``.
 
     Returns:
         str: The description of ``h2_frames``, expected to be printed by the
@@ -441,21 +747,80 @@ def describe(h2_frames, connection_description, expect_preface, proxy_line):
         )
 
     if expect_preface:
-        if not h2_frames.startswith(PREFACE):
+        if h2_frames[: len(PREFACE)] != PREFACE:
             raise RuntimeError(MISSING_PREFACE, h2_frames)
 
         parts.extend([PREFACE_PRETTY, FOOTER])
+
+    # NOTE: Slicing a ``memoryview`` does not copy, so walking the frames is
+    #       linear in the size of ``h2_frames``.
+    h2_frames = memoryview(h2_frames)
+    if expect_preface:
         h2_frames = h2_frames[len(PREFACE) :]
 
     while h2_frames:
-        frame_parts, h2_frames = next_h2_frame(h2_frames)
+        frame_parts, h2_frames = next_h2_frame(h2_frames, peer)
         parts.extend(frame_parts)
         parts.append(FOOTER)
 
     return "\n".join(parts)
 
 
-def register_payload_handler(frame_type, handler):
+def observe(h2_frames, expect_preface, peer):
+    """Observe HTTP/2 frames without describing them.
+
+    This walks the frame headers in ``h2_frames`` (without copying any frame
+    payloads) and passes each frame along to ``peer``, so that the counters
+    and trackers for a connection can be updated.
+
+    Args:
+        h2_frames (Union[bytes, memoryview]): The raw bytes of TCP packet
+            data containing HTTP/2 frames.
+        expect_preface (bool): Indicates if the ``h2_frames`` should begin
+            with the client connection preface.
+        peer (.PeerState): The state for the RECV->SEND relationship that
+            sent ``h2_frames``.
+
+    Raises:
+        RuntimeError: If ``expect_preface`` is :data:`True` but ``h2_frames``
+            does not begin with the client connection preface.
+        RuntimeError: If ``h2_frames`` ends with an incomplete frame.
+    """
+    offset = 0
+    if expect_preface:
+        if h2_frames[: len(PREFACE)] != PREFACE:
+            raise RuntimeError(MISSING_PREFACE, h2_frames)
+        offset = len(PREFACE)
+
+    h2_frames = memoryview(h2_frames)
+    end = len(h2_frames)
+    while offset < end:
+        if end - offset < 9:
+            raise RuntimeError(
+                "Not large enough to contain an HTTP/2 frame",
+                h2_frames[offset:],
+            )
+
+        length_high, length_low, type_byte, flags, stream_identifier = (
+            STRUCT_FRAME_HEADER.unpack_from(h2_frames, offset)
+        )
+        payload_start = offset + 9
+        offset = payload_start + ((length_high << 8) | length_low)
+        if offset > end:
+            raise RuntimeError(
+                " HTTP/2 frame not large enough to contain frame payload",
+                h2_frames[payload_start - 9 :],
+            )
+
+        peer.on_frame(
+            type_byte,
+            flags,
+            stream_identifier & STREAM_ID_MASK,
+            h2_frames[payload_start:offset],
+        )
+
+
+def register_payload_handler(frame_type, handler, with_context=False):
     """Register a handler for frame payloads.
 
     .. note::
@@ -469,6 +834,11 @@ def register_payload_handler(frame_type, handler):
         handler (Callable[[bytes, int], str]): A handler for a frame payload.
             The arguments are ``frame_payload`` and ``flags`` and the return
             value is a string.
+        with_context (Optional[bool]): Indicates if ``handler`` accepts a
+            third argument: a ``FrameContext`` with the peer that sent the
+            frame, the state for the frame's stream and the decoded headers
+            (if the frame completes a header block). The context is
+            :data:`None` when a frame is described without a peer.
 
     Raises:
         ValueError: If ``frame_type`` is an invalid value.
@@ -481,11 +851,17 @@ def register_payload_handler(frame_type, handler):
     if existing is not UNSET:
         raise KeyError(f"Frame type {frame_type} already has a handler")
 
+    type_byte = FRAME_TYPE_NAMES.index(frame_type)
     FRAME_PAYLOAD_HANDLERS[frame_type] = handler
+    PAYLOAD_HANDLER_TABLE[type_byte] = handler
+    PAYLOAD_CONTEXT_TABLE[type_byte] = with_context
 
 
 def handle_frame(frame_type, frame_payload, flags):
-    """Register a handler for frame payloads.
+    """Describe a frame payload with the handler for its frame type.
+
+    The payload is described without a frame context (i.e. without a peer),
+    using the same handler as :func:`describe`.
 
     Args:
         frame_type (str): A frame type, e.g. ``DATA``.
@@ -498,12 +874,13 @@ def handle_frame(frame_type, frame_payload, flags):
     Raises:
         ValueError: If ``frame_type`` is an invalid value.
     """
-    handler = FRAME_PAYLOAD_HANDLERS.get(frame_type)
-    if handler is None:
+    if frame_type not in FRAME_PAYLOAD_HANDLERS:
         raise ValueError(f"Invalid frame type {frame_type}")
 
-    if handler is UNSET:
-        handler = default_payload_handler
+    type_byte = FRAME_TYPE_NAMES.index(frame_type)
+    handler = PAYLOAD_HANDLER_TABLE[type_byte]
+    if PAYLOAD_CONTEXT_TABLE[type_byte]:
+        return handler(frame_payload, flags, None)
 
     return handler(frame_payload, flags)
 
@@ -522,14 +899,77 @@ def register_setting(setting_id, setting_name):
     Raises:
         KeyError: If ``setting_id`` is already registered.
     """
-    if setting_id in SETTINGS:
+    if setting_id in SETTINGS or setting_id in LAZY_SETTINGS:
         raise KeyError(f"Setting {setting_id} is already set")
 
     SETTINGS[setting_id] = setting_name
 
 
+def register_lazy_setting(setting_id, load_name):
+    """Add a custom setting to the registry, with a name loaded when needed.
+
+    This is the same as :func:`register_setting`, but ``load_name`` is not
+    called until a SETTINGS frame with ``setting_id`` is described.
+
+    Args:
+        setting_id (int): The setting to be added.
+        load_name (Callable[[], str]): Loads the name of the setting.
+
+    Raises:
+        KeyError: If ``setting_id`` is already registered.
+    """
+    if setting_id in SETTINGS or setting_id in LAZY_SETTINGS:
+        raise KeyError(f"Setting {setting_id} is already set")
+
+    LAZY_SETTINGS[setting_id] = load_name
+
+
+def setting_name(setting_id):
+    """Get the name of a setting.
+
+    Args:
+        setting_id (int): The setting.
+
+    Returns:
+        str: The name of the setting, or ``UNKNOWN`` if it is not registered.
+    """
+    name = SETTINGS.get(setting_id)
+    if name is not None:
+        return name
+
+    load_name = LAZY_SETTINGS.get(setting_id)
+    if load_name is None:
+        return "UNKNOWN"
+
+    # NOTE: Two threads may both load the name, which is harmless; the
+    #       entry in ``LAZY_SETTINGS`` is only removed once ``SETTINGS`` is
+    #       populated so that no thread sees ``UNKNOWN`` in between.
+    name = load_name()
+    SETTINGS[setting_id] = name
+    LAZY_SETTINGS.pop(setting_id, None)
+    return name
+
+
+# Precompute the flag descriptions and (default) payload handlers for every
+# frame type.
+for _type_byte, _frame_type in FRAME_TYPES.items():
+    FLAG_DESCRIPTIONS[_frame_type] = _flag_descriptions(
+        FLAGS_DEFINED[_frame_type]
+    )
+    FLAG_DESCRIPTION_TABLE[_type_byte] = FLAG_DESCRIPTIONS[_frame_type]
+    PAYLOAD_HANDLER_TABLE[_type_byte] = default_payload_handler
+
+# NOTE: DATA payloads are decompressed (if needed) unless a custom handler is
+#       registered, so the table is updated without touching
+#       ``FRAME_PAYLOAD_HANDLERS``.
+PAYLOAD_HANDLER_TABLE[DATA_TYPE_BYTE] = handle_data_payload
+PAYLOAD_CONTEXT_TABLE[DATA_TYPE_BYTE] = True
+
 # Register the frame payload handlers.
-register_payload_handler("HEADERS", handle_headers_payload)
+register_payload_handler("HEADERS", handle_headers_payload, with_context=True)
+register_payload_handler(
+    "CONTINUATION", handle_continuation_payload, with_context=True
+)
 register_payload_handler("WINDOW_UPDATE", handle_window_update_payload)
 register_payload_handler("SETTINGS", handle_settings_payload)
 register_payload_handler("PING", handle_ping_payload)
@@ -0,0 +1,452 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Export the metadata of each frame as typed columns.
+
+Each column is written to its own file in the export directory, as a
+1-dimensional ``.npy`` array of fixed-width integers (in the native byte
+order), so it can be loaded without copying, e.g. with
+``numpy.load(path, mmap_mode="r")``:
+
+* ``timestamp_ns.npy`` (int64): The (wall clock) time the frame was RECV-ed,
+  in nanoseconds since the UNIX epoch
+* ``connection_id.npy`` (uint32): The connection; the descriptions of the
+  connections are written (one per line, prefixed by the ID) to
+  ``connections.txt``
+* ``direction.npy`` (uint8): ``0`` if the client sent the frame, ``1`` if the
+  server did
+* ``type.npy`` (uint8): The frame type
+* ``flags.npy`` (uint8): The frame flags
+* ``stream_id.npy`` (uint32): The stream identifier
+* ``length.npy`` (uint32): The length of the frame payload
+* ``header_block_length.npy`` (uint32): The length of the header block
+  fragment (without padding or priority fields) for HEADERS, PUSH_PROMISE
+  and CONTINUATION frames; ``0`` for other frames
+
+The rows for each peer are buffered and appended to the files in batches;
+the header of each file is rewritten after every batch, so the files can be
+loaded while the proxy is running.
+"""
+
+import argparse
+import array
+import itertools
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import time
+
+import tcp_h2_describe._analysis
+import tcp_h2_describe._capture
+import tcp_h2_describe._describe
+
+
+# NOTE: The ``array`` type codes below have these sizes on every supported
+#       platform (``L`` is avoided since it is 8 bytes on some platforms).
+COLUMNS = (
+    ("timestamp_ns", "q"),
+    ("connection_id", "I"),
+    ("direction", "B"),
+    ("type", "B"),
+    ("flags", "B"),
+    ("stream_id", "I"),
+    ("length", "I"),
+    ("header_block_length", "I"),
+)
+BYTE_ORDER = "<" if sys.byteorder == "little" else ">"
+NPY_DESCRS = {"q": f"{BYTE_ORDER}i8", "I": f"{BYTE_ORDER}u4", "B": "|u1"}
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+STRUCT_NPY_HEADER_LEN = struct.Struct("<H")
+# NOTE: The header has a fixed size (a multiple of 64, as the ``.npy`` format
+#       requires), so it can be rewritten in place as rows are appended.
+NPY_HEADER_SIZE = 128
+NPY_SHAPE_PATTERN = re.compile(r"'shape': \((\d+),\)")
+CONNECTIONS_FILENAME = "connections.txt"
+FLUSH_ROWS = 0x1000
+CLIENT = tcp_h2_describe._capture.CLIENT
+SERVER = tcp_h2_describe._capture.SERVER
+HEADERS = 0x1
+PUSH_PROMISE = 0x5
+CONTINUATION = 0x9
+HEADER_BLOCK_TYPES = frozenset([HEADERS, PUSH_PROMISE, CONTINUATION])
+FRACTIONS = (0.5, 0.99, 1.0)
+LENGTH_EDGES = (1, 64, 1024, 16384)
+ROW_TEMPLATE = "   {:<14}{:>12}{:>16}{:>10}{:>10}{:>10}"
+EXPORTERS = {}
+EXPORTERS_LOCK = threading.Lock()
+
+
+def npy_header(typecode, rows):
+    """Build the ``.npy`` header for a column.
+
+    Args:
+        typecode (str): The ``array`` type code for the column.
+        rows (int): The number of rows in the column.
+
+    Returns:
+        bytes: The header, ``NPY_HEADER_SIZE`` bytes long.
+    """
+    header = (
+        f"{{'descr': '{NPY_DESCRS[typecode]}', 'fortran_order': False, "
+        f"'shape': ({rows},), }}"
+    )
+    header_size = (
+        NPY_HEADER_SIZE - len(NPY_MAGIC) - STRUCT_NPY_HEADER_LEN.size
+    )
+    header = header.ljust(header_size - 1) + "\n"
+    return (
+        NPY_MAGIC
+        + STRUCT_NPY_HEADER_LEN.pack(header_size)
+        + header.encode("latin-1")
+    )
+
+
+class FrameColumns:
+    """A batch of rows (one per frame), stored column-wise."""
+
+    def __init__(self):
+        self.columns = [array.array(typecode) for _, typecode in COLUMNS]
+
+    def __len__(self):
+        return len(self.columns[0])
+
+    def clear(self):
+        """Remove every row."""
+        for column in self.columns:
+            del column[:]
+
+
+class FrameExporter:
+    """Write frame metadata (for every connection) to an export directory.
+
+    Args:
+        export_dir (str): The directory for the column files; existing
+            column files are replaced.
+    """
+
+    def __init__(self, export_dir):
+        os.makedirs(export_dir, exist_ok=True)
+        self.export_dir = export_dir
+        self.lock = threading.Lock()
+        self.counter = itertools.count()
+        self.rows = 0
+        # NOTE: This converts a (monotonic) RECV time to a wall clock time.
+        self.wall_offset_ns = time.time_ns() - time.monotonic_ns()
+        self.file_objs = []
+        for name, typecode in COLUMNS:
+            file_obj = open(os.path.join(export_dir, f"{name}.npy"), "w+b")
+            file_obj.write(npy_header(typecode, 0))
+            file_obj.flush()
+            self.file_objs.append(file_obj)
+        self.connections_file = open(
+            os.path.join(export_dir, CONNECTIONS_FILENAME), "w"
+        )
+
+    def open_connection(self, description):
+        """Assign an ID to a new connection.
+
+        Args:
+            description (str): The description of the connection.
+
+        Returns:
+            int: The connection ID.
+        """
+        with self.lock:
+            connection_id = next(self.counter)
+            self.connections_file.write(f"{connection_id}\t{description}\n")
+            self.connections_file.flush()
+        return connection_id
+
+    def record(self, peer, type_byte, flags, stream_id, frame_payload):
+        """Record a frame, writing the rows for its peer once enough are held.
+
+        Args:
+            peer (.PeerState): The peer that sent the frame; its ``export``
+                holds the rows that have not been written yet.
+            type_byte (int): The frame type.
+            flags (int): The flags for the frame.
+            stream_id (int): The stream identifier.
+            frame_payload (memoryview): The frame payload.
+        """
+        header_block_length = 0
+        if type_byte in HEADER_BLOCK_TYPES:
+            try:
+                header_block_length = len(
+                    tcp_h2_describe._describe.header_block_fragment(
+                        type_byte, flags, frame_payload
+                    )
+                )
+            except ValueError:
+                # NOTE: The (invalid) padding is reported when the frame is
+                #       described; the row is still exported.
+                pass
+
+        columns = peer.export
+        # NOTE: Each column is appended to directly, since this runs for
+        #       every frame.
+        (
+            timestamps,
+            connection_ids,
+            directions,
+            types,
+            flags_column,
+            stream_ids,
+            lengths,
+            header_block_lengths,
+        ) = columns.columns
+        timestamps.append(int(peer.received_at * 1e9) + self.wall_offset_ns)
+        connection_ids.append(peer.connection.export_id)
+        directions.append(CLIENT if peer.is_client else SERVER)
+        types.append(type_byte)
+        flags_column.append(flags)
+        stream_ids.append(stream_id)
+        lengths.append(len(frame_payload))
+        header_block_lengths.append(header_block_length)
+        if len(timestamps) >= FLUSH_ROWS:
+            self.write(columns)
+
+    def write(self, columns):
+        """Append a batch of rows to the column files (and clear it).
+
+        Args:
+            columns (FrameColumns): The rows to write.
+        """
+        if len(columns) == 0:
+            return
+
+        with self.lock:
+            self.rows += len(columns)
+            for (_, typecode), file_obj, column in zip(
+                COLUMNS, self.file_objs, columns.columns
+            ):
+                file_obj.seek(0, os.SEEK_END)
+                column.tofile(file_obj)
+                # NOTE: Seeking flushes the rows, so the header never claims
+                #       more rows than have been written.
+                file_obj.seek(0)
+                file_obj.write(npy_header(typecode, self.rows))
+                file_obj.flush()
+        columns.clear()
+
+
+def get_exporter(export_dir):
+    """Get the exporter for a directory, creating it if needed.
+
+    Args:
+        export_dir (str): The export directory.
+
+    Returns:
+        FrameExporter: The (shared) exporter for ``export_dir``.
+    """
+    with EXPORTERS_LOCK:
+        exporter = EXPORTERS.get(export_dir)
+        if exporter is None:
+            exporter = FrameExporter(export_dir)
+            EXPORTERS[export_dir] = exporter
+        return exporter
+
+
+def _load_column(path, typecode):
+    """Load an exported column without copying it.
+
+    Args:
+        path (str): The path of the ``.npy`` file.
+        typecode (str): The ``array`` type code for the column.
+
+    Returns:
+        Union[numpy.ndarray, memoryview]: The column; a (read-only) memory
+        mapped ``numpy`` array if ``numpy`` is installed, otherwise a
+        ``memoryview`` of a memory map.
+
+    Raises:
+        ValueError: If the file is not an exported column.
+    """
+    with open(path, "rb") as file_obj:
+        header = file_obj.read(NPY_HEADER_SIZE)
+        match = NPY_SHAPE_PATTERN.search(header.decode("latin-1"))
+        if not header.startswith(NPY_MAGIC) or match is None:
+            raise ValueError("Not an exported column", path)
+        rows = int(match.group(1))
+
+        numpy = tcp_h2_describe._analysis.numpy
+        if rows == 0:
+            if numpy is not None:
+                return numpy.empty(0, dtype=NPY_DESCRS[typecode])
+            return memoryview(array.array(typecode))
+        if numpy is not None:
+            return numpy.load(path, mmap_mode="r")
+
+        mapped = mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+    size = rows * array.array(typecode).itemsize
+    return memoryview(mapped)[NPY_HEADER_SIZE : NPY_HEADER_SIZE + size].cast(
+        typecode
+    )
+
+
+def load_columns(export_dir):
+    """Load the columns in an export directory (without copying them).
+
+    Args:
+        export_dir (str): The export directory.
+
+    Returns:
+        Dict[str, Union[numpy.ndarray, memoryview]]: The columns, by name.
+
+    Raises:
+        ValueError: If the columns have different lengths (e.g. they were
+            loaded while the proxy was writing a batch).
+    """
+    columns = {
+        name: _load_column(os.path.join(export_dir, f"{name}.npy"), typecode)
+        for name, typecode in COLUMNS
+    }
+    lengths = set(len(column) for column in columns.values())
+    if len(lengths) > 1:
+        raise ValueError("Columns have different lengths", export_dir)
+    return columns
+
+
+def _type_name(type_byte):
+    """Get the name for a frame type byte.
+
+    Args:
+        type_byte (int): The frame type.
+
+    Returns:
+        str: The name of the frame type.
+    """
+    name = tcp_h2_describe._describe.FRAME_TYPE_NAMES[type_byte]
+    if name is None:
+        return f"UNKNOWN({hex(type_byte)})"
+    return name
+
+
+def _bucket_label(edges, index):
+    """Label a histogram bucket.
+
+    Args:
+        edges (Tuple[int, ...]): The bucket edges.
+        index (int): The bucket index (in ``range(len(edges) + 1)``).
+
+    Returns:
+        str: The label, e.g. ``[64, 1024)``.
+    """
+    if index == 0:
+        return f"< {edges[0]}"
+    if index == len(edges):
+        return f">= {edges[-1]}"
+    return f"[{edges[index - 1]}, {edges[index]})"
+
+
+def describe_export(export_dir):
+    """Describe the frames in an export directory.
+
+    Args:
+        export_dir (str): The export directory.
+
+    Returns:
+        str: The frame counts, payload lengths (percentiles and histogram)
+        and header block lengths for each frame type.
+    """
+    analysis = tcp_h2_describe._analysis
+    columns = load_columns(export_dir)
+    types = columns["type"]
+    lengths = columns["length"]
+    first, last = analysis.percentiles(columns["timestamp_ns"], (0.0, 1.0))
+    duration = 0.0 if first is None else (last - first) / 1e9
+    with open(os.path.join(export_dir, CONNECTIONS_FILENAME)) as file_obj:
+        connections = sum(1 for _ in file_obj)
+
+    counts = analysis.group_counts(types, 256)
+    totals = analysis.group_sums(types, lengths, 256)
+    length_percentiles = analysis.group_percentiles(
+        types, lengths, 256, FRACTIONS
+    )
+    block_percentiles = analysis.group_percentiles(
+        types, columns["header_block_length"], 256, FRACTIONS
+    )
+    histograms = analysis.group_histograms(types, lengths, 256, LENGTH_EDGES)
+
+    lines = [
+        f"Frame Export ({export_dir}) =",
+        f"   {len(types)} frames from {connections} connection(s) over "
+        f"{duration:.3f}s",
+        "",
+        ROW_TEMPLATE.format(
+            "Frame Type", "Frames", "Payload Bytes", "p50", "p99", "Max"
+        ),
+    ]
+    present = [
+        type_byte for type_byte in range(256) if counts[type_byte] > 0
+    ]
+    for type_byte in present:
+        p50, p99, maximum = length_percentiles[type_byte]
+        lines.append(
+            ROW_TEMPLATE.format(
+                _type_name(type_byte),
+                counts[type_byte],
+                int(totals[type_byte]),
+                f"{p50:g}",
+                f"{p99:g}",
+                f"{maximum:g}",
+            )
+        )
+
+    lines.append("Header Block Lengths =")
+    for type_byte in present:
+        if type_byte not in HEADER_BLOCK_TYPES:
+            continue
+        p50, p99, maximum = block_percentiles[type_byte]
+        lines.append(
+            f"   {_type_name(type_byte)}: p50 = {p50:g}, p99 = {p99:g}, "
+            f"max = {maximum:g}"
+        )
+
+    lines.append("Payload Length Histogram =")
+    for type_byte in present:
+        parts = ", ".join(
+            f"{_bucket_label(LENGTH_EDGES, index)}: {count}"
+            for index, count in enumerate(histograms[type_byte])
+        )
+        lines.append(f"   {_type_name(type_byte)}: {parts}")
+    return "\n".join(lines)
+
+
+def get_args():
+    """Get the command line arguments for ``tcp-h2-frames``.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Describe the frames exported by a proxy.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        prog="tcp-h2-frames",
+    )
+    parser.add_argument(
+        "export_dir",
+        metavar="DIRECTORY",
+        help="A directory written by `tcp-h2-describe --export-frames`.",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    print(describe_export(args.export_dir))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Flight recorder: a fixed-size ring of recent frames for each peer.
+
+Recording a frame is a handful of stores into preallocated arrays, so the
+recorder can be left on when full descriptions are too expensive. The ring
+is only formatted when it is dumped (e.g. when a peer sends a GOAWAY or
+RST_STREAM, the proxy fails or a user signal is received).
+"""
+
+import array
+
+import tcp_h2_describe._describe
+import tcp_h2_describe._state
+
+
+DEFAULT_SIZE = 256
+PREFIX_SIZE = 8
+RST_STREAM = 0x3
+GOAWAY = 0x7
+# NOTE: A frame of one of these types causes the flight recorder for the
+#       connection to be dumped.
+DUMP_TYPES = frozenset([RST_STREAM, GOAWAY])
+
+
+class FrameRing:
+    """A fixed-size ring of compact records of frames sent by one peer.
+
+    Each record holds the time the frame was RECV-ed, the frame type,
+    flags, stream identifier, payload length and the first few bytes of
+    the payload. The records are stored column-wise in preallocated arrays
+    and the oldest record is overwritten once the ring is full.
+
+    .. note::
+
+        A ring is only written by the thread that RECVs for its peer. It may
+        be read (i.e. dumped) from another thread, in which case the record
+        being written at that moment may be torn.
+
+    Args:
+        size (Optional[int]): The number of records in the ring.
+        prefix_size (Optional[int]): The number of payload bytes to keep
+            for each frame.
+
+    Raises:
+        ValueError: If ``size`` is not positive.
+    """
+
+    def __init__(self, size=DEFAULT_SIZE, prefix_size=PREFIX_SIZE):
+        if size <= 0:
+            raise ValueError("Flight recorder size must be positive", size)
+
+        self.size = size
+        self.prefix_size = prefix_size
+        self.timestamps = array.array("d", bytes(8 * size))
+        self.stream_ids = array.array("L", [0]) * size
+        self.lengths = array.array("L", [0]) * size
+        self.types = bytearray(size)
+        self.flags = bytearray(size)
+        self.prefixes = bytearray(size * prefix_size)
+        # NOTE: ``count`` is the total number of frames recorded; the next
+        #       record is written at index ``count % size``.
+        self.count = 0
+
+    def record(self, timestamp, type_byte, flags, stream_id, frame_payload):
+        """Record a frame, overwriting the oldest record if the ring is full.
+
+        Args:
+            timestamp (float): The (monotonic) time the frame was RECV-ed.
+            type_byte (int): The frame type.
+            flags (int): The flags for the frame.
+            stream_id (int): The stream identifier.
+            frame_payload (memoryview): The frame payload; only the first
+                ``prefix_size`` bytes are copied.
+        """
+        index = self.count % self.size
+        self.timestamps[index] = timestamp
+        self.types[index] = type_byte
+        self.flags[index] = flags
+        self.stream_ids[index] = stream_id
+        self.lengths[index] = len(frame_payload)
+        start = index * self.prefix_size
+        prefix = frame_payload[: self.prefix_size]
+        self.prefixes[start : start + len(prefix)] = prefix
+        self.count += 1
+
+    def records(self):
+        """Get the records in the ring, oldest first.
+
+        Returns:
+            List[Tuple[float, int, int, int, int, bytes]]: The timestamp,
+            frame type, flags, stream identifier, payload length and payload
+            prefix for each frame.
+        """
+        first = max(0, self.count - self.size)
+        result = []
+        for position in range(first, self.count):
+            index = position % self.size
+            length = self.lengths[index]
+            start = index * self.prefix_size
+            end = start + min(length, self.prefix_size)
+            result.append(
+                (
+                    self.timestamps[index],
+                    self.types[index],
+                    self.flags[index],
+                    self.stream_ids[index],
+                    length,
+                    bytes(self.prefixes[start:end]),
+                )
+            )
+        return result
+
+
+def _describe_record(record, sender, start):
+    """Describe a single record from a frame ring.
+
+    Args:
+        record (Tuple[float, int, int, int, int, bytes]): The record.
+        sender (str): The peer that sent the frame (``client`` or
+            ``server``).
+        start (float): The (monotonic) time the connection was opened.
+
+    Returns:
+        str: The description of the frame.
+    """
+    timestamp, type_byte, flags, stream_id, length, prefix = record
+    name = tcp_h2_describe._describe.FRAME_TYPE_NAMES[type_byte]
+    if name is None:
+        name = f"UNKNOWN(0x{type_byte:02x})"
+    hex_bytes = tcp_h2_describe._describe.HEX_BYTES
+    prefix_hex = " ".join(hex_bytes[byte] for byte in prefix)
+    if length > len(prefix):
+        prefix_hex += " ..."
+    return (
+        f"   {1000.0 * (timestamp - start):10.3f}ms {sender}: {name} "
+        f"flags=0x{flags:02x} stream={stream_id} length={length} "
+        f"[{prefix_hex}]"
+    )
+
+
+def describe_flight(connection, reason):
+    """Describe the frames in the flight recorder for a connection.
+
+    The records for both peers are merged (in the order they were
+    RECV-ed), so the dump shows the frames that led up to ``reason``.
+
+    Args:
+        connection (.ConnectionState): The connection; its peers must have
+            a flight recorder.
+        reason (str): The reason the flight recorder is being dumped.
+
+    Returns:
+        str: The description of each recorded frame.
+    """
+    records = []
+    dropped = 0
+    for peer in (connection.client, connection.server):
+        ring = peer.flight
+        sender = "client" if peer.is_client else "server"
+        dropped += max(0, ring.count - ring.size)
+        records.extend((record, sender) for record in ring.records())
+    # NOTE: ``sort()`` is stable, so frames from a single TCP chunk (which
+    #       share a timestamp) stay in order.
+    records.sort(key=lambda pair: pair[0][0])
+
+    lines = [
+        f"Flight Recorder ({reason}) =",
+        f"   {connection.client.description}",
+        f"   {len(records)} frames recorded ({dropped} older frames dropped)",
+    ]
+    start = connection.opened_at
+    for record, sender in records:
+        lines.append(_describe_record(record, sender, start))
+    return "\n".join(lines)
+
+
+def describe_active(reason):
+    """Describe the flight recorder for every active connection.
+
+    Args:
+        reason (str): The reason the flight recorders are being dumped.
+
+    Returns:
+        List[str]: The description for each active connection that has a
+        flight recorder.
+    """
+    with tcp_h2_describe._state.ACTIVE_LOCK:
+        connections = list(tcp_h2_describe._state.ACTIVE_CONNECTIONS)
+    return [
+        describe_flight(connection, reason)
+        for connection in connections
+        if connection.client.flight is not None
+    ]
@@ -0,0 +1,324 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import heapq
+import time
+
+import tcp_h2_describe._describe
+import tcp_h2_describe._tracker
+
+
+DATA = 0x0
+HEADERS = 0x1
+RST_STREAM = 0x3
+WINDOW_UPDATE = 0x8
+FLAG_END_STREAM = 0x1
+SETTINGS_INITIAL_WINDOW_SIZE = 0x4
+# See: https://http2.github.io/http2-spec/#InitialWindowSize
+DEFAULT_WINDOW_SIZE = 65535
+# NOTE: Stream 0 is used as the key for the connection-level window.
+CONNECTION = 0
+MAX_STREAM_LINES = 20
+
+
+class SendWindows:
+    """Flow-control send windows for a single sender.
+
+    .. flow control spec: https://http2.github.io/http2-spec/#FlowControl
+
+    Each window is tracked from the perspective of the sender, i.e. the
+    window shrinks as the sender sends DATA and grows as the receiver sends
+    WINDOW_UPDATE. See `flow control spec`_.
+
+    A window is considered "stalled" from the moment it reaches zero (or
+    goes negative, which can happen when ``SETTINGS_INITIAL_WINDOW_SIZE``
+    is reduced) until a WINDOW_UPDATE makes it positive again.
+
+    Stream windows are only tracked from when the stream is opened until the
+    sender is done with it. When a stream is finished, its stall totals are
+    combined into ``finished_stall_time`` / ``finished_stall_count`` and only
+    the ``MAX_STREAM_LINES`` longest stalls are kept for the report.
+    """
+
+    def __init__(self):
+        self.initial_window_size = DEFAULT_WINDOW_SIZE
+        self.windows = {CONNECTION: DEFAULT_WINDOW_SIZE}
+        self.stalled_since = {}
+        self.stall_time = collections.defaultdict(float)
+        self.stall_count = collections.defaultdict(int)
+        self.finished_stall_time = 0.0
+        self.finished_stall_count = 0
+        self.finished_stalled_streams = 0
+        # NOTE: A min-heap of ``(stall_time, stream_id, stall_count)``.
+        self.longest_finished = []
+
+    def _update(self, key, delta, now):
+        """Update a window and start / stop a stall if needed.
+
+        Args:
+            key (int): The stream ID (or ``CONNECTION``) for the window.
+            delta (int): The change in the window size.
+            now (float): The (monotonic) time of the change.
+        """
+        window = self.windows.get(key, self.initial_window_size) + delta
+        self.windows[key] = window
+
+        stalled_since = self.stalled_since.get(key)
+        if window <= 0:
+            if stalled_since is None:
+                self.stalled_since[key] = now
+                self.stall_count[key] += 1
+        elif stalled_since is not None:
+            del self.stalled_since[key]
+            self.stall_time[key] += now - stalled_since
+
+    def open(self, stream_id):
+        """Start tracking the window for a new stream.
+
+        Args:
+            stream_id (int): The stream that was opened.
+        """
+        self.windows.setdefault(stream_id, self.initial_window_size)
+
+    def consume(self, stream_id, frame_length, now):
+        """Consume window space for a DATA frame.
+
+        Args:
+            stream_id (int): The stream the DATA frame was sent on.
+            frame_length (int): The (flow-controlled) length of the frame.
+            now (float): The (monotonic) time the frame was sent.
+        """
+        if frame_length == 0:
+            return
+
+        self._update(CONNECTION, -frame_length, now)
+        if stream_id in self.windows:
+            self._update(stream_id, -frame_length, now)
+
+    def increment(self, stream_id, increment, now):
+        """Increase a window due to a WINDOW_UPDATE.
+
+        A WINDOW_UPDATE for a stream that is not tracked is ignored; it is
+        normal for the receiver to keep sending them after the sender is
+        done with the stream.
+
+        Args:
+            stream_id (int): The stream for the WINDOW_UPDATE (``0`` for
+                the connection).
+            increment (int): The window size increment.
+            now (float): The (monotonic) time the update was sent.
+        """
+        if stream_id in self.windows:
+            self._update(stream_id, increment, now)
+
+    def finish(self, stream_id, now):
+        """Stop tracking the window for a stream the sender is done with.
+
+        Args:
+            stream_id (int): The stream that ended.
+            now (float): The (monotonic) time the stream ended.
+
+        Returns:
+            float: The total time the window for the stream was stalled.
+        """
+        stall_time = self.total_stall_time(stream_id, now)
+        self.stalled_since.pop(stream_id, None)
+        self.stall_time.pop(stream_id, None)
+        self.windows.pop(stream_id, None)
+        stall_count = self.stall_count.pop(stream_id, 0)
+        if stall_count == 0:
+            return stall_time
+
+        self.finished_stall_time += stall_time
+        self.finished_stall_count += stall_count
+        self.finished_stalled_streams += 1
+        entry = (stall_time, stream_id, stall_count)
+        if len(self.longest_finished) < MAX_STREAM_LINES:
+            heapq.heappush(self.longest_finished, entry)
+        else:
+            heapq.heappushpop(self.longest_finished, entry)
+        return stall_time
+
+    def set_initial_window_size(self, value, now):
+        """Apply a new ``SETTINGS_INITIAL_WINDOW_SIZE``.
+
+        .. initial window size spec: https://http2.github.io/http2-spec/#InitialWindowSize
+
+        This adjusts the window of every (tracked) stream by the difference
+        between the new and old values. See `initial window size spec`_.
+
+        Args:
+            value (int): The new initial window size.
+            now (float): The (monotonic) time the setting took effect.
+        """
+        delta = value - self.initial_window_size
+        self.initial_window_size = value
+        for key in list(self.windows.keys()):
+            if key != CONNECTION:
+                self._update(key, delta, now)
+
+    def total_stall_time(self, key, now):
+        """Compute the time a window has spent stalled (so far).
+
+        Args:
+            key (int): The stream ID (or ``CONNECTION``) for the window.
+            now (float): The current (monotonic) time.
+
+        Returns:
+            float: The total stall time, in seconds.
+        """
+        total = self.stall_time.get(key, 0.0)
+        stalled_since = self.stalled_since.get(key)
+        if stalled_since is not None:
+            total += now - stalled_since
+        return total
+
+
+class FlowControlTracker(tcp_h2_describe._tracker.Tracker):
+    """Track flow-control send windows for both peers in a connection.
+
+    Args:
+        connection (.ConnectionState): The connection being tracked.
+    """
+
+    def __init__(self, connection):
+        super().__init__(connection)
+        self.client = SendWindows()
+        self.server = SendWindows()
+        # NOTE: The largest stream ID opened (so far) by the client (odd)
+        #       and server (even); stream IDs are never reused, so a frame
+        #       for a smaller stream ID never opens a stream.
+        self.last_stream_ids = [0, 0]
+
+    def _windows(self, peer):
+        """Get the send windows for a peer.
+
+        Args:
+            peer (.PeerState): The peer that is sending.
+
+        Returns:
+            SendWindows: The windows for ``peer``.
+        """
+        if peer.is_client:
+            return self.client
+        return self.server
+
+    def _finish(self, sender, stream_id, now):
+        """Stop tracking a stream for a sender.
+
+        The stall time for the stream is added to its ``StreamState`` (if
+        the stream is known).
+
+        Args:
+            sender (SendWindows): The windows for the sender.
+            stream_id (int): The stream that ended.
+            now (float): The (monotonic) time the stream ended.
+        """
+        stall_time = sender.finish(stream_id, now)
+        stream = self.connection.find_stream(stream_id)
+        if stream is not None:
+            stream.stall_time += stall_time
+
+    def on_frame(self, peer, type_byte, flags, stream_id, frame_payload):
+        now = peer.received_at
+        if type_byte == DATA:
+            sender = self._windows(peer)
+            sender.consume(stream_id, len(frame_payload), now)
+            if flags & FLAG_END_STREAM:
+                self._finish(sender, stream_id, now)
+        elif type_byte == WINDOW_UPDATE:
+            if len(frame_payload) != 4:
+                return
+            increment, = tcp_h2_describe._describe.STRUCT_L.unpack_from(
+                frame_payload
+            )
+            increment &= tcp_h2_describe._describe.STREAM_ID_MASK
+            # NOTE: A WINDOW_UPDATE from ``peer`` grows the window of the
+            #       **other** peer.
+            sender = self._windows(self.connection.other(peer))
+            sender.increment(stream_id, increment, now)
+        elif type_byte == HEADERS:
+            parity = stream_id & 1
+            if stream_id > self.last_stream_ids[parity]:
+                self.last_stream_ids[parity] = stream_id
+                self.client.open(stream_id)
+                self.server.open(stream_id)
+            if flags & FLAG_END_STREAM:
+                self._finish(self._windows(peer), stream_id, now)
+        elif type_byte == RST_STREAM:
+            self._finish(self.client, stream_id, now)
+            self._finish(self.server, stream_id, now)
+
+    def on_settings(self, peer, settings):
+        # NOTE: Settings advertised by ``peer`` constrain the **other** peer
+        #       (i.e. the one sending to ``peer``).
+        sender = self._windows(self.connection.other(peer))
+        now = self.connection.other(peer).received_at
+        for setting_id, setting_value in settings:
+            if setting_id == SETTINGS_INITIAL_WINDOW_SIZE:
+                sender.set_initial_window_size(setting_value, now)
+
+    def describe(self):
+        now = time.monotonic()
+        lines = [f"Flow Control ({self.connection.client.description}) ="]
+        stream_stalls = []
+        stalled_streams = 0
+        for label, sender, starved, receiver in (
+            ("C->S", self.client, "client", "server"),
+            ("S->C", self.server, "server", "client"),
+        ):
+            connection_stall = sender.total_stall_time(CONNECTION, now)
+            lines.append(
+                f"   {label}: connection window = "
+                f"{sender.windows[CONNECTION]}, initial stream window = "
+                f"{sender.initial_window_size}, connection stalled "
+                f"{sender.stall_count.get(CONNECTION, 0)} time(s) for "
+                f"{1000.0 * connection_stall:.3f}ms"
+            )
+            if sender.finished_stalled_streams:
+                lines.append(
+                    f"   {label}: {sender.finished_stalled_streams} finished "
+                    f"stream(s) stalled {sender.finished_stall_count} "
+                    "time(s) for "
+                    f"{1000.0 * sender.finished_stall_time:.3f}ms"
+                )
+            stalled_streams += sender.finished_stalled_streams
+            for stall_time, key, stall_count in sender.longest_finished:
+                stream_stalls.append(
+                    (stall_time, key, stall_count, label, starved, receiver)
+                )
+            for key, stall_count in sender.stall_count.items():
+                if key == CONNECTION:
+                    continue
+                stalled_streams += 1
+                stall_time = sender.total_stall_time(key, now)
+                stream_stalls.append(
+                    (stall_time, key, stall_count, label, starved, receiver)
+                )
+
+        stream_stalls.sort(reverse=True)
+        for stall_time, key, stall_count, label, starved, receiver in (
+            stream_stalls[:MAX_STREAM_LINES]
+        ):
+            lines.append(
+                f"   Stream {key}: {label} stalled {stall_count} time(s) for "
+                f"{1000.0 * stall_time:.3f}ms ({starved} starved, waiting "
+                f"on WINDOW_UPDATE from {receiver})"
+            )
+        shown = min(len(stream_stalls), MAX_STREAM_LINES)
+        if stalled_streams > shown:
+            lines.append(
+                f"   ... and {stalled_streams - shown} more stalled stream(s)"
+            )
+
+        return "\n".join(lines)
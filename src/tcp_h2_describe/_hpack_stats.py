@@ -0,0 +1,408 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""HPACK compression statistics for each peer in a connection.
+
+.. HPACK spec: https://tools.ietf.org/html/rfc7541
+
+Each (complete) header block is walked to find the representation of each
+header field (see `HPACK spec`_) and paired with the headers it decoded to
+(the decoding already done for the peer), so that no header block is
+decoded twice.
+"""
+
+import collections
+
+import tcp_h2_describe._tracker
+
+
+# See: https://tools.ietf.org/html/rfc7541#section-6
+INDEXED = "indexed"
+LITERAL_INDEXED = "literal (incremental indexing)"
+LITERAL = "literal (without indexing)"
+LITERAL_NEVER = "literal (never indexed)"
+SIZE_UPDATE = "dynamic table size update"
+# NOTE: Indices above the static table refer to the dynamic table.
+# See: https://tools.ietf.org/html/rfc7541#appendix-A
+STATIC_TABLE_SIZE = 61
+# NOTE: The number of distinct header names tracked for each peer is
+#       bounded; the rest are combined as ``OTHER_NAME``.
+MAX_HEADER_NAMES = 256
+OTHER_NAME = "(other)"
+MAX_HEADER_LINES = 5
+HeaderField = collections.namedtuple(
+    "HeaderField",
+    [
+        "representation",
+        "index",
+        "name_length",
+        "name_huffman",
+        "value_length",
+        "value_huffman",
+        "size",
+    ],
+)
+HeaderField.__doc__ = """The representation of a header field in a block.
+
+Args:
+    representation (str): The representation, e.g. ``INDEXED``.
+    index (int): The index of the field (for ``INDEXED``) or its name (for
+        a literal; ``0`` if the name is a literal), or the new maximum table
+        size (for ``SIZE_UPDATE``).
+    name_length (int): The encoded length of a literal name (``0`` if the
+        name is indexed).
+    name_huffman (bool): Indicates if a literal name is Huffman encoded.
+    value_length (int): The encoded length of a literal value (``0`` for
+        ``INDEXED``).
+    value_huffman (bool): Indicates if a literal value is Huffman encoded.
+    size (int): The number of bytes in the header block used by the field.
+"""
+
+
+def decode_integer(header_block, offset, prefix_bits):
+    """Decode an integer with an N-bit prefix.
+
+    .. integer representation: https://tools.ietf.org/html/rfc7541#section-5.1
+
+    See `integer representation`_.
+
+    Args:
+        header_block (bytes): The header block.
+        offset (int): The offset of the byte holding the prefix.
+        prefix_bits (int): The number of bits in the prefix.
+
+    Returns:
+        Tuple[int, int]: The integer and the offset just after it.
+
+    Raises:
+        IndexError: If the integer is truncated.
+    """
+    mask = (1 << prefix_bits) - 1
+    value = header_block[offset] & mask
+    offset += 1
+    if value < mask:
+        return value, offset
+
+    shift = 0
+    while True:
+        byte = header_block[offset]
+        offset += 1
+        value += (byte & 0x7F) << shift
+        shift += 7
+        if byte & 0x80 == 0:
+            return value, offset
+
+
+def _skip_string(header_block, offset):
+    """Skip a string literal.
+
+    .. string literal representation: https://tools.ietf.org/html/rfc7541#section-5.2
+
+    See `string literal representation`_.
+
+    Args:
+        header_block (bytes): The header block.
+        offset (int): The offset of the string literal.
+
+    Returns:
+        Tuple[int, bool, int]: The encoded length of the string, an
+        indicator if it is Huffman encoded and the offset just after it.
+
+    Raises:
+        IndexError: If the string is truncated.
+    """
+    huffman = header_block[offset] & 0x80 == 0x80
+    length, offset = decode_integer(header_block, offset, 7)
+    if offset + length > len(header_block):
+        raise IndexError("String literal is truncated", length)
+    return length, huffman, offset + length
+
+
+def walk_header_block(header_block):
+    """Find the representation of each field in a header block.
+
+    Args:
+        header_block (bytes): The (complete) header block.
+
+    Returns:
+        List[HeaderField]: The representation of each field (including
+        dynamic table size updates), in order.
+
+    Raises:
+        IndexError: If the header block is truncated.
+    """
+    fields = []
+    offset = 0
+    end = len(header_block)
+    while offset < end:
+        start = offset
+        first_byte = header_block[offset]
+        if first_byte & 0x80:
+            index, offset = decode_integer(header_block, offset, 7)
+            fields.append(
+                HeaderField(INDEXED, index, 0, False, 0, False, offset - start)
+            )
+            continue
+        if first_byte & 0xE0 == 0x20:
+            max_size, offset = decode_integer(header_block, offset, 5)
+            fields.append(
+                HeaderField(
+                    SIZE_UPDATE, max_size, 0, False, 0, False, offset - start
+                )
+            )
+            continue
+
+        if first_byte & 0xC0 == 0x40:
+            representation = LITERAL_INDEXED
+            index, offset = decode_integer(header_block, offset, 6)
+        else:
+            representation = LITERAL
+            if first_byte & 0xF0 == 0x10:
+                representation = LITERAL_NEVER
+            index, offset = decode_integer(header_block, offset, 4)
+        name_length = 0
+        name_huffman = False
+        if index == 0:
+            name_length, name_huffman, offset = _skip_string(
+                header_block, offset
+            )
+        value_length, value_huffman, offset = _skip_string(
+            header_block, offset
+        )
+        fields.append(
+            HeaderField(
+                representation,
+                index,
+                name_length,
+                name_huffman,
+                value_length,
+                value_huffman,
+                offset - start,
+            )
+        )
+    return fields
+
+
+class HeaderTotals:
+    """Totals for every field with a given header name.
+
+    Args:
+        name (str): The header name.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.encoded_bytes = 0
+        self.max_decoded_size = 0
+
+
+class HpackStats:
+    """HPACK compression statistics for the header blocks sent by one peer.
+
+    Sizes of decoded headers are the octets in the name and value (without
+    the 32 octet overhead used for the dynamic table size).
+    """
+
+    def __init__(self):
+        self.header_blocks = 0
+        self.unmatched_blocks = 0
+        self.encoded_bytes = 0
+        self.decoded_bytes = 0
+        self.fields = 0
+        self.indexed_static = 0
+        self.indexed_dynamic = 0
+        self.literal_indexed = 0
+        self.literal_not_indexed = 0
+        self.dynamic_names = 0
+        self.size_updates = 0
+        self.huffman_encoded = 0
+        self.huffman_decoded = 0
+        self.raw_string_bytes = 0
+        self.headers = {}
+
+    def _header_totals(self, name):
+        """Get the totals for a header name.
+
+        Args:
+            name (str): The header name.
+
+        Returns:
+            HeaderTotals: The totals for ``name`` (or for ``OTHER_NAME`` if
+            too many names are already tracked).
+        """
+        totals = self.headers.get(name)
+        if totals is not None:
+            return totals
+
+        if len(self.headers) >= MAX_HEADER_NAMES:
+            name = OTHER_NAME
+        return self.headers.setdefault(name, HeaderTotals(name))
+
+    def on_header_block(self, header_block, headers):
+        """Update the statistics for a header block.
+
+        Args:
+            header_block (bytes): The (complete) header block.
+            headers (List[Tuple[str, str]]): The headers it decoded to.
+        """
+        self.header_blocks += 1
+        self.encoded_bytes += len(header_block)
+        sizes = [
+            (len(name.encode("utf-8")), len(value.encode("utf-8")))
+            for name, value in headers
+        ]
+        self.decoded_bytes += sum(
+            name_size + value_size for name_size, value_size in sizes
+        )
+
+        try:
+            fields = walk_header_block(header_block)
+        except IndexError:
+            fields = None
+        if fields is not None:
+            self.size_updates += sum(
+                1 for field in fields if field.representation == SIZE_UPDATE
+            )
+            fields = [
+                field
+                for field in fields
+                if field.representation != SIZE_UPDATE
+            ]
+        # NOTE: The decoder accepted the header block, so this is only
+        #       expected if the decoder and this walk disagree.
+        if fields is None or len(fields) != len(headers):
+            self.unmatched_blocks += 1
+            return
+
+        for field, (name, _), (name_size, value_size) in zip(
+            fields, headers, sizes
+        ):
+            self.fields += 1
+            if field.representation == INDEXED:
+                if field.index > STATIC_TABLE_SIZE:
+                    self.indexed_dynamic += 1
+                else:
+                    self.indexed_static += 1
+            else:
+                if field.representation == LITERAL_INDEXED:
+                    self.literal_indexed += 1
+                else:
+                    self.literal_not_indexed += 1
+                if field.index > STATIC_TABLE_SIZE:
+                    self.dynamic_names += 1
+                if field.index == 0:
+                    self._count_string(
+                        field.name_length, field.name_huffman, name_size
+                    )
+                self._count_string(
+                    field.value_length, field.value_huffman, value_size
+                )
+
+            totals = self._header_totals(name)
+            totals.count += 1
+            totals.encoded_bytes += field.size
+            totals.max_decoded_size = max(
+                totals.max_decoded_size, name_size + value_size
+            )
+
+    def _count_string(self, encoded_length, huffman, decoded_size):
+        """Update the string literal totals.
+
+        Args:
+            encoded_length (int): The encoded length of the string.
+            huffman (bool): Indicates if the string is Huffman encoded.
+            decoded_size (int): The size of the decoded string.
+        """
+        if huffman:
+            self.huffman_encoded += encoded_length
+            self.huffman_decoded += decoded_size
+        else:
+            self.raw_string_bytes += encoded_length
+
+    def describe(self, label):
+        """Describe the statistics.
+
+        Args:
+            label (str): The label for the peer, e.g. ``C->S``.
+
+        Returns:
+            List[str]: The description, or an empty list if no header
+            blocks were sent.
+        """
+        if self.header_blocks == 0:
+            return []
+
+        ratio = self.encoded_bytes / max(self.decoded_bytes, 1)
+        indexed = self.indexed_static + self.indexed_dynamic
+        literal = self.literal_indexed + self.literal_not_indexed
+        hit_rate = 100.0 * self.indexed_dynamic / max(self.fields, 1)
+        lines = [
+            f"   {label}: {self.header_blocks} header blocks, "
+            f"{self.encoded_bytes} bytes encoded / {self.decoded_bytes} "
+            f"bytes decoded (ratio {ratio:.3f})",
+            f"      fields = {self.fields}: indexed = {indexed} (static "
+            f"{self.indexed_static}, dynamic {self.indexed_dynamic}), "
+            f"literal = {literal} ({self.literal_indexed} indexed, "
+            f"{self.literal_not_indexed} not indexed, {self.dynamic_names} "
+            "with a dynamic name)",
+            f"      dynamic table hit rate = {hit_rate:.1f}%, Huffman = "
+            f"{self.huffman_decoded} -> {self.huffman_encoded} bytes (saved "
+            f"{self.huffman_decoded - self.huffman_encoded}), raw strings = "
+            f"{self.raw_string_bytes} bytes",
+        ]
+        if self.size_updates or self.unmatched_blocks:
+            lines.append(
+                f"      table size updates = {self.size_updates}, "
+                f"unmatched header blocks = {self.unmatched_blocks}"
+            )
+
+        largest = sorted(
+            self.headers.values(),
+            key=lambda totals: (-totals.encoded_bytes, totals.name),
+        )
+        for totals in largest[:MAX_HEADER_LINES]:
+            lines.append(
+                f"      {totals.name}: {totals.encoded_bytes} bytes encoded "
+                f"in {totals.count} field(s), largest = "
+                f"{totals.max_decoded_size} bytes decoded"
+            )
+        return lines
+
+
+class HpackTracker(tcp_h2_describe._tracker.Tracker):
+    """Track HPACK compression for both peers in a connection.
+
+    Args:
+        connection (.ConnectionState): The connection being tracked.
+    """
+
+    def __init__(self, connection):
+        super().__init__(connection)
+        self.client = HpackStats()
+        self.server = HpackStats()
+
+    def on_frame(self, peer, type_byte, flags, stream_id, frame_payload):
+        headers = peer.current_headers
+        if headers is None:
+            return
+
+        stats = self.client if peer.is_client else self.server
+        stats.on_header_block(peer.current_header_block, headers)
+
+    def describe(self):
+        lines = self.client.describe("C->S") + self.server.describe("S->C")
+        if not lines:
+            return ""
+
+        lines.insert(0, f"HPACK ({self.connection.client.description}) =")
+        return "\n".join(lines)
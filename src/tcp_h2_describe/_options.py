@@ -0,0 +1,143 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+def parse_positive_int(value):
+    """Parse a positive integer, e.g. the size of the flight recorder.
+
+    Args:
+        value (str): The integer.
+
+    Returns:
+        int: The integer.
+
+    Raises:
+        ValueError: If ``value`` is not a positive integer.
+    """
+    result = int(value)
+    if result <= 0:
+        raise ValueError("Value must be positive", value)
+    return result
+
+
+class ProxyOptions:
+    """Options that customize how the proxy handles each connection.
+
+    A single instance is shared (read-only) by every connection handled by
+    :func:`serve_proxy`.
+
+    Args:
+        pass_through_data (Optional[bool]): Indicates if DATA frames should
+            be described from the 9-octet frame header only. In this mode the
+            DATA payload is never copied or handed to a payload handler; the
+            bytes are forwarded as-is. Defaults to :data:`False`.
+        summary_interval (Optional[float]): If set, per-frame descriptions
+            are skipped; instead a summary of the counters for each
+            connection is displayed every ``summary_interval`` seconds and
+            when the connection closes.
+        stream_timing (Optional[bool]): Indicates if the request / response
+            timing (e.g. time to first response byte) should be displayed
+            for each stream when it ends. Defaults to :data:`False`.
+        flow_control (Optional[bool]): Indicates if the flow-control send
+            windows (and the time spent stalled at a zero window) should be
+            tracked for each connection and stream. Defaults to
+            :data:`False`.
+        ping_rtt (Optional[bool]): Indicates if PINGs should be matched with
+            their ACKs to measure the round-trip time for each leg (i.e.
+            proxy<->client and proxy<->server) of a connection. Defaults to
+            :data:`False`.
+        ping_interval (Optional[float]): If set, the proxy will inject its
+            own PING into both peers of each connection every
+            ``ping_interval`` seconds (this implies ``ping_rtt``). The ACKs
+            for these PINGs are not forwarded.
+        debug_signals (Optional[bool]): Indicates if ``SIGUSR1`` should
+            start / stop a sampling profiler (for the redirect threads) and
+            ``SIGUSR2`` should display the stack of every thread. Defaults
+            to :data:`False`.
+        plugins (Optional[Iterable[str]]): The names of the (installed)
+            plugins whose payload handlers and settings should be enabled.
+        flight_recorder (Optional[int]): If set, the most recent
+            ``flight_recorder`` frames sent by each peer are kept (as compact
+            records) and displayed when a peer sends a GOAWAY or RST_STREAM
+            or when redirecting fails. With ``debug_signals``, ``SIGUSR2``
+            also displays them for every active connection.
+        triggers (Optional[.Triggers]): If set, frames are only described
+            around a trigger (e.g. a RST_STREAM with a given error code):
+            the flight recorder is displayed when a trigger fires and every
+            frame is described for a window after it. Can't be combined
+            with ``summary_interval``.
+        shaping (Optional[.Shaping]): If set, the bandwidth caps and
+            latency to apply to the bytes forwarded by each connection.
+        capture_dir (Optional[str]): If set, the bytes sent by both peers
+            of each connection are written to a capture file in this
+            directory (e.g. to be replayed with ``tcp-h2-replay`` or
+            compared with ``tcp-h2-compare``).
+        export_dir (Optional[str]): If set, the metadata of each frame (for
+            every connection) is written to typed column files in this
+            directory (see :mod:`._export`).
+        hpack_stats (Optional[bool]): Indicates if HPACK compression
+            statistics should be tracked for each connection. This decodes
+            header blocks even with ``summary_interval`` (so the statistics
+            are also included in each periodic summary). Defaults to
+            :data:`False`.
+        stream_concurrency (Optional[bool]): Indicates if the number of
+            open streams (over time) should be tracked for each connection
+            and compared with ``SETTINGS_MAX_CONCURRENT_STREAMS``. Defaults
+            to :data:`False`.
+
+    Raises:
+        ValueError: If both ``summary_interval`` and ``triggers`` are set.
+        ValueError: If ``flight_recorder`` is not positive.
+    """
+
+    def __init__(
+        self,
+        pass_through_data=False,
+        summary_interval=None,
+        stream_timing=False,
+        flow_control=False,
+        ping_rtt=False,
+        ping_interval=None,
+        debug_signals=False,
+        plugins=(),
+        flight_recorder=None,
+        triggers=None,
+        shaping=None,
+        capture_dir=None,
+        export_dir=None,
+        hpack_stats=False,
+        stream_concurrency=False,
+    ):
+        if summary_interval is not None and triggers is not None:
+            raise ValueError(
+                "Triggers can't be combined with a summary interval"
+            )
+        if flight_recorder is not None and flight_recorder <= 0:
+            raise ValueError(
+                "Flight recorder size must be positive", flight_recorder
+            )
+
+        self.pass_through_data = pass_through_data
+        self.summary_interval = summary_interval
+        self.stream_timing = stream_timing
+        self.flow_control = flow_control
+        self.ping_rtt = ping_rtt or ping_interval is not None
+        self.ping_interval = ping_interval
+        self.debug_signals = debug_signals
+        self.plugins = tuple(plugins)
+        self.flight_recorder = flight_recorder
+        self.triggers = triggers
+        self.shaping = shaping
+        self.capture_dir = capture_dir
+        self.export_dir = export_dir
+        self.hpack_stats = hpack_stats
+        self.stream_concurrency = stream_concurrency
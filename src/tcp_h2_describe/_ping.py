@@ -0,0 +1,288 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import bisect
+import itertools
+import struct
+import threading
+import time
+
+import tcp_h2_describe._build
+import tcp_h2_describe._state
+import tcp_h2_describe._tracker
+
+
+PING = 0x6
+SETTINGS = 0x4
+FLAG_ACK = 0x1
+# NOTE: PINGs injected by the proxy use opaque data that starts with
+#       ``th2d`` followed by a 4-byte counter.
+INJECTED_PREFIX = b"th2d"
+STRUCT_COUNTER = struct.Struct(">L")
+# NOTE: The upper bounds (in seconds) of each histogram bucket; the last
+#       bucket is unbounded.
+BUCKET_BOUNDS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
+# NOTE: A peer may never ACK a PING, so only a bounded number are kept
+#       waiting for an ACK.
+MAX_PENDING = 64
+
+
+class RTTHistogram:
+    """Histogram of round-trip times for one leg of a connection."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+
+    def add(self, rtt):
+        """Add a round-trip time to the histogram.
+
+        Args:
+            rtt (float): The round-trip time, in seconds.
+        """
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS, rtt)] += 1
+        self.count += 1
+        self.total += rtt
+        if self.minimum is None or rtt < self.minimum:
+            self.minimum = rtt
+        if self.maximum is None or rtt > self.maximum:
+            self.maximum = rtt
+
+    def describe(self):
+        """Describe the histogram.
+
+        Returns:
+            str: The summary statistics and the non-empty buckets.
+        """
+        if self.count == 0:
+            return "count = 0"
+
+        parts = []
+        for index, bucket_count in enumerate(self.buckets):
+            if bucket_count == 0:
+                continue
+            if index < len(BUCKET_BOUNDS):
+                label = f"<={1000.0 * BUCKET_BOUNDS[index]:g}ms"
+            else:
+                label = f">{1000.0 * BUCKET_BOUNDS[-1]:g}ms"
+            parts.append(f"{label}: {bucket_count}")
+
+        return (
+            f"count = {self.count}, "
+            f"min = {1000.0 * self.minimum:.3f}ms, "
+            f"avg = {1000.0 * self.total / self.count:.3f}ms, "
+            f"max = {1000.0 * self.maximum:.3f}ms\n"
+            f"      {', '.join(parts)}"
+        )
+
+
+class PingTracker(tcp_h2_describe._tracker.Tracker):
+    """Match PINGs with their ACKs to measure round-trip time.
+
+    .. PING spec: https://http2.github.io/http2-spec/#PING
+
+    A PING sent by one peer is timed from when the proxy **forwards** it
+    until the proxy sees the ACK from the other peer, so a PING from the
+    client measures the proxy<->server leg and a PING from the server
+    measures the proxy<->client leg. PINGs are matched to ACKs by their
+    opaque data. See `PING spec`_.
+
+    Args:
+        connection (.ConnectionState): The connection being tracked.
+    """
+
+    def __init__(self, connection):
+        super().__init__(connection)
+        # NOTE: Keyed by ``(is_client, opaque_data)`` where ``is_client``
+        #       describes the peer expected to send the ACK. A value of
+        #       ``None`` means the PING has not been forwarded yet.
+        self.pending = {}
+        self.unforwarded = {True: [], False: []}
+        self.client_leg = RTTHistogram()
+        self.server_leg = RTTHistogram()
+
+    def _add_pending(self, key, sent_at):
+        """Add a PING that is waiting for an ACK.
+
+        Args:
+            key (Tuple[bool, bytes]): The peer expected to ACK and the
+                opaque data.
+            sent_at (Optional[float]): The time the PING was forwarded.
+        """
+        self.pending[key] = sent_at
+        if len(self.pending) > MAX_PENDING:
+            del self.pending[next(iter(self.pending))]
+
+    def on_frame(self, peer, type_byte, flags, stream_id, frame_payload):
+        if type_byte != PING or len(frame_payload) != 8:
+            return
+
+        opaque_data = bytes(frame_payload)
+        if flags & FLAG_ACK == 0:
+            key = (not peer.is_client, opaque_data)
+            self._add_pending(key, None)
+            self.unforwarded[peer.is_client].append(key)
+            return
+
+        sent_at = self.pending.pop((peer.is_client, opaque_data), None)
+        if sent_at is None:
+            return
+
+        rtt = peer.received_at - sent_at
+        if peer.is_client:
+            self.client_leg.add(rtt)
+        else:
+            self.server_leg.add(rtt)
+
+    def on_forwarded(self, peer, now):
+        keys = self.unforwarded[peer.is_client]
+        if not keys:
+            return
+
+        for key in keys:
+            if key in self.pending:
+                self.pending[key] = now
+        keys.clear()
+
+    def add_injected(self, target, opaque_data, sent_at):
+        """Record a PING injected by the proxy.
+
+        Args:
+            target (.PeerState): The peer the PING was sent to (i.e. the
+                peer expected to send the ACK).
+            opaque_data (bytes): The opaque data in the PING.
+            sent_at (float): The time the PING was sent.
+        """
+        self._add_pending((target.is_client, opaque_data), sent_at)
+
+    def describe(self):
+        return "\n".join(
+            [
+                f"PING Round Trips ({self.connection.client.description}) =",
+                f"   proxy<->client: {self.client_leg.describe()}",
+                f"   proxy<->server: {self.server_leg.describe()}",
+            ]
+        )
+
+
+def _is_ready(connection):
+    """Determine if it is safe to inject a PING into a connection.
+
+    Both peers must have sent SETTINGS (i.e. the client connection preface
+    is done) and had it forwarded before a frame can be injected.
+
+    Args:
+        connection (.ConnectionState): The connection to check.
+
+    Returns:
+        bool: Indicates if the connection is ready.
+    """
+    client = connection.client
+    server = connection.server
+    return (
+        client.frame_counts[SETTINGS] > 0
+        and server.frame_counts[SETTINGS] > 0
+        and client.forwarded_chunks > 0
+        and server.forwarded_chunks > 0
+    )
+
+
+def inject_pings(connection, counter):
+    """Inject a PING (from the proxy) into both peers of a connection.
+
+    The ACK for an injected PING is timed and then dropped (rather than
+    being forwarded to the other peer, who did not send the PING).
+
+    Args:
+        connection (.ConnectionState): The connection to inject into.
+        counter (Iterator[int]): Used to generate unique opaque data.
+    """
+    tracker = connection.find_tracker(PingTracker)
+    if tracker is None or not _is_ready(connection):
+        return
+
+    # NOTE: A PING sent **to** the server is written by the client peer
+    #       (i.e. the peer that SENDs to the server socket) and the ACK is
+    #       read by the server peer.
+    for sender, target in (
+        (connection.client, connection.server),
+        (connection.server, connection.client),
+    ):
+        opaque_data = INJECTED_PREFIX + STRUCT_COUNTER.pack(
+            next(counter) & 0xFFFFFFFF
+        )
+        ack = tcp_h2_describe._build.build_ping(opaque_data, True)
+        target.suppress(ack)
+        with connection.tracker_lock:
+            tracker.add_injected(target, opaque_data, time.monotonic())
+        if not sender.inject(tcp_h2_describe._build.build_ping(opaque_data)):
+            # NOTE: A frame is in flight, so the PING is skipped until the
+            #       next interval.
+            target.unsuppress(ack)
+            with connection.tracker_lock:
+                tracker.pending.pop((target.is_client, opaque_data), None)
+
+
+def inject_active(interval):
+    """Periodically inject PINGs into each active connection.
+
+    This is intended to be the target of a daemon thread; it never returns.
+
+    Args:
+        interval (float): The time (in seconds) between PINGs.
+    """
+    counter = itertools.count()
+    while True:
+        time.sleep(interval)
+        with tcp_h2_describe._state.ACTIVE_LOCK:
+            connections = list(tcp_h2_describe._state.ACTIVE_CONNECTIONS)
+
+        for connection in connections:
+            try:
+                inject_pings(connection, counter)
+            except (OSError, RuntimeError):
+                # NOTE: The connection may have been closed after it was
+                #       copied out of ``ACTIVE_CONNECTIONS``.
+                pass
+
+
+def start_injector(interval):
+    """Start a (daemon) thread that periodically injects PINGs.
+
+    Args:
+        interval (float): The time (in seconds) between PINGs.
+
+    Returns:
+        threading.Thread: The thread that was started.
+    """
+    t_inject = threading.Thread(
+        target=inject_active, args=(interval,), daemon=True
+    )
+    t_inject.start()
+    return t_inject
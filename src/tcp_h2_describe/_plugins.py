@@ -0,0 +1,177 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Plugins that provide payload handlers and custom settings.
+
+A plugin is a set of entry points in an installed distribution, e.g. in
+``setup.py``:
+
+.. code-block:: python
+
+   entry_points={
+       "tcp_h2_describe.payload_handlers": (
+           "grpc.DATA = tcp_h2_describe_grpc:handle_data_payload",
+       ),
+       "tcp_h2_describe.settings": (
+           "grpc.0xfe03 = tcp_h2_describe_grpc:ALLOW_TRUE_BINARY_METADATA",
+       ),
+   }
+
+Each entry point name is the plugin name followed by the frame type (for a
+payload handler) or the setting ID (for a setting); the object for a setting
+is the name of the setting. Payload handlers are always called with a
+``FrameContext`` (see ``register_payload_handler()``).
+
+Only the entry point metadata is read when a plugin is enabled; the object
+is loaded (i.e. its module imported) when its frame type or setting is
+first described.
+"""
+
+import tcp_h2_describe._describe
+
+
+PAYLOAD_HANDLER_GROUP = "tcp_h2_describe.payload_handlers"
+SETTING_GROUP = "tcp_h2_describe.settings"
+
+
+def _entry_points(group):
+    """Get the entry points in a group (without loading them).
+
+    Args:
+        group (str): The entry point group.
+
+    Returns:
+        List[importlib.metadata.EntryPoint]: The entry points.
+    """
+    try:
+        import importlib.metadata as importlib_metadata
+    except ImportError:
+        # NOTE: ``importlib.metadata`` was added in Python 3.8.
+        import pkg_resources
+
+        return list(pkg_resources.iter_entry_points(group))
+
+    entry_points = importlib_metadata.entry_points()
+    # NOTE: ``EntryPoints.select()`` was added in Python 3.10; before that a
+    #       ``dict`` (keyed by group) is returned.
+    if hasattr(entry_points, "select"):
+        return list(entry_points.select(group=group))
+    return list(entry_points.get(group, ()))
+
+
+def find_plugins():
+    """Find the installed plugins (without loading them).
+
+    Returns:
+        Dict[str, List[Tuple[str, str, importlib.metadata.EntryPoint]]]: The
+        entry points for each plugin (keyed by plugin name). Each entry
+        point is described by a triple of the entry point group, the frame
+        type or setting ID and the entry point itself.
+    """
+    plugins = {}
+    for group in (PAYLOAD_HANDLER_GROUP, SETTING_GROUP):
+        for entry_point in _entry_points(group):
+            plugin_name, _, key = entry_point.name.rpartition(".")
+            plugins.setdefault(plugin_name, []).append(
+                (group, key, entry_point)
+            )
+    return plugins
+
+
+def describe_plugins(plugins):
+    """Describe the installed plugins.
+
+    Args:
+        plugins (Dict[str, List[Tuple[str, str, Any]]]): The plugins, as
+            returned by :func:`find_plugins`.
+
+    Returns:
+        str: One line per plugin, with the frame types and settings it
+        provides.
+    """
+    if not plugins:
+        return "No plugins installed"
+
+    lines = ["Plugins ="]
+    for plugin_name, entries in sorted(plugins.items()):
+        parts = [
+            key if group == PAYLOAD_HANDLER_GROUP else f"setting {key}"
+            for group, key, _ in entries
+        ]
+        lines.append(f"   {plugin_name}: {', '.join(parts)}")
+    return "\n".join(lines)
+
+
+class LazyPayloadHandler:
+    """A payload handler that is loaded from an entry point when first used.
+
+    Args:
+        entry_point (importlib.metadata.EntryPoint): The entry point for the
+            handler.
+    """
+
+    def __init__(self, entry_point):
+        self.entry_point = entry_point
+        self.handler = None
+
+    def __call__(self, frame_payload, flags, context=None):
+        """Describe a frame payload with the (loaded) handler.
+
+        Args:
+            frame_payload (bytes): The frame payload to be parsed.
+            flags (int): The flags for the frame payload.
+            context (Optional[.FrameContext]): The context for the frame.
+
+        Returns:
+            str: The description of ``frame_payload``.
+        """
+        if self.handler is None:
+            self.handler = self.entry_point.load()
+        return self.handler(frame_payload, flags, context)
+
+
+def enable_plugins(plugin_names):
+    """Register the payload handlers and settings from plugins.
+
+    .. note::
+
+        This function updates the (global) registries for payload handlers
+        and settings, so it should be called well before ``serve_proxy()``.
+
+    Args:
+        plugin_names (Iterable[str]): The names of the plugins to enable.
+
+    Raises:
+        ValueError: If any of ``plugin_names`` is not an installed plugin.
+        ValueError: If a plugin provides a handler for an invalid frame type.
+        KeyError: If a plugin provides a handler for a frame type (or a
+            setting) that is already registered.
+    """
+    plugin_names = list(plugin_names)
+    if not plugin_names:
+        return
+
+    plugins = find_plugins()
+    unknown = [name for name in plugin_names if name not in plugins]
+    if unknown:
+        raise ValueError("Unknown plugin(s)", unknown)
+
+    for plugin_name in plugin_names:
+        for group, key, entry_point in plugins[plugin_name]:
+            if group == PAYLOAD_HANDLER_GROUP:
+                tcp_h2_describe._describe.register_payload_handler(
+                    key, LazyPayloadHandler(entry_point), with_context=True
+                )
+            else:
+                tcp_h2_describe._describe.register_lazy_setting(
+                    int(key, 0), entry_point.load
+                )
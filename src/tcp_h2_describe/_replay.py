@@ -0,0 +1,898 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Replay captured client traffic against a server.
+
+A capture (see ``tcp-h2-describe --capture``) holds the bytes of one
+connection; only the client->server bytes are replayed. Replaying it opens a
+new connection and resends the SETTINGS, HEADERS, DATA and RST_STREAM frames
+from the capture, each at its original offset from the start of the
+connection (scaled by ``--speed``).
+
+The frames can't be resent byte-for-byte, since the new connection is with
+a (possibly different) server:
+
+* Header blocks are decoded (with an HPACK decoder that mirrors the one the
+  original server used) and re-encoded for the new connection, so the HPACK
+  state matches the table size the new server allows
+* Streams are renumbered (in the order they are opened), so a stream that
+  has to wait for ``SETTINGS_MAX_CONCURRENT_STREAMS`` still gets a valid ID
+* DATA is split to fit the new server's ``SETTINGS_MAX_FRAME_SIZE`` and
+  waits for its flow-control windows
+* WINDOW_UPDATE, PING, PRIORITY and GOAWAY frames are dropped; the replay
+  sends its own WINDOW_UPDATEs (and ACKs) for the frames the server sends
+"""
+
+import argparse
+import collections
+import select
+import socket
+import threading
+import time
+
+import hpack
+
+import tcp_h2_describe._build
+import tcp_h2_describe._capture
+import tcp_h2_describe._describe
+
+
+DATA = 0x0
+HEADERS = 0x1
+RST_STREAM = 0x3
+SETTINGS = 0x4
+PING = 0x6
+GOAWAY = 0x7
+WINDOW_UPDATE = 0x8
+CONTINUATION = 0x9
+FLAG_ACK = 0x1
+FLAG_END_STREAM = 0x1
+FLAG_END_HEADERS = 0x4
+SETTINGS_HEADER_TABLE_SIZE = 0x1
+SETTINGS_MAX_CONCURRENT_STREAMS = 0x3
+SETTINGS_INITIAL_WINDOW_SIZE = 0x4
+SETTINGS_MAX_FRAME_SIZE = 0x5
+DEFAULT_WINDOW_SIZE = 0xFFFF
+DEFAULT_MAX_FRAME_SIZE = 0x4000
+# NOTE: The original client may have used any table size the original server
+#       allowed, so the mirror decoder accepts any size update.
+MAX_TABLE_SIZE = 0xFFFFFFFF
+RECV_SIZE = 0x40000
+FRAME_HEADER_SIZE = 9
+PERCENTILES = (0.5, 0.9, 0.99)
+ReplayEvent = collections.namedtuple(
+    "ReplayEvent", ["offset", "type_byte", "stream_id", "value", "end_stream"]
+)
+ReplayEvent.__doc__ = """A frame (or header block) to resend.
+
+Args:
+    offset (float): The time (in seconds) from the start of the connection
+        when the frame was RECV-ed by the proxy.
+    type_byte (int): The frame type: SETTINGS, HEADERS (for a complete
+        header block), DATA or RST_STREAM.
+    stream_id (int): The (original) stream identifier.
+    value (Union[List[Tuple[int, int]], List[Tuple[bytes, bytes]], bytes, \
+int]): The settings, headers, data or error code.
+    end_stream (bool): Indicates if the frame ended the stream.
+"""
+
+
+def split_frames(h2_frames):
+    """Split the complete frames from the start of a byte string.
+
+    Args:
+        h2_frames (bytes): Frames (the last of which may be incomplete).
+
+    Returns:
+        Tuple[List[Tuple[int, int, int, bytes]], bytes]: The type, flags,
+        stream identifier and payload of each complete frame and the bytes
+        after the last complete frame.
+    """
+    frames = []
+    offset = 0
+    while len(h2_frames) - offset >= FRAME_HEADER_SIZE:
+        length_high, length_low, type_byte, flags, stream_id = (
+            tcp_h2_describe._describe.STRUCT_FRAME_HEADER.unpack_from(
+                h2_frames, offset
+            )
+        )
+        frame_start = offset + FRAME_HEADER_SIZE
+        frame_end = frame_start + ((length_high << 8) | length_low)
+        if frame_end > len(h2_frames):
+            break
+        stream_id &= tcp_h2_describe._describe.STREAM_ID_MASK
+        frames.append(
+            (type_byte, flags, stream_id, h2_frames[frame_start:frame_end])
+        )
+        offset = frame_end
+    return frames, h2_frames[offset:]
+
+
+def load_events(chunks):
+    """Convert the chunks in a capture to the frames to resend.
+
+    Args:
+        chunks (List[Tuple[float, bytes]]): The chunks in a capture.
+
+    Returns:
+        List[ReplayEvent]: The frames to resend, in order.
+
+    Raises:
+        ValueError: If the capture does not begin with the client
+            connection preface.
+    """
+    preface = tcp_h2_describe._describe.PREFACE
+    decoder = hpack.Decoder()
+    decoder.max_allowed_table_size = MAX_TABLE_SIZE
+    events = []
+    buffered = b""
+    seen_preface = False
+    header_block = None
+    for received_at, tcp_chunk in chunks:
+        buffered += tcp_chunk
+        if not seen_preface:
+            if not preface.startswith(buffered[: len(preface)]):
+                raise ValueError("Capture does not begin with the preface")
+            if len(buffered) < len(preface):
+                continue
+            buffered = buffered[len(preface) :]
+            seen_preface = True
+
+        frames, buffered = split_frames(buffered)
+        for type_byte, flags, stream_id, frame_payload in frames:
+            if type_byte == SETTINGS:
+                if flags & FLAG_ACK == 0:
+                    events.append(
+                        ReplayEvent(
+                            received_at,
+                            SETTINGS,
+                            0,
+                            tcp_h2_describe._describe.parse_settings(
+                                frame_payload
+                            ),
+                            False,
+                        )
+                    )
+            elif type_byte == HEADERS or type_byte == CONTINUATION:
+                if type_byte == HEADERS:
+                    end_stream = flags & FLAG_END_STREAM == FLAG_END_STREAM
+                    header_block = [
+                        tcp_h2_describe._describe.header_block_fragment(
+                            type_byte, flags, frame_payload
+                        )
+                    ]
+                else:
+                    header_block.append(frame_payload)
+                if flags & FLAG_END_HEADERS == FLAG_END_HEADERS:
+                    # NOTE: Header blocks are decoded in the order they were
+                    #       sent, as the original server did, to keep the
+                    #       dynamic table in sync.
+                    headers = decoder.decode(b"".join(header_block), raw=True)
+                    header_block = None
+                    events.append(
+                        ReplayEvent(
+                            received_at,
+                            HEADERS,
+                            stream_id,
+                            headers,
+                            end_stream,
+                        )
+                    )
+            elif type_byte == DATA:
+                events.append(
+                    ReplayEvent(
+                        received_at,
+                        DATA,
+                        stream_id,
+                        tcp_h2_describe._describe.remove_padding(
+                            frame_payload, flags
+                        ),
+                        flags & FLAG_END_STREAM == FLAG_END_STREAM,
+                    )
+                )
+            elif type_byte == RST_STREAM and len(frame_payload) == 4:
+                (error_code,) = tcp_h2_describe._describe.STRUCT_L.unpack(
+                    frame_payload
+                )
+                events.append(
+                    ReplayEvent(
+                        received_at, RST_STREAM, stream_id, error_code, True
+                    )
+                )
+
+    return events
+
+
+def build_header_block(encoder, headers, stream_id, end_stream, max_size):
+    """Build the frames for a header block.
+
+    Args:
+        encoder (hpack.Encoder): The HPACK encoder for the connection.
+        headers (List[Tuple[bytes, bytes]]): The headers to encode.
+        stream_id (int): The stream identifier.
+        end_stream (bool): Indicates if the header block ends the stream.
+        max_size (int): The maximum frame payload size.
+
+    Returns:
+        bytes: A HEADERS frame, followed by CONTINUATION frames if the
+        header block does not fit in a single frame.
+    """
+    header_block = encoder.encode(headers)
+    fragments = [
+        header_block[start : start + max_size]
+        for start in range(0, len(header_block), max_size)
+    ] or [b""]
+    frames = []
+    for index, fragment in enumerate(fragments):
+        type_byte = HEADERS if index == 0 else CONTINUATION
+        flags = 0
+        if index == 0 and end_stream:
+            flags |= FLAG_END_STREAM
+        if index == len(fragments) - 1:
+            flags |= FLAG_END_HEADERS
+        frames.append(
+            tcp_h2_describe._build.build_frame(
+                type_byte, flags, stream_id, fragment
+            )
+        )
+    return b"".join(frames)
+
+
+class ReplayConnection:
+    """Replay the frames from one capture on a new connection.
+
+    Args:
+        address (Tuple[str, int]): The host and port to connect to.
+        events (List[ReplayEvent]): The frames to resend.
+        start (float): The time (``perf_counter()``) the connection should
+            be opened.
+        speed (float): The speed-up factor for the original timing.
+        drain_timeout (float): The time (after the last frame is sent) to
+            wait for outstanding responses.
+    """
+
+    def __init__(self, address, events, start, speed, drain_timeout):
+        self.address = address
+        self.events = events
+        self.start = start
+        self.speed = speed
+        self.drain_timeout = drain_timeout
+        self.index = 0
+        self.sock = None
+        self.encoder = hpack.Encoder()
+        self.decoder = hpack.Decoder()
+        # NOTE: Holds the ``SETTINGS_HEADER_TABLE_SIZE`` (or :data:`None`)
+        #       from each SETTINGS sent that the server has not acknowledged.
+        self.pending_table_sizes = collections.deque()
+        self.header_block = None
+        self.goaway = False
+        # NOTE: Maps the original stream ID to the stream ID on this
+        #       connection (which are assigned in order).
+        self.stream_ids = {}
+        self.next_stream_id = 1
+        # NOTE: The send windows and limits are those advertised by the
+        #       server on this connection.
+        self.connection_window = DEFAULT_WINDOW_SIZE
+        self.initial_window = DEFAULT_WINDOW_SIZE
+        self.stream_windows = {}
+        self.max_frame_size = DEFAULT_MAX_FRAME_SIZE
+        self.max_concurrent = None
+        # NOTE: Frames waiting on flow control, keyed by (new) stream ID.
+        self.pending = {}
+        # NOTE: Keyed by (new) stream ID, values are the time the request
+        #       headers were sent. A stream is removed when the server ends
+        #       it (or it is reset).
+        self.in_flight = {}
+        self.response_times = []
+        self.statuses = {}
+        self.streams = 0
+        self.resets = 0
+        self.errors = 0
+        self.max_lag = 0.0
+        self.failure = None
+
+    def due_at(self, event):
+        """Get the time an event is due to be sent.
+
+        Args:
+            event (ReplayEvent): The event.
+
+        Returns:
+            float: The due time (``perf_counter()``).
+        """
+        return self.start + event.offset / self.speed
+
+    def blocked(self, event):
+        """Check if an event must wait for a stream to be available.
+
+        Args:
+            event (ReplayEvent): The event.
+
+        Returns:
+            bool: Indicates if ``event`` opens a stream and the server's
+            ``SETTINGS_MAX_CONCURRENT_STREAMS`` has been reached.
+        """
+        return (
+            event.type_byte == HEADERS
+            and event.stream_id not in self.stream_ids
+            and self.max_concurrent is not None
+            and len(self.in_flight) >= self.max_concurrent
+        )
+
+    def send_due(self, now):
+        """Send every frame that is due.
+
+        Frames are sent in order, so a HEADERS frame that must wait for a
+        stream to be available also delays the frames after it.
+
+        Args:
+            now (float): The current time.
+
+        Returns:
+            bytes: The frames to send.
+        """
+        frames = []
+        while self.index < len(self.events):
+            event = self.events[self.index]
+            due_at = self.due_at(event)
+            if due_at > now or self.blocked(event):
+                break
+            self.max_lag = max(self.max_lag, now - due_at)
+            self.index += 1
+            frames.append(self.send_event(event, now))
+        return b"".join(frames)
+
+    def send_event(self, event, now):
+        """Build the frames to send for an event.
+
+        Args:
+            event (ReplayEvent): The event.
+            now (float): The current time.
+
+        Returns:
+            bytes: The frames.
+        """
+        if event.type_byte == SETTINGS:
+            self.on_client_settings(event.value)
+            return tcp_h2_describe._build.build_settings(event.value)
+
+        stream_id = self.stream_ids.get(event.stream_id)
+        if stream_id is None and event.type_byte == HEADERS:
+            stream_id = self.next_stream_id
+            self.next_stream_id += 2
+            self.stream_ids[event.stream_id] = stream_id
+            self.stream_windows[stream_id] = self.initial_window
+            self.in_flight[stream_id] = now
+            self.streams += 1
+        elif stream_id not in self.in_flight:
+            # NOTE: Frames for a stream that was never opened (e.g. the
+            #       capture started mid-stream) or that has already been
+            #       closed (e.g. the server responded early) are dropped.
+            return b""
+
+        # NOTE: Frames for a stream wait behind any DATA on that stream that
+        #       is blocked by flow control (e.g. trailers wait for the body).
+        self.pending.setdefault(stream_id, collections.deque()).append(
+            (event.type_byte, event.value, event.end_stream)
+        )
+        return self.flush(stream_id)
+
+    def flush(self, stream_id):
+        """Build the frames waiting for a stream, as flow control allows.
+
+        Args:
+            stream_id (int): The (new) stream identifier.
+
+        Returns:
+            bytes: The frames that can be sent.
+        """
+        build = tcp_h2_describe._build
+        pending = self.pending.get(stream_id)
+        frames = []
+        while pending:
+            type_byte, value, end_stream = pending[0]
+            if type_byte == HEADERS:
+                pending.popleft()
+                frames.append(
+                    build_header_block(
+                        self.encoder,
+                        value,
+                        stream_id,
+                        end_stream,
+                        self.max_frame_size,
+                    )
+                )
+                continue
+            if type_byte == RST_STREAM:
+                pending.popleft()
+                frames.append(
+                    build.build_frame(
+                        RST_STREAM,
+                        0,
+                        stream_id,
+                        tcp_h2_describe._describe.STRUCT_L.pack(value),
+                    )
+                )
+                self.in_flight.pop(stream_id, None)
+                continue
+
+            window = min(
+                self.connection_window, self.stream_windows[stream_id]
+            )
+            size = min(len(value), window, self.max_frame_size)
+            if size <= 0 and value:
+                break
+            self.connection_window -= size
+            self.stream_windows[stream_id] -= size
+            if size == len(value):
+                pending.popleft()
+                frames.append(build.build_data(stream_id, value, end_stream))
+            else:
+                pending[0] = (type_byte, value[size:], end_stream)
+                frames.append(build.build_data(stream_id, value[:size]))
+
+        if not pending:
+            self.pending.pop(stream_id, None)
+        return b"".join(frames)
+
+    def flush_all(self):
+        """Build the frames waiting for any stream, as flow control allows.
+
+        Returns:
+            bytes: The frames that can be sent.
+        """
+        return b"".join(
+            [self.flush(stream_id) for stream_id in list(self.pending)]
+        )
+
+    def finish(self, stream_id, now, reset=False):
+        """Record a response that has ended.
+
+        Args:
+            stream_id (int): The (new) stream identifier.
+            now (float): The current time.
+            reset (Optional[bool]): Indicates if the server reset the stream.
+        """
+        sent_at = self.in_flight.pop(stream_id, None)
+        self.pending.pop(stream_id, None)
+        if sent_at is None:
+            return
+        if reset:
+            self.resets += 1
+            return
+        self.response_times.append(now - sent_at)
+
+    def on_client_settings(self, settings):
+        """Track the HPACK table size allowed by (resent) client settings.
+
+        .. SETTINGS synchronization: https://http2.github.io/http2-spec/#SettingsSync
+
+        The server may use a larger table as soon as it has seen the
+        SETTINGS (its ACK may arrive after header blocks that use it), so a
+        larger size is allowed right away. A smaller size is only enforced
+        once the server acknowledges it. See `SETTINGS synchronization`_.
+
+        Args:
+            settings (List[Tuple[int, int]]): The settings being sent.
+        """
+        table_size = None
+        for setting_id, setting_value in settings:
+            if setting_id == SETTINGS_HEADER_TABLE_SIZE:
+                table_size = setting_value
+        self.pending_table_sizes.append(table_size)
+        if (
+            table_size is not None
+            and table_size > self.decoder.max_allowed_table_size
+        ):
+            self.decoder.max_allowed_table_size = table_size
+
+    def on_settings_ack(self):
+        """Apply the client settings acknowledged by the server."""
+        if not self.pending_table_sizes:
+            return
+
+        table_size = self.pending_table_sizes.popleft()
+        if table_size is not None:
+            self.decoder.max_allowed_table_size = table_size
+
+    def on_settings(self, settings):
+        """Apply the settings advertised by the server.
+
+        Args:
+            settings (List[Tuple[int, int]]): The settings.
+        """
+        for setting_id, setting_value in settings:
+            if setting_id == SETTINGS_HEADER_TABLE_SIZE:
+                self.encoder.header_table_size = setting_value
+            elif setting_id == SETTINGS_MAX_CONCURRENT_STREAMS:
+                self.max_concurrent = setting_value
+            elif setting_id == SETTINGS_INITIAL_WINDOW_SIZE:
+                delta = setting_value - self.initial_window
+                self.initial_window = setting_value
+                for stream_id in self.stream_windows:
+                    self.stream_windows[stream_id] += delta
+            elif setting_id == SETTINGS_MAX_FRAME_SIZE:
+                self.max_frame_size = setting_value
+
+    def on_frame(self, type_byte, flags, stream_id, frame_payload, now):
+        """Handle a frame received from the server.
+
+        Args:
+            type_byte (int): The frame type.
+            flags (int): The flags for the frame.
+            stream_id (int): The stream identifier.
+            frame_payload (bytes): The frame payload.
+            now (float): The time the frame was received.
+
+        Returns:
+            bytes: Any frames that should be sent in response.
+        """
+        build = tcp_h2_describe._build
+        end_stream = False
+        if type_byte == DATA:
+            end_stream = flags & FLAG_END_STREAM == FLAG_END_STREAM
+        elif type_byte == HEADERS or type_byte == CONTINUATION:
+            if type_byte == HEADERS:
+                end_stream = flags & FLAG_END_STREAM == FLAG_END_STREAM
+                self.header_block = [
+                    tcp_h2_describe._describe.header_block_fragment(
+                        type_byte, flags, frame_payload
+                    )
+                ]
+            else:
+                self.header_block.append(frame_payload)
+            if flags & FLAG_END_HEADERS == FLAG_END_HEADERS:
+                headers = self.decoder.decode(b"".join(self.header_block))
+                self.header_block = None
+                for name, value in headers:
+                    if name == ":status":
+                        self.statuses[value] = self.statuses.get(value, 0) + 1
+        elif type_byte == RST_STREAM:
+            self.finish(stream_id, now, reset=True)
+        elif type_byte == SETTINGS:
+            if flags & FLAG_ACK == FLAG_ACK:
+                self.on_settings_ack()
+                return b""
+            self.on_settings(
+                tcp_h2_describe._describe.parse_settings(frame_payload)
+            )
+            return build.build_settings(ack=True) + self.flush_all()
+        elif type_byte == WINDOW_UPDATE:
+            (increment,) = tcp_h2_describe._describe.STRUCT_L.unpack(
+                frame_payload
+            )
+            increment &= tcp_h2_describe._describe.STREAM_ID_MASK
+            if stream_id == 0:
+                self.connection_window += increment
+                return self.flush_all()
+            if stream_id in self.stream_windows:
+                self.stream_windows[stream_id] += increment
+                return self.flush(stream_id)
+        elif type_byte == PING and flags & FLAG_ACK == 0:
+            return build.build_ping(frame_payload, ack=True)
+        elif type_byte == GOAWAY:
+            self.goaway = True
+
+        if end_stream:
+            self.finish(stream_id, now)
+        return b""
+
+    def on_chunk(self, h2_frames, now):
+        """Handle the complete frames in data received from the server.
+
+        Args:
+            h2_frames (bytes): The received data.
+            now (float): The time the data was received.
+
+        Returns:
+            Tuple[bytes, bytes]: The data after the last complete frame and
+            any frames that should be sent in response.
+        """
+        frames, remaining = split_frames(h2_frames)
+        to_send = []
+        # NOTE: Received DATA is acknowledged right away (for the connection
+        #       and each stream), so the server is never blocked by the
+        #       replay.
+        data_lengths = collections.Counter()
+        for type_byte, flags, stream_id, frame_payload in frames:
+            if type_byte == DATA and frame_payload:
+                data_lengths[stream_id] += len(frame_payload)
+            to_send.append(
+                self.on_frame(type_byte, flags, stream_id, frame_payload, now)
+            )
+
+        build = tcp_h2_describe._build
+        if data_lengths:
+            total = sum(data_lengths.values())
+            to_send.append(build.build_window_update(0, total))
+            for stream_id, length in data_lengths.items():
+                if stream_id in self.in_flight:
+                    to_send.append(
+                        build.build_window_update(stream_id, length)
+                    )
+        return remaining, b"".join(to_send)
+
+    def timeout(self, now, deadline):
+        """Compute how long to wait for the server.
+
+        Args:
+            now (float): The current time.
+            deadline (Optional[float]): The time to give up waiting for
+                responses (once every frame has been sent).
+
+        Returns:
+            Optional[float]: The timeout (in seconds) for ``select()``.
+        """
+        if deadline is not None:
+            return max(0.0, deadline - now)
+        if self.index < len(self.events):
+            event = self.events[self.index]
+            if not self.blocked(event):
+                return max(0.0, self.due_at(event) - now)
+        return None
+
+    def run(self):
+        """Replay the frames and wait for the responses.
+
+        If the connection fails (e.g. it is refused or reset, or the server
+        sends an invalid header block), the reason is kept in ``failure``.
+        Either way, the streams that did not complete are counted as errors.
+        """
+        wait = self.start - time.perf_counter()
+        if wait > 0:
+            # NOTE: Each connection is handled by its own thread, so waiting
+            #       for the (original) connection start time does not delay
+            #       the others.
+            time.sleep(wait)
+
+        try:
+            self._replay()
+        except (OSError, hpack.HPACKError) as exc:
+            self.failure = f"{type(exc).__name__}: {exc}"
+        finally:
+            # NOTE: Streams that never finished (or were never opened because
+            #       the connection closed) count as errors.
+            self.errors += len(self.in_flight)
+            self.errors += sum(
+                1
+                for event in self.events[self.index :]
+                if event.type_byte == HEADERS
+                and event.stream_id not in self.stream_ids
+            )
+            if self.sock is not None:
+                self.sock.close()
+
+    def _replay(self):
+        """Open the connection, send the frames and read the responses.
+
+        Raises:
+            OSError: If the connection fails.
+            hpack.HPACKError: If a header block from the server is invalid.
+        """
+        self.sock = socket.create_connection(self.address)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.sendall(tcp_h2_describe._describe.PREFACE)
+        buffered = b""
+        deadline = None
+        while not self.goaway:
+            now = time.perf_counter()
+            to_send = self.send_due(now)
+            if to_send:
+                self.sock.sendall(to_send)
+            if self.index == len(self.events) and not self.pending:
+                if not self.in_flight:
+                    break
+                if deadline is None:
+                    deadline = now + self.drain_timeout
+                elif now >= deadline:
+                    break
+
+            readable, _, _ = select.select(
+                [self.sock], [], [], self.timeout(now, deadline)
+            )
+            if not readable:
+                continue
+            chunk = self.sock.recv(RECV_SIZE)
+            if not chunk:
+                break
+            buffered, to_send = self.on_chunk(
+                buffered + chunk, time.perf_counter()
+            )
+            if to_send:
+                self.sock.sendall(to_send)
+
+
+def parse_speed(value):
+    """Parse the speed-up factor for a replay.
+
+    Args:
+        value (str): The speed-up factor, e.g. ``2`` or ``0.5``.
+
+    Returns:
+        float: The speed-up factor.
+
+    Raises:
+        ValueError: If ``value`` is not a positive number.
+    """
+    speed = float(value)
+    # NOTE: ``not speed > 0`` also rejects NaN.
+    if not speed > 0:
+        raise ValueError("Speed must be positive", value)
+    return speed
+
+
+def describe_times(label, values):
+    """Describe the distribution of (response) times.
+
+    Args:
+        label (str): The label for the times.
+        values (List[float]): The times (in seconds).
+
+    Returns:
+        str: The percentiles and maximum, in milliseconds.
+    """
+    if not values:
+        return f"{label}: no responses"
+
+    values = sorted(values)
+    parts = []
+    for fraction in PERCENTILES:
+        index = min(len(values) - 1, int(fraction * len(values)))
+        parts.append(f"p{100.0 * fraction:g} = {1000.0 * values[index]:.3f}")
+    parts.append(f"max = {1000.0 * values[-1]:.3f}")
+    return f"{label} (ms): {', '.join(parts)}"
+
+
+def run_replay(address, paths, speed=1.0, copies=1, drain_timeout=5.0):
+    """Replay captures against a server.
+
+    Each capture is replayed ``copies`` times, on its own connection, in
+    parallel. The connections are opened with the same relative timing as
+    the original connections (scaled by ``speed``).
+
+    Args:
+        address (Tuple[str, int]): The host and port to connect to.
+        paths (List[str]): The capture files.
+        speed (Optional[float]): The speed-up factor, e.g. ``2.0`` to replay
+            in half the original time.
+        copies (Optional[int]): The number of times to replay each capture.
+        drain_timeout (Optional[float]): The time (after the last frame is
+            sent on a connection) to wait for outstanding responses.
+
+    Returns:
+        str: The report.
+
+    Raises:
+        ValueError: If ``speed`` is not positive.
+    """
+    if not speed > 0:
+        raise ValueError("Speed must be positive", speed)
+
+    captures = [tcp_h2_describe._capture.read_capture(path) for path in paths]
+    first_opened = min(opened_wall for opened_wall, _ in captures)
+    start = time.perf_counter() + 0.1
+    connections = []
+    for opened_wall, chunks in captures:
+        events = load_events(chunks)
+        connection_start = start + (opened_wall - first_opened) / speed
+        for _ in range(copies):
+            connections.append(
+                ReplayConnection(
+                    address, events, connection_start, speed, drain_timeout
+                )
+            )
+
+    threads = [
+        threading.Thread(target=connection.run, daemon=True)
+        for connection in connections
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - start
+
+    response_times = []
+    statuses = {}
+    for connection in connections:
+        response_times.extend(connection.response_times)
+        for status, count in connection.statuses.items():
+            statuses[status] = statuses.get(status, 0) + count
+    status_parts = ", ".join(
+        f"{status}: {count}" for status, count in sorted(statuses.items())
+    )
+    streams = sum(connection.streams for connection in connections)
+    resets = sum(connection.resets for connection in connections)
+    errors = sum(connection.errors for connection in connections)
+    max_lag = max(connection.max_lag for connection in connections)
+    failures = [
+        connection.failure
+        for connection in connections
+        if connection.failure is not None
+    ]
+    failure_line = f"Failed connections = {len(failures)}"
+    if failures:
+        failure_line += f" (first: {failures[0]})"
+    return "\n".join(
+        [
+            f"Replayed {len(connections)} connection(s) ({len(paths)} "
+            f"capture(s) x {copies}) at {speed:g}x speed in {duration:.3f}s",
+            f"Streams = {streams}, Completed = {len(response_times)}, "
+            f"Reset = {resets}, Errors = {errors}",
+            failure_line,
+            f"Statuses = {{{status_parts}}}",
+            describe_times("Response time", response_times),
+            f"Max send lag = {1000.0 * max_lag:.3f}ms",
+        ]
+    )
+
+
+def get_args():
+    """Get the command line arguments for ``tcp-h2-replay``.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Replay captured client traffic against an HTTP/2 server.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        prog="tcp-h2-replay",
+    )
+    parser.add_argument(
+        "captures",
+        metavar="CAPTURE",
+        nargs="+",
+        help="A capture file written by `tcp-h2-describe --capture`.",
+    )
+    parser.add_argument(
+        "--host", default="localhost", help="The host to connect to."
+    )
+    parser.add_argument(
+        "--port", type=int, default=80, help="The port to connect to."
+    )
+    parser.add_argument(
+        "--speed",
+        type=parse_speed,
+        default=1.0,
+        help="The speed-up factor for the original timing.",
+    )
+    parser.add_argument(
+        "--copies",
+        type=int,
+        default=1,
+        help="The number of times to replay each capture (in parallel).",
+    )
+    parser.add_argument(
+        "--drain-timeout",
+        dest="drain_timeout",
+        type=float,
+        default=5.0,
+        help="The time (in seconds) to wait for outstanding responses.",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    print(
+        run_replay(
+            (args.host, args.port),
+            args.captures,
+            speed=args.speed,
+            copies=args.copies,
+            drain_timeout=args.drain_timeout,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
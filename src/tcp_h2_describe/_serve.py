@@ -10,14 +10,21 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
 import select
 import socket
 import threading
 import time
 
 import tcp_h2_describe._connect
+import tcp_h2_describe._debug
 import tcp_h2_describe._display
+import tcp_h2_describe._export
 import tcp_h2_describe._keepalive
+import tcp_h2_describe._options
+import tcp_h2_describe._ping
+import tcp_h2_describe._plugins
+import tcp_h2_describe._summary
 
 
 PROXY_HOST = "0.0.0.0"
@@ -61,7 +68,9 @@ def accept(non_blocking_socket):
     return client_socket, client_addr
 
 
-def _serve_proxy(proxy_port, server_port, server_host, update_threads):
+def _serve_proxy(
+    proxy_port, server_port, server_host, update_threads, options
+):
     """Serve the proxy.
 
     This is a "happy path" implementation for ``serve_proxy`` that doesn't
@@ -77,6 +86,7 @@ def _serve_proxy(proxy_port, server_port, server_host, update_threads):
         update_threads (Callable[[threading.Thread], None]): A callable that
             takes a single thread and does not return. Used to track state
             of the request handling threads by external caller.
+        options (.ProxyOptions): The options for the proxy.
     """
     proxy_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     proxy_socket.setblocking(0)
@@ -96,7 +106,13 @@ def _serve_proxy(proxy_port, server_port, server_host, update_threads):
         # NOTE: Nothing actually `.join()`-s this thread.
         t_handle = threading.Thread(
             target=tcp_h2_describe._connect.connect_socket_pair,
-            args=(client_socket, client_addr, server_host, server_port),
+            args=(
+                client_socket,
+                client_addr,
+                server_host,
+                server_port,
+                options,
+            ),
         )
         t_handle.start()
         update_threads(t_handle)
@@ -149,7 +165,9 @@ class UpdateThreads:
             t_handle.join()
 
 
-def serve_proxy(proxy_port, server_port, server_host=DEFAULT_SERVER_HOST):
+def serve_proxy(
+    proxy_port, server_port, server_host=DEFAULT_SERVER_HOST, options=None
+):
     """Serve the proxy.
 
     This should run as a top-level server and CLI invocations of
@@ -162,10 +180,28 @@ def serve_proxy(proxy_port, server_port, server_host=DEFAULT_SERVER_HOST):
         server_host (Optional[str]): The host name where the server process is
             running (i.e. the server that is being proxied). Defaults to
             ``localhost``.
+        options (Optional[.ProxyOptions]): The options for the proxy. If not
+            provided, the default options will be used.
     """
+    if options is None:
+        options = tcp_h2_describe._options.ProxyOptions()
+    tcp_h2_describe._plugins.enable_plugins(options.plugins)
+    if options.capture_dir is not None:
+        os.makedirs(options.capture_dir, exist_ok=True)
+    if options.export_dir is not None:
+        tcp_h2_describe._export.get_exporter(options.export_dir)
+    if options.summary_interval is not None:
+        tcp_h2_describe._summary.start_reporter(options.summary_interval)
+    if options.ping_interval is not None:
+        tcp_h2_describe._ping.start_injector(options.ping_interval)
+    if options.debug_signals:
+        tcp_h2_describe._debug.install_handlers()
+
     update_threads = UpdateThreads()
     try:
-        _serve_proxy(proxy_port, server_port, server_host, update_threads)
+        _serve_proxy(
+            proxy_port, server_port, server_host, update_threads, options
+        )
     except KeyboardInterrupt:
         tcp_h2_describe._display.display(
             f"Stopping tcp-h2-describe proxy server on port {proxy_port}"
@@ -0,0 +1,401 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Traffic shaping: bandwidth caps and added latency for forwarded chunks.
+
+Shaping simulates a (WAN) link between the client and the server. Each TCP
+chunk RECV-ed by the proxy is released to the other peer once the token
+buckets for its direction (and its connection) allow it, plus a fixed (or
+jittered) one-way latency. A single scheduler thread tracks when each
+chunk is due, but only hands the due chunks to a sender thread for their
+direction; a slow reader (e.g. a client with a full TCP window) only holds
+up its own direction rather than every shaped connection.
+
+Only a bounded number of bytes are queued for each direction; once the
+queue is full the RECV thread for that direction waits, so the sender sees
+TCP backpressure (and HTTP/2 flow control behaves as it would over the
+simulated link).
+"""
+
+import collections
+import heapq
+import itertools
+import random
+import re
+import threading
+import time
+
+
+DEFAULT_BURST = 0x4000  # 16 KiB
+MAX_QUEUED = 0x100000  # 1 MiB
+RATE_UNITS = {
+    "": 1,
+    "b": 1,
+    "kb": 1000,
+    "mb": 1000 ** 2,
+    "gb": 1000 ** 3,
+    "bit": 1 / 8,
+    "kbit": 1000 / 8,
+    "mbit": 1000 ** 2 / 8,
+    "gbit": 1000 ** 3 / 8,
+}
+RATE_PATTERN = re.compile(r"^\s*([0-9.]+)\s*([a-z]*)\s*$")
+SCHEDULER = None
+SCHEDULER_LOCK = threading.Lock()
+
+
+def parse_rate(value):
+    """Parse a bandwidth, e.g. ``125000``, ``10mbit`` or ``1.5MB``.
+
+    A plain number is in bytes per second; the ``kb``, ``mb`` and ``gb``
+    suffixes are (decimal) bytes per second and the ``bit``, ``kbit``,
+    ``mbit`` and ``gbit`` suffixes are bits per second.
+
+    Args:
+        value (str): The bandwidth.
+
+    Returns:
+        float: The bandwidth, in bytes per second.
+
+    Raises:
+        ValueError: If ``value`` is not a positive number with a known unit.
+    """
+    match = RATE_PATTERN.match(value.lower())
+    if match is None or match.group(2) not in RATE_UNITS:
+        raise ValueError("Invalid rate", value)
+
+    rate = float(match.group(1)) * RATE_UNITS[match.group(2)]
+    if rate <= 0:
+        raise ValueError("Rate must be positive", value)
+    return rate
+
+
+class Shaping:
+    """The link conditions to simulate for each proxied connection.
+
+    Args:
+        client_rate (Optional[float]): The bandwidth (in bytes per second)
+            for client->server bytes on each connection.
+        server_rate (Optional[float]): The bandwidth (in bytes per second)
+            for server->client bytes on each connection.
+        connection_rate (Optional[float]): The bandwidth (in bytes per
+            second) shared by both directions of each connection.
+        latency (Optional[float]): The one-way latency (in seconds) added in
+            each direction.
+        jitter (Optional[float]): The latency added to each chunk is chosen
+            uniformly from ``latency +/- jitter`` (but chunks are never
+            reordered).
+        burst (Optional[int]): The size (in bytes) of each token bucket.
+        seed (Optional[int]): The seed for the jitter, so that a test can be
+            reproduced.
+    """
+
+    def __init__(
+        self,
+        client_rate=None,
+        server_rate=None,
+        connection_rate=None,
+        latency=0.0,
+        jitter=0.0,
+        burst=DEFAULT_BURST,
+        seed=None,
+    ):
+        self.client_rate = client_rate
+        self.server_rate = server_rate
+        self.connection_rate = connection_rate
+        self.latency = latency
+        self.jitter = jitter
+        self.burst = burst
+        self.seed = seed
+
+    def make_bucket(self, rate):
+        """Make a token bucket (if there is a bandwidth cap).
+
+        Args:
+            rate (Optional[float]): The bandwidth, in bytes per second.
+
+        Returns:
+            Optional[TokenBucket]: The bucket, or :data:`None` if ``rate``
+            is not set.
+        """
+        if rate is None:
+            return None
+        return TokenBucket(rate, self.burst)
+
+
+class TokenBucket:
+    """A token bucket that computes when bytes may be sent.
+
+    Sending is never refused; instead the bucket may go into "debt" and the
+    time at which the debt is repaid is the time the bytes may be sent. This
+    means a chunk larger than the bucket is still released at the capped
+    rate.
+
+    Args:
+        rate (float): The rate (in bytes per second) tokens are added.
+        burst (int): The maximum number of tokens.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = None
+        self.lock = threading.Lock()
+
+    def reserve(self, size, now):
+        """Reserve tokens for some bytes.
+
+        Args:
+            size (int): The number of bytes to send.
+            now (float): The (monotonic) current time.
+
+        Returns:
+            float: The (monotonic) time at which the bytes may be sent.
+        """
+        with self.lock:
+            if self.updated_at is not None:
+                elapsed = now - self.updated_at
+                self.tokens = min(
+                    self.burst, self.tokens + elapsed * self.rate
+                )
+            self.updated_at = now
+            self.tokens -= size
+            if self.tokens >= 0:
+                return now
+            return now - self.tokens / self.rate
+
+
+class Scheduler:
+    """Call functions at (monotonic) times, from a single thread."""
+
+    def __init__(self):
+        self.heap = []
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def call_at(self, when, function, *args):
+        """Schedule a function call.
+
+        Args:
+            when (float): The (monotonic) time to call ``function``.
+            function (Callable[..., None]): The function to call.
+            args (Tuple[Any, ...]): The arguments for ``function``.
+        """
+        with self.condition:
+            # NOTE: The counter breaks ties, so calls scheduled for the same
+            #       time are made in the order they were scheduled (and the
+            #       functions are never compared).
+            count = next(self.counter)
+            heapq.heappush(self.heap, (when, count, function, args))
+            if self.heap[0][1] == count:
+                self.condition.notify()
+
+    def run_due(self, now):
+        """Make every call that is due.
+
+        Args:
+            now (float): The (monotonic) current time.
+        """
+        while True:
+            with self.condition:
+                if not self.heap or self.heap[0][0] > now:
+                    return
+                _, _, function, args = heapq.heappop(self.heap)
+            function(*args)
+
+    def _run(self):
+        """Make calls as they become due (forever)."""
+        while True:
+            with self.condition:
+                now = time.monotonic()
+                while not self.heap or self.heap[0][0] > now:
+                    timeout = None
+                    if self.heap:
+                        timeout = self.heap[0][0] - now
+                    self.condition.wait(timeout)
+                    now = time.monotonic()
+            self.run_due(now)
+
+    def start(self):
+        """Start making calls (in a daemon thread)."""
+        self.thread = threading.Thread(
+            target=self._run, name="tcp-h2-describe-shaper", daemon=True
+        )
+        self.thread.start()
+
+
+def get_scheduler():
+    """Get the (global) scheduler, starting it if needed.
+
+    Returns:
+        Scheduler: The scheduler.
+    """
+    global SCHEDULER
+
+    with SCHEDULER_LOCK:
+        if SCHEDULER is None:
+            SCHEDULER = Scheduler()
+            SCHEDULER.start()
+        return SCHEDULER
+
+
+class Shaper:
+    """Delay the TCP chunks forwarded in one direction of a connection.
+
+    Args:
+        shaping (Shaping): The link conditions to simulate.
+        buckets (Iterable[Optional[TokenBucket]]): The token buckets that
+            limit this direction (e.g. one for the direction and one shared
+            by the connection).
+        scheduler (Optional[Scheduler]): The scheduler that releases the
+            (delayed) chunks. Defaults to the global scheduler.
+    """
+
+    def __init__(self, shaping, buckets, scheduler=None):
+        if scheduler is None:
+            scheduler = get_scheduler()
+
+        self.latency = shaping.latency
+        self.jitter = shaping.jitter
+        self.random = random.Random(shaping.seed)
+        self.buckets = [bucket for bucket in buckets if bucket is not None]
+        self.scheduler = scheduler
+        self.release_at = 0.0
+        # NOTE: ``queued`` is the number of bytes scheduled but not yet
+        #       forwarded; the RECV thread waits (on ``condition``) for it to
+        #       drop below ``MAX_QUEUED``. Chunks that are due (but not yet
+        #       forwarded) are held in ``ready`` for the sender thread.
+        self.queued = 0
+        self.ready = collections.deque()
+        self.condition = threading.Condition()
+        self.error = None
+        self.closed = False
+        self.thread = None
+
+    def delay(self):
+        """Choose the latency for a chunk.
+
+        Returns:
+            float: The latency, in seconds.
+        """
+        if self.jitter == 0.0:
+            return self.latency
+        jitter = self.random.uniform(-self.jitter, self.jitter)
+        return max(0.0, self.latency + jitter)
+
+    def schedule(self, peer, tcp_chunk, at_frame_boundary):
+        """Schedule a TCP chunk to be forwarded.
+
+        Waits if too many bytes are already queued for this direction.
+
+        Args:
+            peer (.PeerState): The peer that sent the chunk.
+            tcp_chunk (bytes): The chunk to forward.
+            at_frame_boundary (bool): Indicates if the chunk ends on a frame
+                boundary.
+
+        Raises:
+            Exception: If forwarding an earlier chunk failed (e.g. an
+                :exc:`OSError` from the socket or an error from a tracker).
+        """
+        size = len(tcp_chunk)
+        with self.condition:
+            self.condition.wait_for(
+                lambda: self.error is not None or self.queued < MAX_QUEUED
+            )
+            if self.error is not None:
+                raise self.error
+            self.queued += size
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self._run,
+                    name="tcp-h2-describe-shaper-send",
+                    daemon=True,
+                )
+                self.thread.start()
+
+        now = time.monotonic()
+        release_at = now
+        for bucket in self.buckets:
+            release_at = max(release_at, bucket.reserve(size, now))
+        # NOTE: Chunks are never reordered, even if the jitter would do so.
+        release_at = max(release_at + self.delay(), self.release_at)
+        self.release_at = release_at
+        self.scheduler.call_at(
+            release_at, self._release, peer, tcp_chunk, at_frame_boundary
+        )
+
+    def _release(self, peer, tcp_chunk, at_frame_boundary):
+        """Hand a chunk that is due to the sender thread.
+
+        This is called from the scheduler thread, so it must not block.
+
+        Args:
+            peer (.PeerState): The peer that sent the chunk.
+            tcp_chunk (bytes): The chunk to forward.
+            at_frame_boundary (bool): Indicates if the chunk ends on a frame
+                boundary.
+        """
+        with self.condition:
+            self.ready.append((peer, tcp_chunk, at_frame_boundary))
+            self.condition.notify_all()
+
+    def _run(self):
+        """Forward chunks as they become due (until closed and drained)."""
+        while True:
+            with self.condition:
+                self.condition.wait_for(
+                    lambda: self.ready or (self.closed and self.queued == 0)
+                )
+                if not self.ready:
+                    return
+                peer, tcp_chunk, at_frame_boundary = self.ready.popleft()
+            self._forward(peer, tcp_chunk, at_frame_boundary)
+
+    def _forward(self, peer, tcp_chunk, at_frame_boundary):
+        """Forward a chunk (from the sender thread).
+
+        Args:
+            peer (.PeerState): The peer that sent the chunk.
+            tcp_chunk (bytes): The chunk to forward.
+            at_frame_boundary (bool): Indicates if the chunk ends on a frame
+                boundary.
+        """
+        try:
+            if self.error is None:
+                peer.forward(tcp_chunk, at_frame_boundary)
+        except Exception as exc:
+            # NOTE: The error is raised in the RECV thread (on the next
+            #       chunk), so that the sender thread keeps draining the
+            #       chunks that are already scheduled. This includes errors
+            #       from trackers (i.e. ``on_forwarded()``).
+            self.error = exc
+        finally:
+            with self.condition:
+                self.queued -= len(tcp_chunk)
+                self.condition.notify_all()
+
+    def flush(self):
+        """Wait until every scheduled chunk has been forwarded."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.queued == 0)
+
+    def close(self):
+        """Stop the sender thread once every scheduled chunk is forwarded.
+
+        This does not wait; use :meth:`flush` to wait for the chunks.
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
@@ -0,0 +1,1135 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import threading
+import time
+
+import tcp_h2_describe._buffer
+import tcp_h2_describe._capture
+import tcp_h2_describe._concurrency
+import tcp_h2_describe._decompress
+import tcp_h2_describe._describe
+import tcp_h2_describe._export
+import tcp_h2_describe._flight
+import tcp_h2_describe._flow_control
+import tcp_h2_describe._hpack_stats
+import tcp_h2_describe._options
+import tcp_h2_describe._ping
+import tcp_h2_describe._shape
+import tcp_h2_describe._trigger
+
+
+DATA = 0x0
+HEADERS = 0x1
+RST_STREAM = 0x3
+SETTINGS = 0x4
+PUSH_PROMISE = 0x5
+CONTINUATION = 0x9
+FLAG_END_STREAM = 0x1
+FLAG_ACK = 0x1
+FLAG_END_HEADERS = 0x4
+# See: https://http2.github.io/http2-spec/#SettingValues
+SETTINGS_HEADER_TABLE_SIZE = 0x1
+SETTINGS_ENABLE_PUSH = 0x2
+SETTINGS_MAX_CONCURRENT_STREAMS = 0x3
+SETTINGS_INITIAL_WINDOW_SIZE = 0x4
+SETTINGS_MAX_FRAME_SIZE = 0x5
+SETTINGS_MAX_HEADER_LIST_SIZE = 0x6
+# NOTE: A value of ``None`` indicates the setting is unlimited.
+DEFAULT_SETTINGS = {
+    SETTINGS_HEADER_TABLE_SIZE: 4096,
+    SETTINGS_ENABLE_PUSH: 1,
+    SETTINGS_MAX_CONCURRENT_STREAMS: None,
+    SETTINGS_INITIAL_WINDOW_SIZE: 65535,
+    SETTINGS_MAX_FRAME_SIZE: 16384,
+    SETTINGS_MAX_HEADER_LIST_SIZE: None,
+}
+# NOTE: Each RECV is sized to hold ``READ_FRAMES`` full-size frames (based on
+#       the negotiated ``SETTINGS_MAX_FRAME_SIZE``), but never more than
+#       ``MAX_READ_SIZE`` bytes.
+READ_FRAMES = 4
+MAX_READ_SIZE = 0x100000
+# NOTE: If a peer does not limit the header list size, the proxy still bounds
+#       the size of a (decoded) header list and of a header block being
+#       reassembled across CONTINUATION frames.
+DEFAULT_MAX_HEADER_LIST_SIZE = 0x10000
+FRAME_HEADER_SIZE = 9
+# NOTE: The most recently ended streams are kept (e.g. for frames sent after
+#       a stream ends, such as WINDOW_UPDATE); older ones are only counted
+#       in the per-connection totals, so memory use does not grow with the
+#       number of streams on a long-lived connection.
+MAX_ENDED_STREAMS = 256
+MAX_STREAM_LINES = 20
+FrameContext = collections.namedtuple(
+    "FrameContext", ["peer", "stream", "headers"]
+)
+FrameContext.__doc__ = """Context passed to a context-aware payload handler.
+
+Args:
+    peer (PeerState): The peer that sent the frame.
+    stream (Optional[StreamState]): The state for the frame's stream (or
+        :data:`None` for stream 0 or a stream that ended long ago).
+    headers (Optional[List[Tuple[str, str]]]): The decoded headers, if the
+        frame completes a header block.
+"""
+# NOTE: Frames carrying a header block (fragment) are counted in the
+#       "header bytes" for a stream.
+HEADER_BLOCK_TYPES = frozenset([HEADERS, PUSH_PROMISE, CONTINUATION])
+# NOTE: This is mutated by ``ConnectionState.open()`` / ``close()``, which
+#       hold ``ACTIVE_LOCK`` while doing so.
+ACTIVE_CONNECTIONS = set()
+ACTIVE_LOCK = threading.Lock()
+
+
+class StreamState:
+    """State for a single HTTP/2 stream within a proxied connection.
+
+    Args:
+        stream_id (int): The stream identifier.
+    """
+
+    __slots__ = (
+        "stream_id",
+        "client_frames",
+        "server_frames",
+        "client_header_bytes",
+        "server_header_bytes",
+        "client_data_bytes",
+        "server_data_bytes",
+        "started_at",
+        "response_headers_at",
+        "response_data_at",
+        "ended_at",
+        "client_ended",
+        "server_ended",
+        "reset",
+        "stall_time",
+        "request_headers",
+        "response_headers",
+        "client_decompressor",
+        "server_decompressor",
+        "handler_state",
+    )
+
+    def __init__(self, stream_id):
+        self.stream_id = stream_id
+        self.client_frames = 0
+        self.server_frames = 0
+        self.client_header_bytes = 0
+        self.server_header_bytes = 0
+        # NOTE: These count the (flow-controlled) DATA frame payload length,
+        #       i.e. they include padding.
+        self.client_data_bytes = 0
+        self.server_data_bytes = 0
+        # NOTE: The timestamps (from ``time.monotonic()``) are the time the
+        #       TCP chunk containing the relevant frame was RECV-ed.
+        self.started_at = None
+        self.response_headers_at = None
+        self.response_data_at = None
+        self.ended_at = None
+        self.client_ended = False
+        self.server_ended = False
+        self.reset = False
+        # NOTE: The time the flow-control windows for this stream spent
+        #       stalled, added as each sender finishes with the stream (only
+        #       tracked with ``flow_control``).
+        self.stall_time = 0.0
+        # NOTE: These are the (decoded) first header block sent by each peer
+        #       on this stream; they are only set when header blocks are
+        #       decoded (i.e. ``ConnectionState.decode_headers``).
+        self.request_headers = None
+        self.response_headers = None
+        # NOTE: These are set (from the ``content-encoding`` header) if the
+        #       request / response body is compressed.
+        self.client_decompressor = None
+        self.server_decompressor = None
+        # NOTE: This is reserved for context-aware payload handlers, e.g. to
+        #       cache a per-stream lookup.
+        self.handler_state = None
+
+    def header_value(self, name, request=True):
+        """Get the value of a header sent on this stream.
+
+        Args:
+            name (str): The header name, e.g. ``:path``.
+            request (Optional[bool]): Indicates if the request headers (as
+                opposed to the response headers) should be searched.
+
+        Returns:
+            Optional[str]: The (first) value of the header, if it was sent.
+        """
+        headers = self.request_headers if request else self.response_headers
+        if headers is None:
+            return None
+
+        for key, value in headers:
+            if key == name:
+                return value
+        return None
+
+    def update_lifecycle(self, is_client, type_byte, flags, now):
+        """Advance the lifecycle of this stream after a frame.
+
+        .. stream states: https://http2.github.io/http2-spec/#StreamStates
+
+        This is a simplified version of the `stream states`_ that only tracks
+        the events needed for timing a request / response.
+
+        Args:
+            is_client (bool): Indicates if the frame was sent by the client.
+            type_byte (int): The frame type.
+            flags (int): The flags for the frame.
+            now (float): The time the frame was RECV-ed.
+
+        Returns:
+            bool: Indicates if the stream ended due to this frame.
+        """
+        if self.ended_at is not None:
+            return False
+
+        if type_byte == RST_STREAM:
+            self.reset = True
+            self.ended_at = now
+            return True
+
+        if type_byte != DATA and type_byte != HEADERS:
+            return False
+
+        if self.started_at is None:
+            self.started_at = now
+
+        if is_client:
+            if flags & FLAG_END_STREAM:
+                self.client_ended = True
+        else:
+            if type_byte == HEADERS:
+                if self.response_headers_at is None:
+                    self.response_headers_at = now
+            elif self.response_data_at is None:
+                self.response_data_at = now
+            if flags & FLAG_END_STREAM:
+                self.server_ended = True
+
+        if self.client_ended and self.server_ended:
+            self.ended_at = now
+            return True
+
+        return False
+
+
+class StreamTotals:
+    """Totals for a group of streams (e.g. those that ended long ago)."""
+
+    def __init__(self):
+        self.count = 0
+        self.client_data_bytes = 0
+        self.server_data_bytes = 0
+        self.client_header_bytes = 0
+        self.server_header_bytes = 0
+        self.max_client_header_bytes = 0
+        self.max_server_header_bytes = 0
+
+    def add(self, stream):
+        """Add a stream to the totals.
+
+        Args:
+            stream (StreamState): The stream to add.
+        """
+        self.count += 1
+        self.client_data_bytes += stream.client_data_bytes
+        self.server_data_bytes += stream.server_data_bytes
+        self.client_header_bytes += stream.client_header_bytes
+        self.server_header_bytes += stream.server_header_bytes
+        self.max_client_header_bytes = max(
+            self.max_client_header_bytes, stream.client_header_bytes
+        )
+        self.max_server_header_bytes = max(
+            self.max_server_header_bytes, stream.server_header_bytes
+        )
+
+    def copy(self):
+        """Copy the totals.
+
+        Returns:
+            StreamTotals: A copy of these totals.
+        """
+        totals = StreamTotals()
+        totals.__dict__.update(self.__dict__)
+        return totals
+
+
+class PeerState:
+    """State for one direction (i.e. one RECV->SEND pair) of a connection.
+
+    Args:
+        connection (ConnectionState): The connection this peer belongs to.
+        is_client (bool): Indicates if this peer is the client.
+        description (str): A description of the RECV->SEND relationship for
+            this peer.
+    """
+
+    def __init__(self, connection, is_client, description):
+        self.connection = connection
+        self.is_client = is_client
+        self.description = description
+        # NOTE: These are indexed by the frame type byte.
+        self.frame_counts = [0] * 256
+        self.frame_bytes = [0] * 256
+        # NOTE: This is expected to be updated (by the thread that RECVs for
+        #       this peer) each time a TCP chunk is RECV-ed.
+        self.received_at = connection.opened_at
+        self.reports = []
+        # NOTE: ``settings`` holds the values this peer has advertised that
+        #       have been acknowledged by the other peer; ``pending_settings``
+        #       holds those that have been sent but not yet acknowledged.
+        self.settings = dict(DEFAULT_SETTINGS)
+        self.pending_settings = collections.deque()
+        # NOTE: ``send_socket`` is set by the thread that RECVs for this
+        #       peer. ``send_lock`` allows frames (e.g. PINGs) to be
+        #       injected from other threads between forwarded TCP chunks.
+        self.send_socket = None
+        self.send_lock = threading.Lock()
+        self.forwarded_chunks = 0
+        # NOTE: ``shaper`` is set by the ``ConnectionState`` if shaping is
+        #       enabled.
+        self.shaper = None
+        self.suppressed = []
+        # NOTE: ``partial`` holds the bytes of a frame that was split across
+        #       TCP chunks (until the rest of the frame is RECV-ed).
+        self.partial = b""
+        self.at_frame_boundary = True
+        # NOTE: HPACK is stateful, so the header blocks sent by each peer are
+        #       decoded by a dedicated decoder (as the other peer would). It
+        #       is created by ``get_hpack_decoder()`` when first needed.
+        self.hpack_decoder = None
+        self.header_block = []
+        self.header_block_size = 0
+        self.header_block_promised = False
+        self.current_stream = None
+        self.current_headers = None
+        self.current_header_block = None
+        # NOTE: The flight recorder is only written by the thread that RECVs
+        #       for this peer.
+        self.flight = None
+        flight_recorder = connection.options.flight_recorder
+        triggers = connection.options.triggers
+        if flight_recorder is None and triggers is not None:
+            # NOTE: The flight recorder is the pre-trigger buffer.
+            flight_recorder = tcp_h2_describe._flight.DEFAULT_SIZE
+        if flight_recorder is not None:
+            self.flight = tcp_h2_describe._flight.FrameRing(flight_recorder)
+        # NOTE: The exported rows for this peer are buffered here until a
+        #       batch is written.
+        self.export = None
+        if connection.options.export_dir is not None:
+            self.export = tcp_h2_describe._export.FrameColumns()
+
+    def max_frame_size(self):
+        """Get the largest frame this peer is allowed to send.
+
+        .. max frame size spec: https://http2.github.io/http2-spec/#SETTINGS_MAX_FRAME_SIZE
+
+        This is the ``SETTINGS_MAX_FRAME_SIZE`` advertised by the **other**
+        peer, including values that have not been acknowledged yet (this
+        peer may acknowledge them and send a large frame in the same TCP
+        chunk). See `max frame size spec`_.
+
+        Returns:
+            int: The maximum frame payload size.
+        """
+        other = self.connection.other(self)
+        max_frame_size = other.settings[SETTINGS_MAX_FRAME_SIZE]
+        for settings in other.pending_settings:
+            for setting_id, setting_value in settings:
+                if setting_id == SETTINGS_MAX_FRAME_SIZE:
+                    max_frame_size = max(max_frame_size, setting_value)
+        return max_frame_size
+
+    def buffer_size(self):
+        """Get the size of the next RECV for this peer.
+
+        Returns:
+            int: The buffer size, large enough for a few full-size frames.
+        """
+        frame_size = FRAME_HEADER_SIZE + self.max_frame_size()
+        return min(MAX_READ_SIZE, READ_FRAMES * frame_size)
+
+    def max_header_list_size(self):
+        """Get the header list size limit for header blocks from this peer.
+
+        Returns:
+            int: The ``SETTINGS_MAX_HEADER_LIST_SIZE`` advertised (and
+            acknowledged) by the other peer, or a default if the other peer
+            did not set one.
+        """
+        other = self.connection.other(self)
+        max_header_list_size = other.settings[SETTINGS_MAX_HEADER_LIST_SIZE]
+        if max_header_list_size is None:
+            return DEFAULT_MAX_HEADER_LIST_SIZE
+        return max_header_list_size
+
+    def feed(self, tcp_chunk, expect_preface=False):
+        """Reassemble HTTP/2 frames that are split across TCP chunks.
+
+        Any bytes at the end of ``tcp_chunk`` that do not form a complete
+        frame are held back until the next call.
+
+        Args:
+            tcp_chunk (bytes): The chunk that was RECV-ed from this peer.
+            expect_preface (Optional[bool]): Indicates if the chunk should
+                begin with the client connection preface.
+
+        Returns:
+            Union[bytes, memoryview]: The complete frames (possibly including
+            frames started in a previous chunk). This is ``tcp_chunk`` itself
+            in the common case where no frame is split.
+
+        Raises:
+            ValueError: If an incomplete frame is larger than this peer is
+                allowed to send, i.e. it would never be reassembled.
+        """
+        h2_frames = tcp_chunk
+        if self.partial:
+            h2_frames = self.partial + tcp_chunk
+
+        offset = 0
+        if (
+            expect_preface
+            and h2_frames[: len(tcp_h2_describe._describe.PREFACE)]
+            == tcp_h2_describe._describe.PREFACE
+        ):
+            offset = len(tcp_h2_describe._describe.PREFACE)
+
+        end = len(h2_frames)
+        while end - offset >= FRAME_HEADER_SIZE:
+            frame_end = (
+                offset
+                + FRAME_HEADER_SIZE
+                + (
+                    (h2_frames[offset] << 16)
+                    | (h2_frames[offset + 1] << 8)
+                    | h2_frames[offset + 2]
+                )
+            )
+            if frame_end > end:
+                break
+            offset = frame_end
+
+        if offset == end:
+            self.partial = b""
+            return h2_frames
+
+        self.partial = h2_frames[offset:]
+        if len(self.partial) >= FRAME_HEADER_SIZE:
+            frame_length = (
+                (self.partial[0] << 16)
+                | (self.partial[1] << 8)
+                | self.partial[2]
+            )
+            if frame_length > self.max_frame_size():
+                raise ValueError(
+                    "Frame exceeds SETTINGS_MAX_FRAME_SIZE",
+                    frame_length,
+                    self.max_frame_size(),
+                )
+
+        return memoryview(h2_frames)[:offset]
+
+    def on_header_block(self, type_byte, flags, frame_payload):
+        """Reassemble and decode a header block sent by this peer.
+
+        .. header block spec: https://http2.github.io/http2-spec/#HeaderBlock
+
+        A header block is a HEADERS or PUSH_PROMISE frame followed by zero or
+        more CONTINUATION frames; the last frame has ``END_HEADERS`` set.
+        See `header block spec`_.
+
+        Args:
+            type_byte (int): The frame type.
+            flags (int): The flags for the frame.
+            frame_payload (memoryview): The frame payload.
+
+        Returns:
+            Optional[List[Tuple[str, str]]]: The decoded headers, if this
+            frame completes a header block. In that case, the (encoded)
+            header block is also stored as ``current_header_block``.
+
+        Raises:
+            ValueError: If the header block is larger than the header list
+                size limit for this peer.
+        """
+        fragment = tcp_h2_describe._describe.header_block_fragment(
+            type_byte, flags, frame_payload
+        )
+        if type_byte != CONTINUATION:
+            self.header_block = []
+            self.header_block_size = 0
+            self.header_block_promised = type_byte == PUSH_PROMISE
+
+        # NOTE: An encoded header block is (in practice) never larger than
+        #       the header list it decodes to, so the header list size limit
+        #       also bounds the bytes held during reassembly.
+        self.header_block_size += len(fragment)
+        if self.header_block_size > self.max_header_list_size():
+            self.header_block = []
+            self.header_block_size = 0
+            raise ValueError(
+                "Header block exceeds SETTINGS_MAX_HEADER_LIST_SIZE",
+                self.max_header_list_size(),
+            )
+
+        if flags & FLAG_END_HEADERS == 0:
+            self.header_block.append(bytes(fragment))
+            return None
+
+        if self.header_block:
+            self.header_block.append(bytes(fragment))
+            fragment = b"".join(self.header_block)
+            self.header_block = []
+        self.header_block_size = 0
+        self.current_header_block = bytes(fragment)
+        return self.get_hpack_decoder().decode(self.current_header_block)
+
+    def _configure_hpack_decoder(self):
+        """Apply the (acknowledged) settings of the other peer to HPACK."""
+        other = self.connection.other(self)
+        self.hpack_decoder.max_allowed_table_size = other.settings[
+            SETTINGS_HEADER_TABLE_SIZE
+        ]
+        self.hpack_decoder.max_header_list_size = self.max_header_list_size()
+
+    def get_hpack_decoder(self):
+        """Get the HPACK decoder for header blocks sent by this peer.
+
+        The decoder (and the ``hpack`` module) is only loaded when the first
+        header block is decoded, e.g. it is never needed for connections
+        that are only summarized.
+
+        Returns:
+            hpack.Decoder: The decoder.
+        """
+        if self.hpack_decoder is None:
+            import hpack
+
+            self.hpack_decoder = hpack.Decoder()
+            self._configure_hpack_decoder()
+        return self.hpack_decoder
+
+    def frame_context(self):
+        """Get the context for the frame most recently sent by this peer.
+
+        Returns:
+            FrameContext: The context for the frame.
+        """
+        return FrameContext(self, self.current_stream, self.current_headers)
+
+    def on_frame(self, type_byte, flags, stream_id, frame_payload):
+        """Update the counters (and trackers) for a frame sent by this peer.
+
+        Args:
+            type_byte (int): The frame type.
+            flags (int): The flags for the frame.
+            stream_id (int): The stream identifier (with the reserved bit
+                removed).
+            frame_payload (memoryview): The frame payload. This is a view
+                into the TCP chunk, so should not be retained.
+        """
+        frame_length = len(frame_payload)
+        flight = self.flight
+        if flight is not None:
+            flight.record(
+                self.received_at, type_byte, flags, stream_id, frame_payload
+            )
+            # NOTE: With triggers, the ``TriggerTracker`` decides which
+            #       frames cause the flight recorder to be displayed.
+            if (
+                type_byte in tcp_h2_describe._flight.DUMP_TYPES
+                and self.connection.trigger is None
+            ):
+                self.reports.append(self.describe_flight(type_byte))
+        if self.export is not None:
+            self.connection.exporter.record(
+                self, type_byte, flags, stream_id, frame_payload
+            )
+        self.frame_counts[type_byte] += 1
+        self.frame_bytes[type_byte] += frame_length
+        self.current_stream = None
+        self.current_headers = None
+        self.current_header_block = None
+        if type_byte == SETTINGS:
+            self.on_settings_frame(flags, frame_payload)
+        elif (
+            type_byte in HEADER_BLOCK_TYPES
+            and self.connection.decode_headers
+        ):
+            self.current_headers = self.on_header_block(
+                type_byte, flags, frame_payload
+            )
+
+        trackers = self.connection.trackers
+        if trackers:
+            with self.connection.tracker_lock:
+                for tracker in trackers:
+                    tracker.on_frame(
+                        self, type_byte, flags, stream_id, frame_payload
+                    )
+
+        if stream_id == 0:
+            return
+
+        stream = self.connection.get_stream(stream_id)
+        if stream is None:
+            return
+
+        self.current_stream = stream
+        headers = self.current_headers
+        if headers is not None and not self.header_block_promised:
+            if self.is_client:
+                if stream.request_headers is None:
+                    stream.request_headers = headers
+                    stream.client_decompressor = (
+                        tcp_h2_describe._decompress.make_decompressor(
+                            stream.header_value("content-encoding")
+                        )
+                    )
+            elif stream.response_headers is None:
+                stream.response_headers = headers
+                stream.server_decompressor = (
+                    tcp_h2_describe._decompress.make_decompressor(
+                        stream.header_value("content-encoding", request=False)
+                    )
+                )
+        if self.is_client:
+            stream.client_frames += 1
+            if type_byte == DATA:
+                stream.client_data_bytes += frame_length
+            elif type_byte in HEADER_BLOCK_TYPES:
+                stream.client_header_bytes += frame_length
+        else:
+            stream.server_frames += 1
+            if type_byte == DATA:
+                stream.server_data_bytes += frame_length
+            elif type_byte in HEADER_BLOCK_TYPES:
+                stream.server_header_bytes += frame_length
+
+        started = stream.started_at is not None
+        ended = stream.update_lifecycle(
+            self.is_client, type_byte, flags, self.received_at
+        )
+        if not started and stream.started_at is not None:
+            self.connection.start_stream(stream)
+        if not ended:
+            return
+
+        if trackers:
+            with self.connection.tracker_lock:
+                for tracker in trackers:
+                    tracker.on_stream_end(stream)
+        self.connection.end_stream(stream)
+        if self.connection.options.stream_timing:
+            self.reports.append(self.connection.describe_timing(stream))
+
+    def describe_flight(self, type_byte):
+        """Describe the flight recorder after this peer sent an error frame.
+
+        Args:
+            type_byte (int): The type of the (GOAWAY or RST_STREAM) frame.
+
+        Returns:
+            str: The description of the flight recorder for the connection.
+        """
+        name = tcp_h2_describe._describe.FRAME_TYPE_NAMES[type_byte]
+        sender = "client" if self.is_client else "server"
+        return self.connection.describe_flight(f"{name} from {sender}")
+
+    def on_settings_frame(self, flags, frame_payload):
+        """Track the settings advertised and acknowledged by each peer.
+
+        .. SETTINGS synchronization: https://http2.github.io/http2-spec/#SettingsSync
+
+        Settings only take effect once acknowledged, so a SETTINGS frame
+        from this peer is held as pending until an ACK is received from the
+        other peer. See `SETTINGS synchronization`_.
+
+        Args:
+            flags (int): The flags for the SETTINGS frame.
+            frame_payload (memoryview): The SETTINGS frame payload.
+        """
+        if flags & FLAG_ACK == 0:
+            self.pending_settings.append(
+                tcp_h2_describe._describe.parse_settings(frame_payload)
+            )
+            return
+
+        other = self.connection.other(self)
+        if not other.pending_settings:
+            return
+
+        settings = other.pending_settings.popleft()
+        other.settings.update(settings)
+        # NOTE: The settings advertised by ``other`` limit the header blocks
+        #       sent by this peer.
+        if self.hpack_decoder is not None:
+            self._configure_hpack_decoder()
+        with self.connection.tracker_lock:
+            for tracker in self.connection.trackers:
+                tracker.on_settings(other, settings)
+
+    def send(self, tcp_chunk):
+        """Forward a TCP chunk (RECV-ed from this peer) to the other peer.
+
+        Any frames that should be suppressed (e.g. ACKs for PINGs injected by
+        the proxy) are removed before the chunk is forwarded. With shaping,
+        the chunk is forwarded later (from the shaper's sender thread).
+
+        Args:
+            tcp_chunk (bytes): The chunk to forward.
+        """
+        if self.suppressed:
+            tcp_chunk = self.remove_suppressed(tcp_chunk)
+
+        if self.shaper is None:
+            self.forward(tcp_chunk, not self.partial)
+        else:
+            self.shaper.schedule(self, tcp_chunk, not self.partial)
+
+    def forward(self, tcp_chunk, at_frame_boundary):
+        """Send a TCP chunk (RECV-ed from this peer) to the other peer.
+
+        Args:
+            tcp_chunk (bytes): The chunk to forward (may be empty, if every
+                frame in it was suppressed).
+            at_frame_boundary (bool): Indicates if the chunk ends on a frame
+                boundary.
+        """
+        if self.connection.trackers:
+            # NOTE: The trackers are updated **before** the chunk is sent,
+            #       since the reply from the other peer (e.g. the ACK for a
+            #       PING) may be RECV-ed before the SEND returns.
+            now = time.monotonic()
+            with self.connection.tracker_lock:
+                for tracker in self.connection.trackers:
+                    tracker.on_forwarded(self, now)
+
+        if tcp_chunk:
+            with self.send_lock:
+                tcp_h2_describe._buffer.send(self.send_socket, tcp_chunk)
+                self.forwarded_chunks += 1
+                self.at_frame_boundary = at_frame_boundary
+
+    def inject(self, frame):
+        """Send a frame (originating from the proxy) to the other peer.
+
+        The frame is only sent if the most recently forwarded TCP chunk ended
+        on a frame boundary (otherwise it would corrupt the frame that is
+        in flight).
+
+        Args:
+            frame (bytes): The frame to send.
+
+        Returns:
+            bool: Indicates if the frame was sent.
+        """
+        with self.send_lock:
+            if not self.at_frame_boundary:
+                return False
+            tcp_h2_describe._buffer.send(self.send_socket, frame)
+            return True
+
+    def suppress(self, frame):
+        """Mark a frame (from this peer) that should not be forwarded.
+
+        Args:
+            frame (bytes): The exact bytes of the frame to drop.
+        """
+        with self.connection.lock:
+            self.suppressed.append(frame)
+
+    def unsuppress(self, frame):
+        """Stop suppressing a frame (e.g. if it is no longer expected).
+
+        Args:
+            frame (bytes): The exact bytes of the frame.
+        """
+        with self.connection.lock:
+            if frame in self.suppressed:
+                self.suppressed.remove(frame)
+
+    def remove_suppressed(self, tcp_chunk):
+        """Remove suppressed frames from a TCP chunk.
+
+        .. note::
+
+            A suppressed frame that is split across two TCP chunks will not
+            be found, so will be forwarded. (HTTP/2 peers ignore a PING ACK
+            with unknown opaque data.)
+
+        Args:
+            tcp_chunk (bytes): The chunk RECV-ed from this peer.
+
+        Returns:
+            bytes: The chunk with (any) suppressed frames removed.
+        """
+        with self.connection.lock:
+            remaining = []
+            for frame in self.suppressed:
+                if frame in tcp_chunk:
+                    tcp_chunk = tcp_chunk.replace(frame, b"", 1)
+                else:
+                    remaining.append(frame)
+            self.suppressed = remaining
+
+        return tcp_chunk
+
+    def pop_reports(self):
+        """Remove and return the reports generated by recent frames.
+
+        Returns:
+            List[str]: The reports (e.g. stream timing) accumulated since the
+            last call.
+        """
+        reports = self.reports
+        self.reports = []
+        return reports
+
+
+class ConnectionState:
+    """State shared by both directions of a proxied connection.
+
+    Args:
+        client_description (str): A description of the client->server
+            RECV->SEND relationship.
+        server_description (str): A description of the server->client
+            RECV->SEND relationship.
+        options (Optional[.ProxyOptions]): The options for the proxy.
+    """
+
+    def __init__(self, client_description, server_description, options=None):
+        if options is None:
+            options = tcp_h2_describe._options.ProxyOptions()
+
+        self.options = options
+        self.opened_at = time.monotonic()
+        self.client = PeerState(self, True, client_description)
+        self.server = PeerState(self, False, server_description)
+        # NOTE: ``streams`` holds the streams that have not ended. Ended
+        #       streams move to ``ended_streams`` (oldest first) and, once
+        #       more than ``MAX_ENDED_STREAMS`` have ended, the oldest are
+        #       combined into ``stream_totals``.
+        self.streams = {}
+        self.ended_streams = collections.OrderedDict()
+        self.stream_totals = StreamTotals()
+        # NOTE: The largest stream ID started by the client (odd) and the
+        #       server (even). Stream IDs are never reused, so an unknown
+        #       stream ID at or below these has ended (or was skipped).
+        self.last_stream_ids = [0, 0]
+        # NOTE: Header blocks are only decoded if they will be described
+        #       (or their compression is tracked).
+        self.decode_headers = (
+            options.summary_interval is None or options.hpack_stats
+        )
+        # NOTE: These locks are shared by the two threads that RECV from the
+        #       client and server sockets.
+        self.lock = threading.Lock()
+        self.tracker_lock = threading.Lock()
+        self.trackers = []
+        if options.flow_control:
+            self.trackers.append(
+                tcp_h2_describe._flow_control.FlowControlTracker(self)
+            )
+        if options.ping_rtt:
+            self.trackers.append(tcp_h2_describe._ping.PingTracker(self))
+        if options.hpack_stats:
+            self.trackers.append(
+                tcp_h2_describe._hpack_stats.HpackTracker(self)
+            )
+        if options.stream_concurrency:
+            self.trackers.append(
+                tcp_h2_describe._concurrency.ConcurrencyTracker(self)
+            )
+        shaping = options.shaping
+        if shaping is not None:
+            connection_bucket = shaping.make_bucket(shaping.connection_rate)
+            self.client.shaper = tcp_h2_describe._shape.Shaper(
+                shaping,
+                [shaping.make_bucket(shaping.client_rate), connection_bucket],
+            )
+            self.server.shaper = tcp_h2_describe._shape.Shaper(
+                shaping,
+                [shaping.make_bucket(shaping.server_rate), connection_bucket],
+            )
+        self.capture = None
+        if options.capture_dir is not None:
+            self.capture = tcp_h2_describe._capture.CaptureWriter(
+                tcp_h2_describe._capture.capture_path(options.capture_dir),
+                self.opened_at,
+            )
+        self.exporter = None
+        self.export_id = None
+        if options.export_dir is not None:
+            self.exporter = tcp_h2_describe._export.get_exporter(
+                options.export_dir
+            )
+            self.export_id = self.exporter.open_connection(client_description)
+        self.trigger = None
+        if options.triggers is not None:
+            self.trigger = tcp_h2_describe._trigger.TriggerTracker(self)
+            self.trackers.append(self.trigger)
+
+    def other(self, peer):
+        """Get the other peer in this connection.
+
+        Args:
+            peer (PeerState): Either the client or the server peer.
+
+        Returns:
+            PeerState: The server if ``peer`` is the client and vice versa.
+        """
+        if peer.is_client:
+            return self.server
+        return self.client
+
+    def open(self):
+        """Mark this connection as active."""
+        with ACTIVE_LOCK:
+            ACTIVE_CONNECTIONS.add(self)
+
+    def close(self):
+        """Mark this connection as no longer active.
+
+        This also finishes capturing and writes any exported rows that are
+        still buffered.
+        """
+        with ACTIVE_LOCK:
+            ACTIVE_CONNECTIONS.discard(self)
+        if self.capture is not None:
+            self.capture.close()
+        if self.exporter is not None:
+            self.exporter.write(self.client.export)
+            self.exporter.write(self.server.export)
+
+    def get_stream(self, stream_id):
+        """Get (or create) the state for a stream.
+
+        Args:
+            stream_id (int): The stream identifier.
+
+        Returns:
+            Optional[StreamState]: The state for the stream, or :data:`None`
+            if the stream ended and is no longer kept.
+        """
+        stream = self.streams.get(stream_id)
+        if stream is not None:
+            return stream
+
+        with self.lock:
+            stream = self.streams.get(stream_id)
+            if stream is not None:
+                return stream
+            stream = self.ended_streams.get(stream_id)
+            if stream is not None:
+                return stream
+            if stream_id <= self.last_stream_ids[stream_id & 1]:
+                return None
+            stream = StreamState(stream_id)
+            self.streams[stream_id] = stream
+            return stream
+
+    def find_stream(self, stream_id):
+        """Find the state for a stream (without creating it).
+
+        Args:
+            stream_id (int): The stream identifier.
+
+        Returns:
+            Optional[StreamState]: The state for the stream, if it is still
+            kept.
+        """
+        stream = self.streams.get(stream_id)
+        if stream is not None:
+            return stream
+
+        with self.lock:
+            return self.ended_streams.get(stream_id)
+
+    def start_stream(self, stream):
+        """Record that a stream has started (i.e. sent HEADERS or DATA).
+
+        Args:
+            stream (StreamState): The stream that started.
+        """
+        stream_id = stream.stream_id
+        with self.lock:
+            parity = stream_id & 1
+            if stream_id > self.last_stream_ids[parity]:
+                self.last_stream_ids[parity] = stream_id
+
+    def end_stream(self, stream):
+        """Move a stream that has ended out of the active streams.
+
+        Args:
+            stream (StreamState): The stream that ended.
+        """
+        with self.lock:
+            self.streams.pop(stream.stream_id, None)
+            self.ended_streams[stream.stream_id] = stream
+            if len(self.ended_streams) > MAX_ENDED_STREAMS:
+                _, evicted = self.ended_streams.popitem(last=False)
+                self.stream_totals.add(evicted)
+
+    def all_streams(self):
+        """Get the streams that are still kept and the totals for the rest.
+
+        Returns:
+            Tuple[List[StreamState], StreamTotals]: The streams that are
+            kept (ordered by stream ID) and the totals for the streams that
+            ended long ago.
+        """
+        with self.lock:
+            streams = list(self.ended_streams.values())
+            streams.extend(self.streams.values())
+            totals = self.stream_totals.copy()
+        streams.sort(key=lambda stream: stream.stream_id)
+        return streams, totals
+
+    def describe_timing(self, stream):
+        """Describe the request / response timing for a stream.
+
+        Args:
+            stream (StreamState): The stream to describe.
+
+        Returns:
+            str: The description of the stream timing. All times other than
+            the start are relative to the start of the stream.
+        """
+        started_at = stream.started_at
+        if started_at is None:
+            started_at = self.opened_at
+        status = "RST_STREAM" if stream.reset else "complete"
+        if stream.ended_at is None:
+            status = "incomplete"
+
+        return "\n".join(
+            [
+                f"Stream Timing ({self.client.description}) =",
+                f"   Stream {stream.stream_id} ({status}): "
+                f"start = {_format_ms(started_at, self.opened_at)}, "
+                "first header = "
+                f"{_format_ms(stream.response_headers_at, started_at)}, "
+                "first byte = "
+                f"{_format_ms(stream.response_data_at, started_at)}, "
+                f"duration = {_format_ms(stream.ended_at, started_at)}",
+                f"   C->S = {stream.client_header_bytes} header bytes, "
+                f"{stream.client_data_bytes} data bytes; "
+                f"S->C = {stream.server_header_bytes} header bytes, "
+                f"{stream.server_data_bytes} data bytes",
+            ]
+        )
+
+    def describe_incomplete(self):
+        """Describe the timing for streams that have not ended.
+
+        Returns:
+            List[str]: The timing description for each stream that was
+            started but has not ended.
+        """
+        with self.lock:
+            streams = sorted(self.streams.items())
+        return [
+            self.describe_timing(stream)
+            for _, stream in streams
+            if stream.started_at is not None and stream.ended_at is None
+        ]
+
+    def find_tracker(self, tracker_class):
+        """Find the tracker of a given type (if enabled).
+
+        Args:
+            tracker_class (type): The type of tracker.
+
+        Returns:
+            Optional[.Tracker]: The tracker, if one of type ``tracker_class``
+            is in use for this connection.
+        """
+        for tracker in self.trackers:
+            if isinstance(tracker, tracker_class):
+                return tracker
+        return None
+
+    def describe_flight(self, reason):
+        """Describe the flight recorder for this connection.
+
+        Args:
+            reason (str): The reason the flight recorder is being dumped.
+
+        Returns:
+            str: The description of the recent frames sent by both peers.
+        """
+        return tcp_h2_describe._flight.describe_flight(self, reason)
+
+    def describe_trackers(self):
+        """Describe the current state of each tracker.
+
+        Returns:
+            List[str]: The (non-empty) descriptions from each tracker.
+        """
+        with self.tracker_lock:
+            descriptions = [tracker.describe() for tracker in self.trackers]
+        return [description for description in descriptions if description]
+
+    def describe_streams(self):
+        """Describe the per-stream DATA totals for this connection.
+
+        Only the last ``MAX_STREAM_LINES`` streams are described on their
+        own; the rest are combined into a single line.
+
+        Returns:
+            str: The description of each stream (ordered by stream ID), or an
+            empty string if no streams were seen.
+        """
+        streams, earlier = self.all_streams()
+        if not streams and earlier.count == 0:
+            return ""
+
+        for stream in streams[:-MAX_STREAM_LINES]:
+            earlier.add(stream)
+        lines = [f"Stream Totals ({self.client.description}) ="]
+        if earlier.count:
+            lines.append(
+                f"   {earlier.count} earlier stream(s): "
+                f"client->server = {earlier.client_data_bytes} bytes, "
+                f"server->client = {earlier.server_data_bytes} bytes"
+            )
+        for stream in streams[-MAX_STREAM_LINES:]:
+            lines.append(
+                f"   Stream {stream.stream_id}: "
+                f"client->server = {stream.client_data_bytes} bytes, "
+                f"server->client = {stream.server_data_bytes} bytes"
+            )
+        return "\n".join(lines)
+
+
+def _format_ms(timestamp, start):
+    """Format the time elapsed since ``start`` in milliseconds.
+
+    Args:
+        timestamp (Optional[float]): The (monotonic) timestamp.
+        start (float): The (monotonic) start time.
+
+    Returns:
+        str: The elapsed time, or ``n/a`` if ``timestamp`` is not set.
+    """
+    if timestamp is None:
+        return "n/a"
+
+    return f"{1000.0 * (timestamp - start):.3f}ms"
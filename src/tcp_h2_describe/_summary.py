@@ -0,0 +1,131 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+
+import tcp_h2_describe._describe
+import tcp_h2_describe._display
+import tcp_h2_describe._state
+
+
+RST_STREAM = 0x3
+GOAWAY = 0x7
+ROW_TEMPLATE = "   {:<14}{:>10}{:>14}{:>10}{:>14}"
+
+
+def _type_name(type_byte):
+    """Get the name for a frame type byte.
+
+    Args:
+        type_byte (int): The frame type.
+
+    Returns:
+        str: The name of the frame type, or ``UNKNOWN(0x..)`` if the frame
+        type is not known.
+    """
+    frame_type = tcp_h2_describe._describe.FRAME_TYPE_NAMES[type_byte]
+    if frame_type is None:
+        return f"UNKNOWN({hex(type_byte)})"
+    return frame_type
+
+
+def describe_summary(connection):
+    """Describe the counters for a connection as a compact table.
+
+    Args:
+        connection (.ConnectionState): The connection to summarize.
+
+    Returns:
+        str: The summary, expected to be printed by the caller.
+    """
+    client = connection.client
+    server = connection.server
+    lines = [
+        tcp_h2_describe._describe.HEADER,
+        f"Summary: {client.description}",
+        "",
+        ROW_TEMPLATE.format(
+            "Frame Type", "C->S", "C->S Bytes", "S->C", "S->C Bytes"
+        ),
+    ]
+    for type_byte in range(256):
+        client_count = client.frame_counts[type_byte]
+        server_count = server.frame_counts[type_byte]
+        if client_count == 0 and server_count == 0:
+            continue
+
+        lines.append(
+            ROW_TEMPLATE.format(
+                _type_name(type_byte),
+                client_count,
+                client.frame_bytes[type_byte],
+                server_count,
+                server.frame_bytes[type_byte],
+            )
+        )
+
+    # NOTE: The totals for every stream are combined from a copy, since the
+    #       RECV threads may be adding to them.
+    streams, totals = connection.all_streams()
+    for stream in streams:
+        totals.add(stream)
+    lines.extend(
+        [
+            f"Streams = {totals.count}, "
+            f"RST_STREAM = {client.frame_counts[RST_STREAM]} (C->S) / "
+            f"{server.frame_counts[RST_STREAM]} (S->C), "
+            f"GOAWAY = {client.frame_counts[GOAWAY]} (C->S) / "
+            f"{server.frame_counts[GOAWAY]} (S->C)",
+            f"Header Block Bytes = {totals.client_header_bytes} (C->S) / "
+            f"{totals.server_header_bytes} (S->C)",
+            f"Max Header Block Bytes per Stream = "
+            f"{totals.max_client_header_bytes} (C->S) / "
+            f"{totals.max_server_header_bytes} (S->C)",
+        ]
+    )
+    lines.extend(connection.describe_trackers())
+    lines.append(tcp_h2_describe._describe.FOOTER)
+    return "\n".join(lines)
+
+
+def display_active(interval):
+    """Periodically display a summary for each active connection.
+
+    This is intended to be the target of a daemon thread; it never returns.
+
+    Args:
+        interval (float): The time (in seconds) between summaries.
+    """
+    while True:
+        time.sleep(interval)
+        with tcp_h2_describe._state.ACTIVE_LOCK:
+            connections = list(tcp_h2_describe._state.ACTIVE_CONNECTIONS)
+
+        for connection in connections:
+            tcp_h2_describe._display.display(describe_summary(connection))
+
+
+def start_reporter(interval):
+    """Start a (daemon) thread that periodically displays summaries.
+
+    Args:
+        interval (float): The time (in seconds) between summaries.
+
+    Returns:
+        threading.Thread: The thread that was started.
+    """
+    t_report = threading.Thread(
+        target=display_active, args=(interval,), daemon=True
+    )
+    t_report.start()
+    return t_report
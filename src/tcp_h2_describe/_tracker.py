@@ -0,0 +1,78 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+class Tracker:
+    """Base class for an (optional) per-connection frame tracker.
+
+    Trackers are called with ``ConnectionState.tracker_lock`` held, so
+    they need not worry about the two RECV threads for a connection
+    calling them concurrently.
+
+    Args:
+        connection (.ConnectionState): The connection being tracked.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def on_frame(self, peer, type_byte, flags, stream_id, frame_payload):
+        """Update the tracker for a frame.
+
+        Args:
+            peer (.PeerState): The peer that sent the frame.
+            type_byte (int): The frame type.
+            flags (int): The flags for the frame.
+            stream_id (int): The stream identifier.
+            frame_payload (memoryview): The frame payload. This is a view
+                into the TCP chunk, so should not be retained.
+        """
+
+    def on_settings(self, peer, settings):
+        """Update the tracker for newly acknowledged settings.
+
+        Args:
+            peer (.PeerState): The peer that **sent** the settings (i.e. the
+                settings now constrain frames sent **to** ``peer``).
+            settings (List[Tuple[int, int]]): The ``(setting_id,
+                setting_value)`` pairs that were acknowledged.
+        """
+
+    def on_stream_end(self, stream):
+        """Update the tracker for a stream that has ended.
+
+        This is called after ``on_frame()`` for the frame that ended the
+        stream, just before the stream is moved out of the active streams
+        for the connection.
+
+        Args:
+            stream (.StreamState): The stream that ended.
+        """
+
+    def on_forwarded(self, peer, now):
+        """Update the tracker as a TCP chunk is forwarded.
+
+        This is called just **before** the chunk is sent to the other peer.
+
+        Args:
+            peer (.PeerState): The peer that sent the TCP chunk.
+            now (float): The (monotonic) time the chunk was forwarded.
+        """
+
+    def describe(self):
+        """Describe the current state of the tracker.
+
+        Returns:
+            str: The description, or an empty string if there is nothing
+            to report.
+        """
+        return ""
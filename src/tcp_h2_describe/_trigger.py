@@ -0,0 +1,247 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Triggers that turn on full descriptions for a connection.
+
+With triggers, frames are only observed (i.e. counted and tracked, as in
+summary mode) until a trigger fires. At that point the flight recorder for
+the connection is displayed (the frames leading up to the trigger) and every
+frame is described for a window of time after the trigger.
+"""
+
+import re
+import struct
+
+import tcp_h2_describe._tracker
+
+
+RST_STREAM = 0x3
+GOAWAY = 0x7
+DEFAULT_WINDOW = 5.0  # 5 seconds
+STRUCT_L = struct.Struct(">L")
+# See: https://http2.github.io/http2-spec/#ErrorCodes
+ERROR_CODES = {
+    "NO_ERROR": 0x0,
+    "PROTOCOL_ERROR": 0x1,
+    "INTERNAL_ERROR": 0x2,
+    "FLOW_CONTROL_ERROR": 0x3,
+    "SETTINGS_TIMEOUT": 0x4,
+    "STREAM_CLOSED": 0x5,
+    "FRAME_SIZE_ERROR": 0x6,
+    "REFUSED_STREAM": 0x7,
+    "CANCEL": 0x8,
+    "COMPRESSION_ERROR": 0x9,
+    "CONNECT_ERROR": 0xA,
+    "ENHANCE_YOUR_CALM": 0xB,
+    "INADEQUATE_SECURITY": 0xC,
+    "HTTP_1_1_REQUIRED": 0xD,
+}
+ERROR_CODE_NAMES = {value: name for name, value in ERROR_CODES.items()}
+
+
+def parse_error_code(value):
+    """Parse an error code, either by name or by value.
+
+    Args:
+        value (str): The error code, e.g. ``CANCEL`` or ``0x8``.
+
+    Returns:
+        int: The error code.
+
+    Raises:
+        ValueError: If ``value`` is neither a known error code name nor an
+            integer.
+    """
+    error_code = ERROR_CODES.get(value.upper())
+    if error_code is not None:
+        return error_code
+    return int(value, 0)
+
+
+def describe_error_code(error_code):
+    """Describe an error code.
+
+    Args:
+        error_code (int): The error code.
+
+    Returns:
+        str: The name of the error code (or its value, if unknown).
+    """
+    return ERROR_CODE_NAMES.get(error_code, f"0x{error_code:x}")
+
+
+class Triggers:
+    """The conditions that turn on full descriptions for a connection.
+
+    Args:
+        latency (Optional[float]): If set, a stream that has been open for
+            longer than ``latency`` seconds (when one of its frames is
+            RECV-ed) fires a trigger.
+        rst_stream_codes (Optional[Iterable[int]]): The error codes for
+            which a RST_STREAM fires a trigger.
+        goaway (Optional[bool]): Indicates if a GOAWAY fires a trigger.
+        header_patterns (Optional[Iterable[str]]): Regular expressions; a
+            header (formatted as ``name: value``) matching any of them fires
+            a trigger.
+        window (Optional[float]): The time (in seconds) after a trigger
+            during which every frame is described.
+    """
+
+    def __init__(
+        self,
+        latency=None,
+        rst_stream_codes=(),
+        goaway=False,
+        header_patterns=(),
+        window=DEFAULT_WINDOW,
+    ):
+        self.latency = latency
+        self.rst_stream_codes = frozenset(rst_stream_codes)
+        self.goaway = goaway
+        self.header_patterns = tuple(
+            re.compile(pattern) for pattern in header_patterns
+        )
+        self.window = window
+
+    def match_headers(self, headers):
+        """Find the first header that matches a pattern.
+
+        Args:
+            headers (List[Tuple[str, str]]): The decoded headers.
+
+        Returns:
+            Optional[str]: The matching header (as ``name: value``), if any.
+        """
+        for name, value in headers:
+            header = f"{name}: {value}"
+            for pattern in self.header_patterns:
+                if pattern.search(header) is not None:
+                    return header
+        return None
+
+
+class TriggerTracker(tcp_h2_describe._tracker.Tracker):
+    """Check each frame against the triggers for the proxy.
+
+    When a trigger fires, the flight recorder for the connection (the
+    pre-trigger buffer) is added to the reports for the peer that sent the
+    frame and the connection is captured (i.e. every frame is described)
+    until the trigger window elapses. A trigger that fires during a capture
+    extends it.
+
+    Args:
+        connection (.ConnectionState): The connection being tracked.
+    """
+
+    def __init__(self, connection):
+        super().__init__(connection)
+        self.triggers = connection.options.triggers
+        self.capture_until = None
+        self.fired = 0
+        # NOTE: The (active) streams that already fired the latency trigger;
+        #       each is removed when its stream ends.
+        self.slow_streams = set()
+
+    def capturing(self, now):
+        """Check if the connection is being captured.
+
+        Args:
+            now (float): The (monotonic) current time.
+
+        Returns:
+            bool: Indicates if frames should be described.
+        """
+        capture_until = self.capture_until
+        return capture_until is not None and now < capture_until
+
+    def check(self, peer, type_byte, stream_id, frame_payload):
+        """Check if a frame fires a trigger.
+
+        Args:
+            peer (.PeerState): The peer that sent the frame.
+            type_byte (int): The frame type.
+            stream_id (int): The stream identifier.
+            frame_payload (memoryview): The frame payload.
+
+        Returns:
+            Optional[str]: The reason the trigger fired, if it did.
+        """
+        triggers = self.triggers
+        sender = "client" if peer.is_client else "server"
+        if type_byte == RST_STREAM and len(frame_payload) == 4:
+            (error_code,) = STRUCT_L.unpack(frame_payload)
+            if error_code in triggers.rst_stream_codes:
+                return (
+                    f"RST_STREAM ({describe_error_code(error_code)}) "
+                    f"from {sender} on stream {stream_id}"
+                )
+        elif type_byte == GOAWAY and triggers.goaway:
+            return f"GOAWAY from {sender}"
+
+        headers = peer.current_headers
+        if headers is not None and triggers.header_patterns:
+            header = triggers.match_headers(headers)
+            if header is not None:
+                return f"header {header!r} from {sender} on stream {stream_id}"
+
+        if triggers.latency is None or stream_id in self.slow_streams:
+            return None
+        stream = self.connection.streams.get(stream_id)
+        if stream is None or stream.started_at is None:
+            return None
+        duration = peer.received_at - stream.started_at
+        if duration <= triggers.latency:
+            return None
+        self.slow_streams.add(stream_id)
+        return (
+            f"stream {stream_id} open for {1000.0 * duration:.3f}ms "
+            f"(> {1000.0 * triggers.latency:g}ms)"
+        )
+
+    def on_frame(self, peer, type_byte, flags, stream_id, frame_payload):
+        """Check if a frame fires a trigger (and start a capture if so).
+
+        Args:
+            peer (.PeerState): The peer that sent the frame.
+            type_byte (int): The frame type.
+            flags (int): The flags for the frame.
+            stream_id (int): The stream identifier.
+            frame_payload (memoryview): The frame payload. This is a view
+                into the TCP chunk, so should not be retained.
+        """
+        reason = self.check(peer, type_byte, stream_id, frame_payload)
+        if reason is None:
+            return
+
+        self.fired += 1
+        now = peer.received_at
+        if self.capturing(now):
+            peer.reports.append(f"Trigger (extending capture): {reason}")
+        else:
+            peer.reports.append(
+                peer.connection.describe_flight(f"trigger: {reason}")
+            )
+        self.capture_until = now + self.triggers.window
+
+    def on_stream_end(self, stream):
+        self.slow_streams.discard(stream.stream_id)
+
+    def describe(self):
+        """Describe the triggers fired for the connection.
+
+        Returns:
+            str: The number of triggers fired, or an empty string if none
+            were.
+        """
+        if self.fired == 0:
+            return ""
+        return f"Triggers fired = {self.fired}"
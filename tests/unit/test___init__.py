@@ -10,10 +10,50 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import json
+import subprocess
+import sys
+
+import pytest
+
 import tcp_h2_describe
 
 
+# NOTE: The time to import the CLI (``tcp_h2_describe.__main__``) in a fresh
+#       interpreter, minus the time to start the interpreter itself.
+STARTUP_BUDGET = 0.1  # 100 milliseconds, in seconds
+STARTUP_SCRIPT = """\
+import json
+import sys
+import time
+
+start = time.perf_counter()
+import tcp_h2_describe.__main__
+duration = time.perf_counter() - start
+print(json.dumps({"duration": duration, "modules": sorted(sys.modules)}))
+"""
+
+
 def test___version__():
-    # NOTE: This hardcodes the version here to make sure `pkg_resources` picks
-    #       up the version in `setup.py`.
+    # NOTE: This hardcodes the version here to make sure `importlib.metadata`
+    #       picks up the version in `setup.py`.
     assert tcp_h2_describe.__version__ == "0.1.1.dev1"
+
+
+def test_lazy_attributes():
+    assert tcp_h2_describe.ProxyOptions.__name__ == "ProxyOptions"
+    assert "serve_proxy" in dir(tcp_h2_describe)
+    with pytest.raises(AttributeError):
+        tcp_h2_describe.not_an_attribute
+
+
+def test_startup():
+    output = subprocess.check_output([sys.executable, "-c", STARTUP_SCRIPT])
+    result = json.loads(output)
+
+    modules = set(result["modules"])
+    assert "pkg_resources" not in modules
+    assert "importlib.metadata" not in modules
+    assert "hpack" not in modules
+    assert "tcp_h2_describe._serve" not in modules
+    assert result["duration"] < STARTUP_BUDGET
@@ -0,0 +1,72 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import array
+
+import pytest
+
+import tcp_h2_describe._analysis
+
+
+@pytest.fixture(params=["numpy", "pure"])
+def analysis(request, monkeypatch):
+    module = tcp_h2_describe._analysis
+    if request.param == "numpy":
+        if module.numpy is None:
+            pytest.skip("numpy is not installed")
+    else:
+        monkeypatch.setattr(module, "numpy", None)
+    return module
+
+
+def test_group_counts_and_sums(analysis):
+    group_ids = array.array("L", [0, 2, 0, 2, 2])
+    values = array.array("L", [1, 2, 3, 4, 5])
+    assert analysis.group_counts(group_ids, 4) == [2, 0, 3, 0]
+    assert analysis.group_sums(group_ids, values, 4) == [4.0, 0.0, 11.0, 0.0]
+    assert analysis.group_counts(array.array("L"), 1) == [0]
+
+
+def test_group_percentiles(analysis):
+    nan = float("nan")
+    group_ids = array.array("L", [1, 0, 1, 1, 1, 2, 1])
+    values = array.array("d", [4.0, 7.0, 1.0, 3.0, 2.0, nan, nan])
+    result = analysis.group_percentiles(
+        group_ids, values, 4, (0.0, 0.5, 0.9, 1.0)
+    )
+    assert result == [
+        [7.0, 7.0, 7.0, 7.0],
+        [1.0, 2.5, pytest.approx(3.7), 4.0],
+        [None, None, None, None],
+        [None, None, None, None],
+    ]
+    assert analysis.group_percentiles(
+        array.array("L"), array.array("d"), 1, (0.5,)
+    ) == [[None]]
+
+
+def test_percentiles(analysis):
+    values = array.array("d", [3.0, float("nan"), 1.0, 2.0])
+    assert analysis.percentiles(values, (0.0, 0.5, 1.0)) == [1.0, 2.0, 3.0]
+    assert analysis.percentiles(array.array("d"), (0.5,)) == [None]
+
+
+def test_histograms(analysis):
+    edges = (1, 64, 1024)
+    group_ids = array.array("B", [0, 0, 1, 1, 1])
+    values = array.array("I", [0, 64, 1, 63, 5000])
+    assert analysis.histogram(values, edges) == [1, 2, 1, 1]
+    assert analysis.group_histograms(group_ids, values, 3, edges) == [
+        [1, 0, 1, 0],
+        [0, 2, 0, 1],
+        [0, 0, 0, 0],
+    ]
@@ -0,0 +1,53 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hpack
+import pytest
+
+import tcp_h2_describe._build
+import tcp_h2_describe._describe
+
+
+def test_build_frame_too_large():
+    with pytest.raises(ValueError):
+        tcp_h2_describe._build.build_frame(0x0, 0x0, 1, b"\x00" * 0x1000000)
+
+
+def test_build_settings():
+    frame = tcp_h2_describe._build.build_settings(
+        [(0x4, 65535), (0x5, 1 << 20)]
+    )
+    assert frame[:9] == b"\x00\x00\x0c\x04\x00\x00\x00\x00\x00"
+    assert tcp_h2_describe._describe.parse_settings(frame[9:]) == [
+        (0x4, 65535),
+        (0x5, 1 << 20),
+    ]
+    ack = tcp_h2_describe._build.build_settings(ack=True)
+    assert ack == b"\x00\x00\x00\x04\x01\x00\x00\x00\x00"
+
+
+def test_build_headers():
+    headers = [(":method", "GET"), (":path", "/")]
+    frame = tcp_h2_describe._build.build_headers(
+        hpack.Encoder(), headers, 3, end_stream=True
+    )
+    assert frame[3:9] == b"\x01\x05\x00\x00\x00\x03"
+    assert hpack.Decoder().decode(frame[9:]) == headers
+
+
+def test_build_data_and_window_update():
+    data = tcp_h2_describe._build.build_data(5, b"abc", end_stream=True)
+    assert data == b"\x00\x00\x03\x00\x01\x00\x00\x00\x05abc"
+    window_update = tcp_h2_describe._build.build_window_update(0, 1024)
+    assert window_update == (
+        b"\x00\x00\x04\x08\x00\x00\x00\x00\x00" b"\x00\x00\x04\x00"
+    )
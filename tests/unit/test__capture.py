@@ -0,0 +1,66 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+import pytest
+
+import tcp_h2_describe._capture
+
+
+def test_round_trip(tmp_path):
+    path = tcp_h2_describe._capture.capture_path(str(tmp_path))
+    assert os.path.dirname(path) == str(tmp_path)
+    writer = tcp_h2_describe._capture.CaptureWriter(path, 100.0)
+    writer.write(100.0, b"first")
+    writer.write(100.125, b"response", is_client=False)
+    writer.write(100.25, b"second")
+    writer.close()
+
+    opened_wall, chunks = tcp_h2_describe._capture.read_capture(path)
+    assert opened_wall > 0.0
+    assert chunks == [(0.0, b"first"), (0.25, b"second")]
+    _, records = tcp_h2_describe._capture.read_records(path)
+    assert records == [
+        (0.0, True, b"first"),
+        (0.125, False, b"response"),
+        (0.25, True, b"second"),
+    ]
+
+    # A truncated final record is ignored.
+    with open(path, "rb") as file_obj:
+        contents = file_obj.read()
+    with open(path, "wb") as file_obj:
+        file_obj.write(contents[:-1])
+    _, chunks = tcp_h2_describe._capture.read_capture(path)
+    assert chunks == [(0.0, b"first")]
+
+
+def test_read_records_v1(tmp_path):
+    capture = tcp_h2_describe._capture
+    path = tmp_path / "v1.capture"
+    path.write_bytes(
+        capture.MAGIC_V1
+        + capture.STRUCT_OPENED.pack(1.0)
+        + capture.STRUCT_RECORD_V1.pack(0.5, 5)
+        + b"first"
+    )
+    opened_wall, records = capture.read_records(str(path))
+    assert opened_wall == 1.0
+    assert records == [(0.5, True, b"first")]
+
+
+def test_read_capture_invalid(tmp_path):
+    path = tmp_path / "not-a-capture"
+    path.write_bytes(b"PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n")
+    with pytest.raises(ValueError):
+        tcp_h2_describe._capture.read_capture(str(path))
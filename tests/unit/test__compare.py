@@ -0,0 +1,118 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hpack
+import pytest
+
+import tcp_h2_describe._build
+import tcp_h2_describe._capture
+import tcp_h2_describe._compare
+import tcp_h2_describe._describe
+
+
+def _write_capture(path, slow_duration, extra_route=False):
+    build = tcp_h2_describe._build
+    client_encoder = hpack.Encoder()
+    server_encoder = hpack.Encoder()
+    response = [(":status", "200")]
+    writer = tcp_h2_describe._capture.CaptureWriter(str(path), 0.0)
+    writer.write(
+        0.0, build.build_settings([(0x4, 10)]), is_client=False
+    )
+    writer.write(
+        0.001,
+        tcp_h2_describe._describe.PREFACE
+        + build.build_settings()
+        + build.build_settings(ack=True)
+        + build.build_headers(
+            client_encoder, [(":method", "GET"), (":path", "/fast?a=1")], 1,
+            end_stream=True,
+        )
+        + build.build_headers(
+            client_encoder, [(":method", "GET"), (":path", "/slow")], 3,
+            end_stream=True,
+        )
+        + build.build_headers(
+            client_encoder, [(":method", "POST"), (":path", "/upload")], 5
+        )
+        + build.build_data(5, b"x" * 10),
+    )
+    writer.write(
+        0.011,
+        build.build_headers(server_encoder, response, 1)
+        + build.build_data(1, b"fast", end_stream=True),
+        is_client=False,
+    )
+    writer.write(
+        0.051, build.build_window_update(5, 100), is_client=False
+    )
+    writer.write(0.052, build.build_data(5, b"y", end_stream=True))
+    writer.write(
+        0.061,
+        build.build_headers(server_encoder, response, 5, end_stream=True),
+        is_client=False,
+    )
+    writer.write(
+        0.001 + slow_duration,
+        build.build_headers(server_encoder, response, 3, end_stream=True),
+        is_client=False,
+    )
+    if extra_route:
+        writer.write(
+            1.0,
+            build.build_headers(
+                client_encoder, [(":method", "GET"), (":path", "/new")], 7,
+                end_stream=True,
+            ),
+        )
+    writer.close()
+
+
+def test_load_streams(tmp_path):
+    path = tmp_path / "before.capture"
+    _write_capture(path, 0.02)
+    columns = tcp_h2_describe._compare.load_streams([str(path)])
+    assert len(columns) == 3
+    assert columns.connections == 1
+    assert columns.routes == ["GET /fast", "GET /slow", "POST /upload"]
+
+    stats = tcp_h2_describe._compare.summarize(columns)
+    assert stats["GET /fast"].p50 == pytest.approx(0.01)
+    assert stats["GET /fast"].frames == 3.0
+    assert stats["GET /slow"].p90 == pytest.approx(0.02)
+    upload = stats["POST /upload"]
+    assert upload.p50 == pytest.approx(0.06)
+    assert upload.stall_time == pytest.approx(0.05)
+    assert upload.failed == 0
+
+
+def test_describe_comparison(tmp_path):
+    before_path = tmp_path / "before.capture"
+    after_path = tmp_path / "after.capture"
+    _write_capture(before_path, 0.02)
+    _write_capture(after_path, 0.2, extra_route=True)
+    before = tcp_h2_describe._compare.load_streams([str(before_path)])
+    after = tcp_h2_describe._compare.load_streams(
+        tcp_h2_describe._compare.expand_paths(str(tmp_path))[:1]
+    )
+    report = tcp_h2_describe._compare.describe_comparison(
+        before, after, top=1
+    )
+    lines = report.split("\n")
+    assert lines[0] == "Capture Comparison ="
+    assert lines[3] == "   Matched routes = 3, only before = 0, only after = 1"
+    assert lines[4] == (
+        "   1. GET /slow: p90 +180.000ms (20.000ms -> 200.000ms)"
+    )
+    assert lines[5] == "      streams = 1 -> 1, failed = 0 -> 0"
+    assert lines[8] == "   ... 2 more matched route(s)"
+    assert lines[9] == "   Only after: GET /new (1 streams)"
@@ -0,0 +1,96 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hpack
+
+import tcp_h2_describe._build
+import tcp_h2_describe._concurrency
+import tcp_h2_describe._describe
+import tcp_h2_describe._options
+import tcp_h2_describe._state
+
+
+class TestStreamConcurrency:
+    @staticmethod
+    def test_at_limit():
+        concurrency = tcp_h2_describe._concurrency.StreamConcurrency(0.0)
+        concurrency.set_limit(2, 0.5)
+        assert concurrency.open(1, True, False, 1.0)
+        assert concurrency.open(3, True, False, 1.5)
+        assert concurrency.at_limit_since == 1.5
+        # Stream identifiers only increase, so a stream is not reopened.
+        assert not concurrency.open(1, False, False, 2.0)
+
+        concurrency.end(1, False, 2.5)
+        assert concurrency.open_streams == {3: [True, False]}
+        assert concurrency.total_at_limit_time(10.0) == 1.0
+        concurrency.open(5, False, False, 3.0)
+        concurrency.close(5, 3.25)
+        assert concurrency.at_limit_count == 2
+        assert concurrency.total_at_limit_time(10.0) == 1.25
+        assert concurrency.peak == 2
+
+        concurrency._advance(4.0)
+        assert concurrency.maxima == [0, 2, 2, 2, 1]
+        assert concurrency.at_limit == [False, True, True, True, False]
+
+    @staticmethod
+    def test_merge():
+        concurrency = tcp_h2_describe._concurrency.StreamConcurrency(0.0)
+        concurrency.open(1, False, False, 0.5)
+        concurrency.open(3, False, False, 59.5)
+        concurrency.close(1, 60.5)
+        assert concurrency.interval == 2.0
+        assert concurrency.maxima == [1] * 29 + [2, 2]
+
+
+def test_concurrency_tracker():
+    options = tcp_h2_describe._options.ProxyOptions(stream_concurrency=True)
+    connection = tcp_h2_describe._state.ConnectionState(
+        "client", "server", options
+    )
+    (tracker,) = connection.trackers
+    encoder = hpack.Encoder()
+    headers = [(":method", "GET"), (":path", "/")]
+    build_headers = tcp_h2_describe._build.build_headers
+    server_frames = tcp_h2_describe._build.build_settings(
+        [(tcp_h2_describe._concurrency.SETTINGS_MAX_CONCURRENT_STREAMS, 2)]
+    )
+    tcp_h2_describe._describe.observe(server_frames, False, connection.server)
+    client_frames = (
+        tcp_h2_describe._describe.PREFACE
+        + tcp_h2_describe._build.build_settings(ack=True)
+        + build_headers(encoder, headers, 1, end_stream=True)
+        + build_headers(encoder, headers, 3, end_stream=True)
+    )
+    tcp_h2_describe._describe.observe(client_frames, True, connection.client)
+    assert tracker.client.limit == 2
+    assert sorted(tracker.client.open_streams) == [1, 3]
+    assert tracker.client.at_limit_since is not None
+
+    response = hpack.Encoder()
+    server_frames = build_headers(
+        response, [(":status", "200")], 1
+    ) + tcp_h2_describe._build.build_data(1, b"", end_stream=True)
+    tcp_h2_describe._describe.observe(server_frames, False, connection.server)
+    assert sorted(tracker.client.open_streams) == [3]
+    assert tracker.client.at_limit_since is None
+    assert tracker.client.at_limit_count == 1
+
+    lines = tracker.describe().split("\n")
+    assert lines[0] == "Stream Concurrency (client) ="
+    assert lines[1] == (
+        "   Client streams: limit = 2 (from server), open = 1, peak = 2, "
+        "opened = 2"
+    )
+    assert lines[3].startswith("      max open per 1s (* = at limit): 2*")
+    assert len(lines) == 4
@@ -0,0 +1,67 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+import threading
+
+import tcp_h2_describe._debug
+
+
+def _busy_until(started, stop):
+    started.set()
+    # NOTE: ``stop`` is a list (rather than an event) so that the top of the
+    #       stack is always this function.
+    while not stop:
+        pass
+
+
+def test_collapse_stack():
+    collapsed = tcp_h2_describe._debug.collapse_stack(sys._getframe())
+    assert collapsed.endswith(";test__debug.py:test_collapse_stack")
+
+
+def test_describe_stacks():
+    tcp_h2_describe._debug.register_thread("client->proxy->server")
+    try:
+        stacks = tcp_h2_describe._debug.describe_stacks()
+    finally:
+        tcp_h2_describe._debug.unregister_thread()
+
+    assert stacks.startswith("Thread Stacks (")
+    assert f"   client->proxy->server [{threading.get_ident()}]:" in stacks
+    assert "in test_describe_stacks" in stacks
+    descriptions = tcp_h2_describe._debug.THREAD_DESCRIPTIONS
+    assert threading.get_ident() not in descriptions
+
+
+class TestSampler:
+    @staticmethod
+    def test_sample():
+        sampler = tcp_h2_describe._debug.Sampler()
+        started = threading.Event()
+        stop = []
+        thread = threading.Thread(target=_busy_until, args=(started, stop))
+        thread.start()
+        started.wait()
+        tcp_h2_describe._debug.THREAD_DESCRIPTIONS[thread.ident] = "busy"
+        try:
+            sampler.sample()
+        finally:
+            stop.append(True)
+            thread.join()
+            tcp_h2_describe._debug.THREAD_DESCRIPTIONS.pop(thread.ident)
+
+        assert sampler.busy == 1
+        assert sampler.idle == 0
+        ((stack, count),) = sampler.counts.items()
+        assert stack.endswith(";test__debug.py:_busy_until")
+        assert count == 1
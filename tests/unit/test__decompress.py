@@ -0,0 +1,57 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gzip
+
+import tcp_h2_describe._decompress
+
+
+class TestDecompressor:
+    @staticmethod
+    def test_incremental():
+        body = b"hello world " * 100
+        compressed = gzip.compress(body)
+        decompressor = tcp_h2_describe._decompress.Decompressor("gzip")
+
+        middle = len(compressed) // 2
+        output = decompressor.decompress(compressed[:middle])
+        output += decompressor.decompress(compressed[middle:])
+        assert output == body
+        assert decompressor.describe_status() is None
+
+    @staticmethod
+    def test_output_limit():
+        compressed = gzip.compress(b"\x00" * 100000)
+        decompressor = tcp_h2_describe._decompress.Decompressor("gzip", 1000)
+
+        assert decompressor.decompress(compressed) == b"\x00" * 1000
+        assert decompressor.exceeded
+        assert decompressor.decompress(compressed) == b""
+        assert decompressor.describe_status() == (
+            "decompressed size is larger than 1000 bytes"
+        )
+
+    @staticmethod
+    def test_invalid():
+        decompressor = tcp_h2_describe._decompress.Decompressor("deflate")
+        assert decompressor.decompress(b"not deflate") == b""
+        assert decompressor.describe_status().startswith(
+            "decompression failed"
+        )
+
+
+def test_make_decompressor():
+    make_decompressor = tcp_h2_describe._decompress.make_decompressor
+    assert make_decompressor(None) is None
+    assert make_decompressor("identity") is None
+    assert make_decompressor("br") is None
+    assert make_decompressor(" GZIP").encoding == "gzip"
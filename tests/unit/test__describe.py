@@ -10,9 +10,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import gzip
+
 import pytest
 
+import tcp_h2_describe._decompress
 import tcp_h2_describe._describe
+import tcp_h2_describe._options
+import tcp_h2_describe._state
 
 
 class Test_describe:
@@ -105,3 +110,170 @@ class Test_describe:
             ]
         )
         assert message == expected
+
+
+class Test_describe_flags:
+    @staticmethod
+    def test_unset():
+        description = tcp_h2_describe._describe.describe_flags("SETTINGS", 0)
+        assert description == "UNSET"
+
+    @staticmethod
+    def test_multiple():
+        description = tcp_h2_describe._describe.describe_flags("HEADERS", 0x25)
+        expected = "END_STREAM:0x1 | END_HEADERS:0x4 | PRIORITY:0x20"
+        assert description == expected
+
+    @staticmethod
+    def test_unaccounted():
+        with pytest.raises(RuntimeError) as exc_info:
+            tcp_h2_describe._describe.describe_flags("PING", 0x2)
+
+        expected_args = ("Some flags not accounted for", "PING", 0x2)
+        assert exc_info.value.args == expected_args
+
+
+class Test_next_h2_frame:
+    @staticmethod
+    def test_ping():
+        h2_frames = (
+            b"\x00\x00\x08\x06\x01\x00\x00\x00\x00\x01\x02\x03\x04\x05\x06"
+            b"\x07\x08\xff"
+        )
+        parts, remaining = tcp_h2_describe._describe.next_h2_frame(h2_frames)
+        assert parts == [
+            "Frame Length = 8 (00 00 08)",
+            "Frame Type = PING (06)",
+            "Flags = ACK:0x1 (01)",
+            "Stream Identifier = 0 (00 00 00 00)",
+            "Opaque Data = 01 02 03 04 05 06 07 08",
+        ]
+        assert remaining == b"\xff"
+
+    @staticmethod
+    def test_unknown_frame_type():
+        h2_frames = b"\x00\x00\x00\xf0\x00\x00\x00\x00\x00"
+        with pytest.raises(KeyError):
+            tcp_h2_describe._describe.next_h2_frame(h2_frames)
+
+
+class Test_describe_pass_through_data:
+    @staticmethod
+    def test_skips_payload():
+        options = tcp_h2_describe._options.ProxyOptions(pass_through_data=True)
+        connection = tcp_h2_describe._state.ConnectionState(
+            "client->server", "server->client", options
+        )
+        h2_frames = (
+            b"\x00\x00\x05\x00\x01\x00\x00\x00\x01hello"
+            b"\x00\x00\x03\x00\x00\x00\x00\x00\x03abc"
+        )
+
+        message = tcp_h2_describe._describe.describe(
+            h2_frames, "client->server", False, None, connection.client
+        )
+        expected = "\n".join(
+            [
+                tcp_h2_describe._describe.HEADER,
+                "client->server",
+                "",
+                "Frame Length = 5 (00 00 05)",
+                "Frame Type = DATA (00)",
+                "Flags = END_STREAM:0x1 (01)",
+                "Stream Identifier = 1 (00 00 00 01)",
+                "Frame Payload = (5 bytes, skipped)",
+                tcp_h2_describe._describe.FOOTER,
+                "Frame Length = 3 (00 00 03)",
+                "Frame Type = DATA (00)",
+                "Flags = UNSET (00)",
+                "Stream Identifier = 3 (00 00 00 03)",
+                "Frame Payload = (3 bytes, skipped)",
+                tcp_h2_describe._describe.FOOTER,
+            ]
+        )
+        assert message == expected
+        assert connection.streams[1].client_data_bytes == 5
+        assert connection.streams[3].client_data_bytes == 3
+        assert connection.streams[3].server_data_bytes == 0
+
+
+class Test_handle_data_payload:
+    @staticmethod
+    def test_content_encoding():
+        connection = tcp_h2_describe._state.ConnectionState(
+            "client->server", "server->client"
+        )
+        stream = connection.get_stream(1)
+        stream.response_headers = [("content-encoding", "gzip")]
+        stream.server_decompressor = (
+            tcp_h2_describe._decompress.make_decompressor("gzip")
+        )
+        frame_payload = gzip.compress(b"hi")
+        context = tcp_h2_describe._state.FrameContext(
+            connection.server, stream, None
+        )
+
+        description = tcp_h2_describe._describe.handle_data_payload(
+            frame_payload, 0x0, context
+        )
+        assert description.endswith(
+            "\n".join(["Decompressed Payload (gzip) =", "   b'hi'"])
+        )
+
+
+class Test_handle_frame:
+    @staticmethod
+    def test_data():
+        describe = tcp_h2_describe._describe
+        description = describe.handle_frame("DATA", b"abc", 0x0)
+        assert description == describe.default_payload_handler(b"abc", 0x0)
+
+    @staticmethod
+    def test_ping():
+        description = tcp_h2_describe._describe.handle_frame(
+            "PING", b"\x00" * 8, 0x0
+        )
+        assert description == "Opaque Data = 00 00 00 00 00 00 00 00"
+
+    @staticmethod
+    def test_invalid_frame_type():
+        with pytest.raises(ValueError):
+            tcp_h2_describe._describe.handle_frame("NOPE", b"", 0x0)
+
+
+class Test_observe:
+    @staticmethod
+    def test_counters():
+        connection = tcp_h2_describe._state.ConnectionState(
+            "client->server", "server->client"
+        )
+        h2_frames = (
+            tcp_h2_describe._describe.PREFACE
+            + b"\x00\x00\x00\x04\x00\x00\x00\x00\x00"
+            + b"\x00\x00\x02\x01\x04\x00\x00\x00\x01\x82\x84"
+            + b"\x00\x00\x05\x00\x01\x00\x00\x00\x01hello"
+        )
+
+        tcp_h2_describe._describe.observe(h2_frames, True, connection.client)
+        client = connection.client
+        assert client.frame_counts[0x0] == 1
+        assert client.frame_bytes[0x0] == 5
+        assert client.frame_counts[0x1] == 1
+        assert client.frame_counts[0x4] == 1
+        assert sum(client.frame_counts) == 3
+        stream = connection.streams[1]
+        assert stream.client_frames == 2
+        assert stream.client_header_bytes == 2
+        assert stream.client_data_bytes == 5
+
+    @staticmethod
+    def test_incomplete_frame():
+        connection = tcp_h2_describe._state.ConnectionState(
+            "client->server", "server->client"
+        )
+        h2_frames = b"\x00\x00\x05\x00\x01\x00\x00\x00\x01hel"
+
+        with pytest.raises(RuntimeError):
+            tcp_h2_describe._describe.observe(
+                h2_frames, False, connection.client
+            )
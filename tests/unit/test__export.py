@@ -0,0 +1,95 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hpack
+import pytest
+
+import tcp_h2_describe._analysis
+import tcp_h2_describe._build
+import tcp_h2_describe._describe
+import tcp_h2_describe._export
+import tcp_h2_describe._options
+import tcp_h2_describe._state
+
+
+@pytest.fixture(params=["numpy", "pure"])
+def use_numpy(request, monkeypatch):
+    if request.param == "numpy":
+        if tcp_h2_describe._analysis.numpy is None:
+            pytest.skip("numpy is not installed")
+        return True
+    monkeypatch.setattr(tcp_h2_describe._analysis, "numpy", None)
+    return False
+
+
+def _export_connection(export_dir):
+    build = tcp_h2_describe._build
+    options = tcp_h2_describe._options.ProxyOptions(export_dir=export_dir)
+    connection = tcp_h2_describe._state.ConnectionState(
+        "client", "server", options
+    )
+    encoder = hpack.Encoder()
+    client = connection.client
+    client.received_at = connection.opened_at + 0.5
+    tcp_h2_describe._describe.observe(
+        tcp_h2_describe._describe.PREFACE
+        + build.build_settings()
+        + build.build_headers(
+            encoder, [(":method", "GET"), (":path", "/")], 1, end_stream=True
+        ),
+        True,
+        client,
+    )
+    server = connection.server
+    server.received_at = connection.opened_at + 1.5
+    tcp_h2_describe._describe.observe(
+        build.build_data(1, b"x" * 100, end_stream=True), False, server
+    )
+    connection.close()
+    return connection
+
+
+def test_export_round_trip(tmp_path, use_numpy):
+    export_dir = str(tmp_path / "frames")
+    connection = _export_connection(export_dir)
+    assert connection.export_id == 0
+
+    columns = tcp_h2_describe._export.load_columns(export_dir)
+    if use_numpy:
+        assert columns["length"].dtype.itemsize == 4
+    assert list(columns["type"]) == [0x4, 0x1, 0x0]
+    assert list(columns["direction"]) == [0, 0, 1]
+    assert list(columns["stream_id"]) == [0, 1, 1]
+    assert list(columns["length"]) == [0, len(b"\x82\x84"), 100]
+    assert list(columns["header_block_length"]) == [0, 2, 0]
+    timestamps = columns["timestamp_ns"]
+    assert timestamps[2] - timestamps[0] == pytest.approx(1e9, abs=1000)
+
+    report = tcp_h2_describe._export.describe_export(export_dir)
+    lines = report.split("\n")
+    assert lines[1] == "   3 frames from 1 connection(s) over 1.000s"
+    assert lines[4] == (
+        "   DATA                     1             100       100       100"
+        "       100"
+    )
+    assert lines[8] == "   HEADERS: p50 = 2, p99 = 2, max = 2"
+    assert lines[10] == (
+        "   DATA: < 1: 0, [1, 64): 0, [64, 1024): 1, [1024, 16384): 0, "
+        ">= 16384: 0"
+    )
+
+
+def test_npy_header():
+    header = tcp_h2_describe._export.npy_header("I", 12)
+    assert len(header) == tcp_h2_describe._export.NPY_HEADER_SIZE
+    assert header.endswith(b"\n")
+    assert b"'shape': (12,)" in header
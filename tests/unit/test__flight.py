@@ -0,0 +1,81 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+import tcp_h2_describe._flight
+import tcp_h2_describe._options
+import tcp_h2_describe._state
+
+
+class TestFrameRing:
+    @staticmethod
+    def test_record_wraps():
+        ring = tcp_h2_describe._flight.FrameRing(size=2, prefix_size=4)
+        ring.record(1.0, 0x6, 0x0, 0, memoryview(b"abcdefgh"))
+        ring.record(2.0, 0x0, 0x1, 3, memoryview(b"xy"))
+        ring.record(3.0, 0x8, 0x0, 5, memoryview(b"\x00\x00\x01\x00"))
+
+        assert ring.count == 3
+        assert ring.records() == [
+            (2.0, 0x0, 0x1, 3, 2, b"xy"),
+            (3.0, 0x8, 0x0, 5, 4, b"\x00\x00\x01\x00"),
+        ]
+
+    @staticmethod
+    def test_invalid_size():
+        with pytest.raises(ValueError):
+            tcp_h2_describe._flight.FrameRing(size=0)
+        with pytest.raises(ValueError):
+            tcp_h2_describe._options.ProxyOptions(flight_recorder=-1)
+
+
+def test_describe_flight():
+    options = tcp_h2_describe._options.ProxyOptions(flight_recorder=4)
+    connection = tcp_h2_describe._state.ConnectionState(
+        "C->S", "S->C", options
+    )
+    connection.client.received_at = connection.opened_at + 0.001
+    connection.client.on_frame(0x0, 0x0, 1, memoryview(b"x" * 10))
+    connection.server.received_at = connection.opened_at + 0.002
+    # RST_STREAM with error code CANCEL (0x8)
+    connection.server.on_frame(0x3, 0x0, 1, memoryview(b"\x00\x00\x00\x08"))
+
+    (report,) = connection.server.pop_reports()
+    assert report == (
+        "Flight Recorder (RST_STREAM from server) =\n"
+        "   C->S\n"
+        "   2 frames recorded (0 older frames dropped)\n"
+        "        1.000ms client: DATA flags=0x00 stream=1 length=10 "
+        "[78 78 78 78 78 78 78 78 ...]\n"
+        "        2.000ms server: RST_STREAM flags=0x00 stream=1 length=4 "
+        "[00 00 00 08]"
+    )
+    assert connection.client.pop_reports() == []
+
+
+def test_describe_active():
+    options = tcp_h2_describe._options.ProxyOptions(flight_recorder=4)
+    connection = tcp_h2_describe._state.ConnectionState(
+        "C->S", "S->C", options
+    )
+    connection.open()
+    try:
+        reports = tcp_h2_describe._flight.describe_active("SIGUSR2")
+    finally:
+        connection.close()
+
+    assert reports == [
+        "Flight Recorder (SIGUSR2) =\n"
+        "   C->S\n"
+        "   0 frames recorded (0 older frames dropped)"
+    ]
@@ -0,0 +1,128 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hpack
+
+import tcp_h2_describe._build
+import tcp_h2_describe._describe
+import tcp_h2_describe._flow_control
+import tcp_h2_describe._options
+import tcp_h2_describe._state
+
+
+class TestSendWindows:
+    @staticmethod
+    def test_stall():
+        windows = tcp_h2_describe._flow_control.SendWindows()
+        windows.open(1)
+        windows.consume(1, 65535, 1.0)
+        assert windows.windows == {0: 0, 1: 0}
+        assert windows.stalled_since == {0: 1.0, 1: 1.0}
+
+        # Connection-level WINDOW_UPDATE only ends the connection stall.
+        windows.increment(0, 100, 1.5)
+        assert windows.stalled_since == {1: 1.0}
+        assert windows.total_stall_time(0, 10.0) == 0.5
+        assert windows.total_stall_time(1, 2.0) == 1.0
+
+        windows.increment(1, 100, 3.0)
+        assert windows.stalled_since == {}
+        assert windows.stall_count == {0: 1, 1: 1}
+        assert windows.total_stall_time(1, 10.0) == 2.0
+
+    @staticmethod
+    def test_set_initial_window_size():
+        windows = tcp_h2_describe._flow_control.SendWindows()
+        windows.open(1)
+        windows.consume(1, 1000, 1.0)
+        windows.set_initial_window_size(1000, 2.0)
+        # The stream window is shifted by the difference, but the connection
+        # window is not.
+        assert windows.windows == {0: 64535, 1: 0}
+        assert windows.stalled_since == {1: 2.0}
+        # New streams use the new initial window size.
+        windows.open(3)
+        windows.consume(3, 10, 3.0)
+        assert windows.windows[3] == 990
+
+    @staticmethod
+    def test_finish():
+        windows = tcp_h2_describe._flow_control.SendWindows()
+        windows.set_initial_window_size(10, 0.0)
+        windows.open(1)
+        windows.consume(1, 10, 1.0)
+        assert windows.finish(1, 4.0) == 3.0
+        assert 1 not in windows.windows
+        # The stall totals for the stream are combined into the totals for
+        # finished streams.
+        assert windows.stall_count == {}
+        assert windows.stall_time == {}
+        assert windows.finished_stall_time == 3.0
+        assert windows.finished_stall_count == 1
+        assert windows.longest_finished == [(3.0, 1, 1)]
+
+        # A WINDOW_UPDATE after the stream is finished (or for a stream that
+        # was never opened) does not start tracking it again.
+        windows.increment(1, 100, 5.0)
+        windows.increment(5, 100, 5.0)
+        windows.consume(5, 10, 5.0)
+        assert windows.windows == {0: 65515}
+
+    @staticmethod
+    def test_longest_finished():
+        windows = tcp_h2_describe._flow_control.SendWindows()
+        windows.set_initial_window_size(1, 0.0)
+        max_lines = tcp_h2_describe._flow_control.MAX_STREAM_LINES
+        for index in range(max_lines + 5):
+            stream_id = 2 * index + 1
+            windows.open(stream_id)
+            windows.consume(stream_id, 1, 0.0)
+            windows.finish(stream_id, float(index))
+        assert windows.finished_stalled_streams == max_lines + 5
+        assert len(windows.longest_finished) == max_lines
+        assert min(windows.longest_finished)[0] == 5.0
+
+
+def test_flow_control_tracker():
+    build = tcp_h2_describe._build
+    options = tcp_h2_describe._options.ProxyOptions(flow_control=True)
+    connection = tcp_h2_describe._state.ConnectionState(
+        "client", "server", options
+    )
+    (tracker,) = connection.trackers
+    tcp_h2_describe._describe.observe(
+        build.build_settings([(0x4, 10)]), False, connection.server
+    )
+    client_frames = (
+        tcp_h2_describe._describe.PREFACE
+        + build.build_settings(ack=True)
+        + build.build_headers(hpack.Encoder(), [(":method", "POST")], 1)
+        + build.build_data(1, b"x" * 10, end_stream=True)
+    )
+    connection.client.received_at = 1.0
+    tcp_h2_describe._describe.observe(client_frames, True, connection.client)
+    assert tracker.client.windows == {0: 65525}
+
+    # The server keeps crediting the stream after END_STREAM.
+    connection.server.received_at = 2.0
+    tcp_h2_describe._describe.observe(
+        build.build_window_update(1, 10), False, connection.server
+    )
+    assert tracker.client.windows == {0: 65525}
+    assert connection.streams[1].stall_time == 0.0
+    assert tracker.client.finished_stalled_streams == 1
+
+    lines = tracker.describe().split("\n")
+    assert lines[2] == (
+        "   C->S: 1 finished stream(s) stalled 1 time(s) for 0.000ms"
+    )
+    assert lines[4].startswith("   Stream 1: C->S stalled 1 time(s) for ")
@@ -0,0 +1,84 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hpack
+import pytest
+
+import tcp_h2_describe._build
+import tcp_h2_describe._describe
+import tcp_h2_describe._hpack_stats
+import tcp_h2_describe._options
+import tcp_h2_describe._state
+
+
+def test_decode_integer():
+    decode_integer = tcp_h2_describe._hpack_stats.decode_integer
+    # See: https://tools.ietf.org/html/rfc7541#appendix-C.1
+    assert decode_integer(b"\x0a", 0, 5) == (10, 1)
+    assert decode_integer(b"\x1f\x9a\x0a", 0, 5) == (1337, 3)
+    with pytest.raises(IndexError):
+        decode_integer(b"\x1f\x9a", 0, 5)
+
+
+def test_walk_header_block():
+    hpack_stats = tcp_h2_describe._hpack_stats
+    # See: https://tools.ietf.org/html/rfc7541#appendix-C.4.1
+    header_block = bytes.fromhex(
+        "828684418cf1e3c2e5f23a6ba0ab90f4ff"
+    )
+    fields = hpack_stats.walk_header_block(header_block)
+    assert [field.representation for field in fields] == [
+        hpack_stats.INDEXED,
+        hpack_stats.INDEXED,
+        hpack_stats.INDEXED,
+        hpack_stats.LITERAL_INDEXED,
+    ]
+    assert fields[3] == hpack_stats.HeaderField(
+        hpack_stats.LITERAL_INDEXED, 1, 0, False, 12, True, 14
+    )
+    with pytest.raises(IndexError):
+        hpack_stats.walk_header_block(header_block[:-1])
+
+
+def test_hpack_tracker():
+    options = tcp_h2_describe._options.ProxyOptions(
+        summary_interval=1.0, hpack_stats=True
+    )
+    connection = tcp_h2_describe._state.ConnectionState(
+        "client", "server", options
+    )
+    encoder = hpack.Encoder()
+    headers = [(":method", "GET"), ("x-token", "a" * 50)]
+    h2_frames = (
+        tcp_h2_describe._describe.PREFACE
+        + tcp_h2_describe._build.build_headers(encoder, headers, 1)
+        + tcp_h2_describe._build.build_headers(encoder, headers, 3)
+    )
+    tcp_h2_describe._describe.observe(h2_frames, True, connection.client)
+
+    (tracker,) = connection.trackers
+    stats = tracker.client
+    assert stats.header_blocks == 2
+    assert stats.decoded_bytes == 2 * (7 + 3 + 7 + 50)
+    assert stats.fields == 4
+    assert stats.indexed_static == 2
+    assert stats.indexed_dynamic == 1
+    assert stats.literal_indexed == 1
+    assert stats.huffman_decoded == 7 + 50
+    assert stats.huffman_decoded - stats.huffman_encoded > 0
+
+    lines = tracker.describe().split("\n")
+    assert lines[0] == "HPACK (client) ="
+    assert lines[1].startswith("   C->S: 2 header blocks, ")
+    assert lines[3].startswith("      dynamic table hit rate = 25.0%, ")
+    assert lines[4].startswith("      x-token: ")
+    assert tracker.server.describe("S->C") == []
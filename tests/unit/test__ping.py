@@ -0,0 +1,90 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+
+import tcp_h2_describe._build
+import tcp_h2_describe._describe
+import tcp_h2_describe._options
+import tcp_h2_describe._ping
+import tcp_h2_describe._state
+
+
+class TestPingTracker:
+    @staticmethod
+    def test_round_trip():
+        options = tcp_h2_describe._options.ProxyOptions(ping_rtt=True)
+        connection = tcp_h2_describe._state.ConnectionState(
+            "client->server", "server->client", options
+        )
+        tracker = connection.find_tracker(tcp_h2_describe._ping.PingTracker)
+        client = connection.client
+        server = connection.server
+        opaque_data = b"\x00\x01\x02\x03\x04\x05\x06\x07"
+
+        # Client PING, RECV-ed at 1.0 and forwarded at 1.25.
+        client.received_at = 1.0
+        ping = tcp_h2_describe._build.build_ping(opaque_data)
+        tcp_h2_describe._describe.observe(ping, False, client)
+        tracker.on_forwarded(client, 1.25)
+        # Server ACK, RECV-ed at 1.75.
+        server.received_at = 1.75
+        ack = tcp_h2_describe._build.build_ping(opaque_data, ack=True)
+        tcp_h2_describe._describe.observe(ack, False, server)
+
+        assert tracker.pending == {}
+        assert tracker.client_leg.count == 0
+        assert tracker.server_leg.count == 1
+        assert tracker.server_leg.total == 0.5
+
+    @staticmethod
+    def test_ack_during_send():
+        options = tcp_h2_describe._options.ProxyOptions(ping_rtt=True)
+        connection = tcp_h2_describe._state.ConnectionState(
+            "client->server", "server->client", options
+        )
+        tracker = connection.find_tracker(tcp_h2_describe._ping.PingTracker)
+        client = connection.client
+        server = connection.server
+        opaque_data = b"\x00\x01\x02\x03\x04\x05\x06\x07"
+        ack = tcp_h2_describe._build.build_ping(opaque_data, ack=True)
+
+        class AckingSocket:
+            @staticmethod
+            def send(tcp_chunk):
+                # The ACK is RECV-ed (by the other thread) before the SEND
+                # of the PING returns.
+                server.received_at = time.monotonic()
+                tcp_h2_describe._describe.observe(ack, False, server)
+                return len(tcp_chunk)
+
+        client.send_socket = AckingSocket()
+        client.received_at = time.monotonic()
+        ping = tcp_h2_describe._build.build_ping(opaque_data)
+        tcp_h2_describe._describe.observe(ping, False, client)
+        client.forward(ping, True)
+
+        assert tracker.pending == {}
+        assert tracker.server_leg.count == 1
+
+    @staticmethod
+    def test_unmatched_ack():
+        options = tcp_h2_describe._options.ProxyOptions(ping_rtt=True)
+        connection = tcp_h2_describe._state.ConnectionState(
+            "client->server", "server->client", options
+        )
+        tracker = connection.find_tracker(tcp_h2_describe._ping.PingTracker)
+
+        ack = tcp_h2_describe._build.build_ping(b"12345678", ack=True)
+        tcp_h2_describe._describe.observe(ack, False, connection.client)
+        assert tracker.client_leg.count == 0
+        assert tracker.server_leg.count == 0
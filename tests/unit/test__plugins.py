@@ -0,0 +1,97 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+import tcp_h2_describe._build
+import tcp_h2_describe._describe
+import tcp_h2_describe._plugins
+
+
+class FakeEntryPoint:
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+        self.load_count = 0
+
+    def load(self):
+        self.load_count += 1
+        return self.value
+
+
+def _handle_ping(frame_payload, flags, context):
+    return f"Plugin PING ({len(frame_payload)} bytes, context={context})"
+
+
+@pytest.fixture
+def registries(monkeypatch):
+    # NOTE: The registries are copied so that the plugin is only registered
+    #       for the duration of a test.
+    describe_mod = tcp_h2_describe._describe
+    for name in (
+        "FRAME_PAYLOAD_HANDLERS",
+        "SETTINGS",
+        "LAZY_SETTINGS",
+        "PAYLOAD_HANDLER_TABLE",
+        "PAYLOAD_CONTEXT_TABLE",
+    ):
+        registry = getattr(describe_mod, name)
+        monkeypatch.setattr(describe_mod, name, registry.copy())
+    describe_mod.FRAME_PAYLOAD_HANDLERS["PING"] = describe_mod.UNSET
+
+    entry_points = {
+        tcp_h2_describe._plugins.PAYLOAD_HANDLER_GROUP: [
+            FakeEntryPoint("demo.PING", _handle_ping)
+        ],
+        tcp_h2_describe._plugins.SETTING_GROUP: [
+            FakeEntryPoint("demo.0xfe03", "DEMO_SETTING")
+        ],
+    }
+    monkeypatch.setattr(
+        tcp_h2_describe._plugins, "_entry_points", entry_points.get
+    )
+    return entry_points
+
+
+def test_find_plugins(registries):
+    plugins = tcp_h2_describe._plugins.find_plugins()
+    assert list(plugins.keys()) == ["demo"]
+    assert [key for _, key, _ in plugins["demo"]] == ["PING", "0xfe03"]
+    assert tcp_h2_describe._plugins.describe_plugins(plugins) == (
+        "Plugins =\n   demo: PING, setting 0xfe03"
+    )
+
+
+def test_enable_plugins_lazy(registries):
+    plugins_mod = tcp_h2_describe._plugins
+    (handler_entry,) = registries[plugins_mod.PAYLOAD_HANDLER_GROUP]
+    (setting_entry,) = registries[plugins_mod.SETTING_GROUP]
+
+    tcp_h2_describe._plugins.enable_plugins(["demo"])
+    assert handler_entry.load_count == 0
+    assert setting_entry.load_count == 0
+
+    ping = tcp_h2_describe._build.build_ping(b"\x00" * 8)
+    parts, _ = tcp_h2_describe._describe.next_h2_frame(ping)
+    assert parts[-1] == "Plugin PING (8 bytes, context=None)"
+    tcp_h2_describe._describe.next_h2_frame(ping)
+    assert handler_entry.load_count == 1
+
+    settings = tcp_h2_describe._build.build_settings([(0xFE03, 1)])
+    parts, _ = tcp_h2_describe._describe.next_h2_frame(settings)
+    assert parts[-1].startswith("Settings =\n   DEMO_SETTING:0xfe03 -> 1")
+    assert setting_entry.load_count == 1
+
+
+def test_enable_plugins_unknown(registries):
+    with pytest.raises(ValueError):
+        tcp_h2_describe._plugins.enable_plugins(["demo", "missing"])
@@ -0,0 +1,156 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import socket
+
+import hpack
+import pytest
+
+import tcp_h2_describe._build
+import tcp_h2_describe._describe
+import tcp_h2_describe._replay
+
+
+def _capture_chunks():
+    build = tcp_h2_describe._build
+    encoder = hpack.Encoder()
+    headers = [(":method", "POST"), (":path", "/upload")]
+    return [
+        (
+            0.0,
+            tcp_h2_describe._describe.PREFACE
+            + build.build_settings([(0x4, 0x100000)])
+            + build.build_window_update(0, 0x100000),
+        ),
+        (0.5, build.build_settings(ack=True)),
+        # NOTE: The second HEADERS uses the dynamic table entries added by
+        #       the first, so the decoder must process them in order.
+        (1.0, build.build_headers(encoder, headers, 3)),
+        (1.5, build.build_headers(encoder, headers, 7, end_stream=True)),
+        (2.0, build.build_data(3, b"x" * 100, end_stream=True)),
+    ]
+
+
+def test_load_events():
+    events = tcp_h2_describe._replay.load_events(_capture_chunks())
+    assert [
+        (event.offset, event.type_byte, event.stream_id, event.end_stream)
+        for event in events
+    ] == [
+        (0.0, 0x4, 0, False),
+        (1.0, 0x1, 3, False),
+        (1.5, 0x1, 7, True),
+        (2.0, 0x0, 3, True),
+    ]
+    assert events[0].value == [(0x4, 0x100000)]
+    assert events[2].value == [(b":method", b"POST"), (b":path", b"/upload")]
+    assert events[3].value == b"x" * 100
+
+
+def test_load_events_no_preface():
+    with pytest.raises(ValueError):
+        tcp_h2_describe._replay.load_events([(0.0, b"GET / HTTP/1.1\r\n")])
+
+
+class TestReplayConnection:
+    @staticmethod
+    def _make_connection():
+        events = tcp_h2_describe._replay.load_events(_capture_chunks())
+        return tcp_h2_describe._replay.ReplayConnection(
+            ("localhost", 80), events, 10.0, 2.0, 5.0
+        )
+
+    def test_send_due(self):
+        connection = self._make_connection()
+        # At 2x speed, the frames at 0.0s and 1.0s are due 0.5s after start.
+        sent = connection.send_due(10.5)
+        frames, remaining = tcp_h2_describe._replay.split_frames(sent)
+        assert remaining == b""
+        frame_ids = [(frame[0], frame[2]) for frame in frames]
+        assert frame_ids == [(0x4, 0), (0x1, 1)]
+        assert connection.stream_ids == {3: 1}
+        assert connection.in_flight == {1: 10.5}
+
+    def test_flow_control(self):
+        connection = self._make_connection()
+        server_settings = tcp_h2_describe._build.build_settings(
+            [(0x3, 1), (0x4, 40), (0x5, 16384)]
+        )
+        _, to_send = connection.on_chunk(server_settings, 10.0)
+        assert to_send == tcp_h2_describe._build.build_settings(ack=True)
+
+        connection.send_due(11.0)
+        # SETTINGS_MAX_CONCURRENT_STREAMS = 1, so stream 7 must wait.
+        assert connection.index == 2
+        assert connection.blocked(connection.events[2])
+
+        # The stream window (40) only allows part of the DATA.
+        connection.events = connection.events[:2] + connection.events[3:]
+        sent = connection.send_due(11.0)
+        assert sent == tcp_h2_describe._build.build_data(1, b"x" * 40)
+        window_update = tcp_h2_describe._build.build_window_update(1, 60)
+        _, to_send = connection.on_chunk(window_update, 11.5)
+        assert to_send == tcp_h2_describe._build.build_data(
+            1, b"x" * 60, end_stream=True
+        )
+        assert connection.pending == {}
+
+        response = tcp_h2_describe._build.build_headers(
+            hpack.Encoder(), [(":status", "200")], 1, end_stream=True
+        )
+        connection.on_chunk(response, 12.0)
+        assert connection.statuses == {"200": 1}
+        assert connection.response_times == [1.0]
+        assert connection.in_flight == {}
+
+    def test_header_table_size(self):
+        connection = self._make_connection()
+        settings = [(0x1, 65536)]
+        connection.events[0] = connection.events[0]._replace(value=settings)
+        connection.send_due(10.0)
+        assert connection.decoder.max_allowed_table_size == 65536
+
+        encoder = hpack.Encoder()
+        encoder.header_table_size = 65536
+        response = tcp_h2_describe._build.build_headers(
+            encoder, [(":status", "200")], 1
+        )
+        connection.on_chunk(response, 10.5)
+        assert connection.statuses == {"200": 1}
+
+        ack = tcp_h2_describe._build.build_settings(ack=True)
+        connection.on_chunk(ack, 11.0)
+        assert connection.pending_table_sizes == collections.deque()
+
+    def test_run_refused(self):
+        listener = socket.socket()
+        listener.bind(("localhost", 0))
+        address = listener.getsockname()
+        # NOTE: Closing the listener (without accepting) frees the port, so
+        #       connecting to it is refused.
+        listener.close()
+
+        events = tcp_h2_describe._replay.load_events(_capture_chunks())
+        connection = tcp_h2_describe._replay.ReplayConnection(
+            address, events, 0.0, 100.0, 5.0
+        )
+        connection.run()
+        assert connection.failure.startswith("ConnectionRefusedError: ")
+        assert connection.errors == 2
+
+
+def test_parse_speed():
+    assert tcp_h2_describe._replay.parse_speed("2") == 2.0
+    for value in ("0", "-1", "nan"):
+        with pytest.raises(ValueError):
+            tcp_h2_describe._replay.parse_speed(value)
@@ -0,0 +1,155 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+
+import pytest
+
+import tcp_h2_describe._shape
+
+
+class FakePeer:
+    def __init__(self):
+        self.forwarded = []
+
+    def forward(self, tcp_chunk, at_frame_boundary):
+        self.forwarded.append((tcp_chunk, at_frame_boundary))
+
+
+def test_parse_rate():
+    assert tcp_h2_describe._shape.parse_rate("125000") == 125000.0
+    assert tcp_h2_describe._shape.parse_rate("10mbit") == 1250000.0
+    assert tcp_h2_describe._shape.parse_rate("1.5MB") == 1500000.0
+    with pytest.raises(ValueError):
+        tcp_h2_describe._shape.parse_rate("10 furlongs")
+    with pytest.raises(ValueError):
+        tcp_h2_describe._shape.parse_rate("0")
+
+
+def test_token_bucket():
+    bucket = tcp_h2_describe._shape.TokenBucket(1000.0, 100)
+    assert bucket.reserve(100, 10.0) == 10.0
+    # The bucket is empty, so 500 bytes take 0.5 seconds.
+    assert bucket.reserve(500, 10.0) == pytest.approx(10.5)
+    # The debt is repaid before the next bytes are sent.
+    assert bucket.reserve(100, 10.25) == pytest.approx(10.6)
+
+
+def test_scheduler_run_due():
+    scheduler = tcp_h2_describe._shape.Scheduler()
+    calls = []
+    scheduler.call_at(2.0, calls.append, "b")
+    scheduler.call_at(1.0, calls.append, "a")
+    scheduler.call_at(2.0, calls.append, "c")
+    scheduler.run_due(1.5)
+    assert calls == ["a"]
+    scheduler.run_due(2.0)
+    assert calls == ["a", "b", "c"]
+    assert scheduler.heap == []
+
+
+class TestShaper:
+    @staticmethod
+    def test_schedule():
+        shaping = tcp_h2_describe._shape.Shaping(
+            latency=0.05, jitter=0.04, seed=1
+        )
+        bucket = shaping.make_bucket(1000.0)
+        scheduler = tcp_h2_describe._shape.Scheduler()
+        shaper = tcp_h2_describe._shape.Shaper(
+            shaping, [bucket, None], scheduler=scheduler
+        )
+        peer = FakePeer()
+        shaper.schedule(peer, b"x" * 20000, True)
+        shaper.schedule(peer, b"y", False)
+        assert shaper.queued == 20001
+
+        # NOTE: The first chunk is held by the bandwidth cap until 3616 bytes
+        #       (beyond the burst) are repaid, so the second chunk (with any
+        #       jitter) can't be sent earlier.
+        (first_at, _, _, _), (second_at, _, _, _) = sorted(scheduler.heap)
+        assert 3.626 <= first_at - bucket.updated_at <= 3.706
+        assert second_at >= first_at
+        scheduler.run_due(second_at)
+        shaper.flush()
+        assert peer.forwarded == [(b"x" * 20000, True), (b"y", False)]
+        assert shaper.queued == 0
+        shaper.close()
+        shaper.thread.join()
+
+    @staticmethod
+    def test_schedule_error():
+        shaping = tcp_h2_describe._shape.Shaping()
+        scheduler = tcp_h2_describe._shape.Scheduler()
+        shaper = tcp_h2_describe._shape.Shaper(
+            shaping, [], scheduler=scheduler
+        )
+        shaper.error = BrokenPipeError()
+        with pytest.raises(BrokenPipeError):
+            shaper.schedule(FakePeer(), b"x", True)
+
+    @staticmethod
+    def test_forward_error():
+        shaping = tcp_h2_describe._shape.Shaping()
+        scheduler = tcp_h2_describe._shape.Scheduler()
+        failing = tcp_h2_describe._shape.Shaper(
+            shaping, [], scheduler=scheduler
+        )
+        shaper = tcp_h2_describe._shape.Shaper(
+            shaping, [], scheduler=scheduler
+        )
+        peer = FakePeer()
+        failing_peer = FakePeer()
+        failing_peer.forward = lambda *args: {}["missing"]
+        failing.schedule(failing_peer, b"x", True)
+        shaper.schedule(peer, b"y", True)
+
+        # The error is kept (rather than stopping the sender thread), so the
+        # other shaper still forwards its chunk.
+        scheduler.run_due(time.monotonic())
+        failing.flush()
+        shaper.flush()
+        assert isinstance(failing.error, KeyError)
+        assert peer.forwarded == [(b"y", True)]
+        with pytest.raises(KeyError):
+            failing.schedule(failing_peer, b"z", True)
+        failing.close()
+        shaper.close()
+
+    @staticmethod
+    def test_slow_reader():
+        shaping = tcp_h2_describe._shape.Shaping()
+        scheduler = tcp_h2_describe._shape.Scheduler()
+        slow = tcp_h2_describe._shape.Shaper(shaping, [], scheduler=scheduler)
+        shaper = tcp_h2_describe._shape.Shaper(
+            shaping, [], scheduler=scheduler
+        )
+        writable = threading.Event()
+        slow_peer = FakePeer()
+        slow_peer.forward = lambda *args: writable.wait()
+        peer = FakePeer()
+        slow.schedule(slow_peer, b"x", True)
+        shaper.schedule(peer, b"y", True)
+
+        # A chunk blocked on a slow reader doesn't hold up the scheduler (or
+        # the chunks for other directions).
+        scheduler.run_due(time.monotonic())
+        shaper.flush()
+        assert peer.forwarded == [(b"y", True)]
+        assert slow.queued == 1
+
+        writable.set()
+        slow.flush()
+        assert slow.queued == 0
+        slow.close()
+        shaper.close()
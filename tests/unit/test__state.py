@@ -0,0 +1,160 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hpack
+import pytest
+
+import tcp_h2_describe._build
+import tcp_h2_describe._state
+
+
+class TestStreamState:
+    @staticmethod
+    def test_update_lifecycle():
+        stream = tcp_h2_describe._state.StreamState(1)
+        # Client: HEADERS (END_HEADERS) then DATA (END_STREAM).
+        assert not stream.update_lifecycle(True, 0x1, 0x4, 10.0)
+        assert not stream.update_lifecycle(True, 0x0, 0x1, 10.5)
+        # Server: HEADERS (END_HEADERS) then DATA (END_STREAM).
+        assert not stream.update_lifecycle(False, 0x1, 0x4, 11.0)
+        assert stream.update_lifecycle(False, 0x0, 0x1, 12.0)
+
+        assert stream.started_at == 10.0
+        assert stream.response_headers_at == 11.0
+        assert stream.response_data_at == 12.0
+        assert stream.ended_at == 12.0
+        assert not stream.reset
+        # Frames after the stream has ended are ignored.
+        assert not stream.update_lifecycle(False, 0x3, 0x0, 13.0)
+        assert stream.ended_at == 12.0
+
+    @staticmethod
+    def test_update_lifecycle_reset():
+        stream = tcp_h2_describe._state.StreamState(3)
+        assert not stream.update_lifecycle(True, 0x1, 0x5, 1.0)
+        assert stream.update_lifecycle(False, 0x3, 0x0, 2.0)
+
+        assert stream.client_ended
+        assert not stream.server_ended
+        assert stream.reset
+        assert stream.response_headers_at is None
+        assert stream.ended_at == 2.0
+
+
+class TestPeerState:
+    @staticmethod
+    def test_feed_reassembles():
+        connection = _make_connection()
+        peer = connection.client
+        ping = tcp_h2_describe._build.build_ping(b"\x00" * 8)
+
+        h2_frames = peer.feed(ping + ping[:5])
+        assert bytes(h2_frames) == ping
+        assert peer.partial == ping[:5]
+        assert bytes(peer.feed(ping[5:12])) == b""
+        assert bytes(peer.feed(ping[12:])) == ping
+        assert peer.partial == b""
+
+    @staticmethod
+    def test_feed_too_large():
+        connection = _make_connection()
+        frame_header = b"\x00\x40\x01\x00\x00\x00\x00\x00\x01"
+        with pytest.raises(ValueError):
+            connection.client.feed(frame_header + b"\x00" * 10)
+
+    @staticmethod
+    def test_buffer_size():
+        connection = _make_connection()
+        assert connection.client.buffer_size() == 4 * (16384 + 9)
+        # Server advertises SETTINGS_MAX_FRAME_SIZE = 0x100000, then the
+        # client acknowledges.
+        server_settings = b"\x00\x05\x00\x10\x00\x00"
+        connection.server.on_frame(0x4, 0x0, 0, memoryview(server_settings))
+        assert connection.client.max_frame_size() == 0x100000
+        connection.client.on_frame(0x4, 0x1, 0, memoryview(b""))
+        assert connection.server.settings[0x5] == 0x100000
+        assert (
+            connection.client.buffer_size()
+            == tcp_h2_describe._state.MAX_READ_SIZE
+        )
+        assert connection.server.buffer_size() == 4 * (16384 + 9)
+
+    @staticmethod
+    def test_header_block_continuation():
+        connection = _make_connection()
+        peer = connection.client
+        header_block = hpack.Encoder().encode(
+            [(":method", "GET"), (":path", "/")]
+        )
+        # HEADERS (PADDED) with the first byte of the block, followed by a
+        # CONTINUATION (END_HEADERS) with the rest.
+        headers_payload = b"\x02" + header_block[:1] + b"\x00\x00"
+        peer.on_frame(0x1, 0x8, 1, memoryview(headers_payload))
+        assert peer.current_headers is None
+        peer.on_frame(0x9, 0x4, 1, memoryview(header_block[1:]))
+        assert peer.current_headers == [(":method", "GET"), (":path", "/")]
+        stream = connection.streams[1]
+        assert peer.frame_context().stream is stream
+        assert stream.request_headers == peer.current_headers
+        assert stream.header_value(":path") == "/"
+        assert stream.header_value(":status", request=False) is None
+
+
+class TestConnectionState:
+    @staticmethod
+    def _request(connection, stream_id):
+        # HEADERS (END_STREAM) from the client and then the server.
+        connection.client.on_frame(0x1, 0x1, stream_id, memoryview(b""))
+        connection.server.on_frame(0x1, 0x1, stream_id, memoryview(b""))
+
+    def test_ended_streams(self):
+        connection = _make_connection()
+        self._request(connection, 1)
+        assert connection.streams == {}
+        stream = connection.ended_streams[1]
+        assert stream.ended_at is not None
+        # A late frame (e.g. WINDOW_UPDATE) still finds the ended stream.
+        assert connection.get_stream(1) is stream
+
+        max_ended = tcp_h2_describe._state.MAX_ENDED_STREAMS
+        for index in range(1, max_ended + 1):
+            self._request(connection, 2 * index + 1)
+        assert len(connection.ended_streams) == max_ended
+        assert connection.stream_totals.count == 1
+        # The state for an evicted stream is not created again.
+        assert connection.get_stream(1) is None
+        connection.client.on_frame(0x8, 0x0, 1, memoryview(b"\x00" * 4))
+        assert connection.find_stream(1) is None
+        assert 1 not in connection.streams
+
+        lines = connection.describe_streams().split("\n")
+        max_lines = tcp_h2_describe._state.MAX_STREAM_LINES
+        assert len(lines) == max_lines + 2
+        assert lines[1] == (
+            f"   {max_ended + 1 - max_lines} earlier stream(s): "
+            "client->server = 0 bytes, server->client = 0 bytes"
+        )
+        assert lines[-1] == (
+            f"   Stream {2 * max_ended + 1}: client->server = 0 bytes, "
+            "server->client = 0 bytes"
+        )
+
+    def test_describe_incomplete(self):
+        connection = _make_connection()
+        self._request(connection, 1)
+        connection.client.on_frame(0x1, 0x0, 3, memoryview(b""))
+        (report,) = connection.describe_incomplete()
+        assert "Stream 3 (incomplete)" in report
+
+
+def _make_connection():
+    return tcp_h2_describe._state.ConnectionState("C->S", "S->C")
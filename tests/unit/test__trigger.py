@@ -0,0 +1,99 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hpack
+import pytest
+
+import tcp_h2_describe._options
+import tcp_h2_describe._state
+import tcp_h2_describe._trigger
+
+
+def _make_connection(**kwargs):
+    triggers = tcp_h2_describe._trigger.Triggers(**kwargs)
+    options = tcp_h2_describe._options.ProxyOptions(triggers=triggers)
+    return tcp_h2_describe._state.ConnectionState("C->S", "S->C", options)
+
+
+def test_parse_error_code():
+    assert tcp_h2_describe._trigger.parse_error_code("cancel") == 0x8
+    assert tcp_h2_describe._trigger.parse_error_code("0xff") == 0xFF
+    with pytest.raises(ValueError):
+        tcp_h2_describe._trigger.parse_error_code("not-an-error")
+
+
+def test_summary_interval_conflict():
+    triggers = tcp_h2_describe._trigger.Triggers(goaway=True)
+    with pytest.raises(ValueError):
+        tcp_h2_describe._options.ProxyOptions(
+            summary_interval=1.0, triggers=triggers
+        )
+
+
+class TestTriggerTracker:
+    @staticmethod
+    def test_rst_stream():
+        connection = _make_connection(rst_stream_codes=[0x8], window=1.0)
+        tracker = connection.trigger
+        server = connection.server
+        server.received_at = connection.opened_at
+        # RST_STREAM (REFUSED_STREAM) does not fire the trigger.
+        server.on_frame(0x3, 0x0, 1, memoryview(b"\x00\x00\x00\x07"))
+        assert server.pop_reports() == []
+        assert not tracker.capturing(server.received_at)
+
+        server.on_frame(0x3, 0x0, 3, memoryview(b"\x00\x00\x00\x08"))
+        (report,) = server.pop_reports()
+        assert report.startswith(
+            "Flight Recorder (trigger: RST_STREAM (CANCEL) from server on "
+            "stream 3) =\n   C->S\n   2 frames recorded"
+        )
+        assert tracker.capturing(connection.opened_at + 0.5)
+        assert not tracker.capturing(connection.opened_at + 1.0)
+        assert tracker.describe() == "Triggers fired = 1"
+
+    @staticmethod
+    def test_header_pattern():
+        connection = _make_connection(header_patterns=[r"^:path: /slow"])
+        client = connection.client
+        header_block = hpack.Encoder().encode(
+            [(":method", "GET"), (":path", "/slow/1")]
+        )
+        client.on_frame(0x1, 0x5, 1, memoryview(header_block))
+        (report,) = client.pop_reports()
+        assert report.startswith(
+            "Flight Recorder (trigger: header ':path: /slow/1' from client "
+            "on stream 1) ="
+        )
+
+    @staticmethod
+    def test_latency():
+        connection = _make_connection(latency=0.1)
+        client = connection.client
+        server = connection.server
+        header_block = hpack.Encoder().encode([(":method", "GET")])
+        client.received_at = connection.opened_at
+        client.on_frame(0x1, 0x5, 1, memoryview(header_block))
+        server.received_at = connection.opened_at + 0.25
+        server.on_frame(0x0, 0x0, 1, memoryview(b"x"))
+        assert connection.trigger.slow_streams == {1}
+        (report,) = server.pop_reports()
+        assert report.startswith(
+            "Flight Recorder (trigger: stream 1 open for 250.000ms "
+            "(> 100ms)) ="
+        )
+        # The latency trigger only fires once per stream.
+        server.on_frame(0x0, 0x1, 1, memoryview(b"y"))
+        assert server.pop_reports() == []
+        assert connection.trigger.fired == 1
+        # The slow stream is forgotten once it ends.
+        assert connection.trigger.slow_streams == set()